@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+Мікробенчмарки гарячих шляхів: python -m rpg0.bench [назва ...]
+
+Без аргументів запускає всі. Кожен бенчмарк порівнює поточну реалізацію
+з попередньою (відтвореною тут дослівно), щоб регресії було видно одразу.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Sequence
+
+BENCHES: Dict[str, Callable[[argparse.Namespace], None]] = {}
+
+
+def bench(name: str):
+    def deco(fn):
+        BENCHES[name] = fn
+        return fn
+    return deco
+
+
+def per_call(fn: Callable[[], object], n: int) -> float:
+    """Середній час одного виклику, мкс (найкращий з трьох прогонів)."""
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / n * 1e6
+
+
+def report(title: str, rows: List[tuple]) -> None:
+    print(f"\n== {title}")
+    base = rows[0][1]
+    for label, us in rows:
+        print(f"  {label:<34} {us:>9.2f} мкс  ×{base / us:.1f}")
+
+
+# ---- Поява ворогів ----
+
+def _spawn_enemy_for_old(p, location="Тракт"):
+    # spawn_enemy_for до реєстру: словник таблиць і import на кожен виклик
+    import random
+    from .models import Enemy
+    tables = {
+        "Місто": [("П'яний хуліган", 18, 5, 1, 10, 8),
+                  ("Кишеньковий злодій", 20, 6, 2, 12, 12),
+                  ("Шибайголова", 22, 7, 2, 14, 14)],
+        "Тракт": [("Гоблін-набігник", 18, 5, 1, 12, 10),
+                  ("Вовк лісовий", 20, 6, 2, 14, 12),
+                  ("Розбійник тракту", 24, 8, 3, 18, 16)],
+        "Руїни": [("Кістяний вартовий", 22, 7, 2, 16, 14),
+                  ("Орк-берсерк", 28, 9, 3, 22, 20),
+                  ("Рицар-відступник", 32, 10, 4, 26, 24)],
+        "Гільдія авантюристів": [("Сторож гільдії (спаринг)", 18, 6, 2, 8, 0)],
+        "Старий ліс": [("Дикий кабан", 22, 7, 2, 16, 14),
+                       ("Лісовий дух", 24, 8, 3, 20, 18)],
+    }
+    name, base_hp, base_atk, base_def, exp, gold = random.choice(tables.get(location, tables["Тракт"]))
+    hp = base_hp + (p.level - 1) * 4
+    atk = base_atk + (p.level - 1)
+    defense = base_def + (p.level // 3)
+    exp_reward = exp + (p.level - 1) * 3
+    gold_reward = gold + random.randint(0, p.level * 2)
+    return Enemy(name=name, hp=hp, max_hp=hp, atk=atk, defense=defense,
+                 exp_reward=exp_reward, gold_reward=gold_reward)
+
+
+@bench("spawn")
+def bench_spawn(args: argparse.Namespace) -> None:
+    from collections import Counter
+    from .models import Player
+    from .utils.alias import AliasTable
+    from .utils.spawns import spawn_enemy
+
+    p = Player(level=7)
+    n = args.n
+    report("Поява ворога (Руїни, рівень 7)", [
+        ("старий spawn_enemy_for", per_call(lambda: _spawn_enemy_for_old(p, "Руїни"), n)),
+        ("реєстр + alias + кеш", per_call(lambda: spawn_enemy(7, "Руїни"), n)),
+    ])
+
+    # зважений вибір: alias O(1) проти random.choices з вагами (O(log n) + підготовка)
+    items = list(range(64))
+    weights = [random.random() for _ in items]
+    table = AliasTable(items, weights)
+    report("Зважений вибір з 64 варіантів", [
+        ("random.choices(weights=...)", per_call(lambda: random.choices(items, weights)[0], n)),
+        ("AliasTable.sample", per_call(table.sample, n)),
+    ])
+
+    # перевірка розподілу
+    draws = Counter(table.sample() for _ in range(200_000))
+    total = sum(weights)
+    worst = max(abs(draws[i] / 200_000 - w / total) for i, w in zip(items, weights))
+    print(f"  макс. відхилення частот від ваг: {worst:.4f}")
+
+
+# ---- Лут ----
+
+def _generate_loot_old(location):
+    # generate_loot до таблиць: ланцюжок порогів, choices на тип, пошук шаблону
+    from .utils.catalog import Item
+    from .utils.loot import NAMES_BY_LOC, compute_price, loot_template
+    r = random.random()
+    if r < 0.60:
+        rarity, gold = "common", random.randint(0, 4)
+    elif r < 0.85:
+        rarity, gold = "uncommon", random.randint(2, 8)
+    elif r < 0.97:
+        rarity, gold = "rare", random.randint(5, 12)
+    else:
+        rarity, gold = "epic", random.randint(10, 20)
+    name = random.choice(NAMES_BY_LOC.get(location, NAMES_BY_LOC["Тракт"]))
+    itype = random.choices(["weapon", "armor", "accessory"], weights=[4, 4, 2], k=1)[0]
+    return Item(loot_template(name, rarity, itype), price=compute_price(rarity), gold=gold)
+
+
+@bench("loot")
+def bench_loot(args: argparse.Namespace) -> None:
+    from collections import Counter
+    from .utils.loot import generate_loot, generate_loot_batch
+
+    n = args.n
+    batch = 1000
+    report("Предмет луту (Руїни)", [
+        ("старий generate_loot", per_call(lambda: _generate_loot_old("Руїни"), n)),
+        ("таблиця + alias", per_call(lambda: generate_loot("Руїни"), n)),
+        ("generate_loot_batch / предмет", per_call(lambda: generate_loot_batch("Руїни", batch), max(1, n // batch)) / batch),
+        ("batch з pity / предмет", per_call(lambda: generate_loot_batch("Руїни", batch, pity={}), max(1, n // batch)) / batch),
+    ])
+
+    # розподіл рідкості має лишитися 60/25/12/3
+    got = Counter(it.tpl.rarity for it in generate_loot_batch("Руїни", 200_000))
+    print("  частки рідкості:", ", ".join(f"{r} {c / 200_000:.3f}" for r, c in got.most_common()))
+
+
+# ---- Кодек збереження ----
+
+def _codec_player(n_items: int, seed: int = 1):
+    """Гравець з n_items предметами: 5 з крамниці, решта — лут різних локацій, плюс екіпіровка."""
+    from .handlers.shop import shop_stock
+    from .models import Player
+    from .utils.loot import generate_loot
+    rng = random.Random(seed)
+    p = Player(name="Олеся", level=9, class_name="Маг", backstory="Шляхтич", registered=True,
+               skills_known=["Вогняний снаряд", "Імпульс сили"], skills_loadout=["Вогняний снаряд"],
+               loot_pity={"rare": 4, "epic": 17})
+    stock = shop_stock()
+    p.inventory.extend(stock[:min(5, n_items)])
+    for _ in range(n_items - len(p.inventory)):
+        p.inventory.append(generate_loot(rng.choice(("Тракт", "Руїни", "Старий ліс")), rng=rng))
+    p.equipment["weapon"] = stock[3].copy()
+    p.equipment["weapon"]["equipped"] = True
+    return p
+
+
+@bench("codec")
+def bench_codec(args: argparse.Namespace) -> None:
+    import pickle
+    from .models import Enemy
+    from .storage.codec import decode_player, encode_player, encode_enemy
+
+    def dict_format(p):
+        # формат до каталогу й кодека: Player.asdict() з предметами-словниками
+        d = p.asdict()
+        d["inventory"] = [it.to_dict() for it in p.inventory]
+        d["equipment"] = {s: (it.to_dict() if it is not None else None) for s, it in p.equipment.items()}
+        return d
+
+    dumps = lambda obj: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)  # noqa: E731
+    print("\n== Розмір запису гравця, байт")
+    print(f"  {'предметів':<10} {'pickle dict':>12} {'pickle Player':>14} {'кодек':>8}")
+    for n_items in (0, 10, 49, 50):
+        p = _codec_player(n_items)
+        legacy, blob = dumps(dict_format(p)), encode_player(p)
+        print(f"  {n_items:<10} {len(legacy):>12} {len(dumps(p)):>14} {len(blob):>8}"
+              f"  ×{len(legacy) / len(blob):.1f}")
+    e = Enemy("Орк-берсерк", 30, 30, 9, 3, 22, 20)
+    print(f"  ворог: pickle {len(dumps(e.asdict()))} → кодек {len(encode_enemy(e))}")
+
+    p = _codec_player(50)
+    d = dict_format(p)
+    blob, legacy, live = encode_player(p), dumps(d), dumps(p)
+    n = max(1, args.n // 20)
+    encode_player(p), decode_player(blob)  # прогріти кеші тіл предметів
+    # pickle dict — старий формат; pickle Player — те, що писалося б без кодека тепер
+    report("Запис гравця з 50 предметами", [
+        ("pickle dict: dumps", per_call(lambda: dumps(d), n)),
+        ("pickle Player: dumps", per_call(lambda: dumps(p), n)),
+        ("кодек: encode", per_call(lambda: encode_player(p), n)),
+    ])
+    report("Читання гравця з 50 предметами", [
+        ("pickle dict: loads", per_call(lambda: pickle.loads(legacy), n)),
+        ("pickle Player: loads", per_call(lambda: pickle.loads(live), n)),
+        ("кодек: decode", per_call(lambda: decode_player(blob), n)),
+    ])
+
+
+# ---- Клавіатури ----
+
+def _battle_keyboard_old(p, battle_state):
+    # battle_keyboard до кешу: нові кнопки й розмітка на кожен хід
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    rows = [
+        [InlineKeyboardButton("🗡️ Атака", callback_data="battle:attack")],
+        [InlineKeyboardButton("🛡️ Захист", callback_data="battle:defend")],
+        [InlineKeyboardButton("🧪 Зілля", callback_data="battle:potion")],
+        [InlineKeyboardButton("🤖 Автобій", callback_data="battle:auto")],
+        [InlineKeyboardButton("🏃 Втекти", callback_data="battle:run")],
+    ]
+    load = list(getattr(p, "skills_loadout", []) or [])[:3]
+    if load:
+        skill_buttons = []
+        for name in load:
+            cd = battle_state.setdefault("cooldowns", {}).get(name, 0) or 0
+            label = f"✨ {name} (КД {int(cd)})" if cd > 0 else f"✨ {name}"
+            skill_buttons.append([InlineKeyboardButton(label, callback_data=f"battle:skill:{name}")])
+        rows = [rows[0]] + skill_buttons + rows[1:]
+    return InlineKeyboardMarkup(rows)
+
+
+def alloc_per_call(fn: Callable[[], object], n: int = 1000) -> float:
+    """Середній обсяг пам'яті, виділеної за один виклик, байт (tracemalloc)."""
+    import tracemalloc
+    fn()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [fn() for _ in range(n)]   # тримаємо результати, щоб виміряти саме виділення
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / n
+
+
+@bench("keyboards")
+def bench_keyboards(args: argparse.Namespace) -> None:
+    from types import SimpleNamespace
+    from .handlers.battle import battle_keyboard
+    from .handlers.travel import _build_travel_kb
+
+    p = SimpleNamespace(skills_loadout=["Потужний удар", "Кровотеча", "Оглушення"])
+    b = {"cooldowns": {"Кровотеча": 2}}
+    old = lambda: _battle_keyboard_old(p, b)
+    new = lambda: battle_keyboard(p, True, b)
+    texts = lambda kb: [[b.text for b in row] for row in kb.inline_keyboard]
+    assert texts(old()) == texts(new())
+    n = args.n
+    report("Бойова клавіатура (3 уміння, одне на КД)", [
+        ("нові кнопки на кожен хід", per_call(old, n)),
+        ("кеш розміток", per_call(new, n)),
+    ])
+    print(f"  пам'ять на виклик: {alloc_per_call(old):.0f} Б → {alloc_per_call(new):.0f} Б")
+    report("Клавіатура переходів (Місто)", [
+        ("без кешу", per_call(lambda: _build_travel_kb.__wrapped__("Місто"), n)),
+        ("кеш розміток", per_call(lambda: _build_travel_kb("Місто"), n)),
+    ])
+
+
+# ---- Маршрутизація callback'ів ----
+
+@bench("router")
+def bench_router(args: argparse.Namespace) -> None:
+    from telegram import CallbackQuery, Chat, Message, Update, User
+    from telegram.ext import CallbackQueryHandler
+    from .handlers import battle, guild, inventory, quest, registration, shop, travel  # noqa: F401 — реєструють маршрути
+    from .router import ROUTER
+
+    async def _noop(update, context):
+        return None
+
+    # як було: сім CallbackQueryHandler з regex, PTB перебирає їх по черзі
+    old_handlers = [CallbackQueryHandler(_noop, pattern=p)
+                    for p in (r"^guild:", r"^inv:", r"^shop:", r"^reg:", r"^travel:", r"^quest:", r"^battle:")]
+    router = ROUTER.handler()
+
+    user, chat = User(1, "u", False), Chat(1, "private")
+    buttons = [("battle", "attack"), ("battle", "skill", "Кровоточива стріла"), ("shop", "sell", 3),
+               ("travel", "Гільдія авантюристів"), ("quest", "reward")]
+    legacy = [":".join(map(str, b)) for b in buttons]
+    compact = [ROUTER.data(*b) for b in buttons]
+    print("  callback_data, байт:", sum(len(d.encode()) for d in legacy), "→", sum(len(d) for d in compact))
+
+    def make(datas):
+        return [Update(i, callback_query=CallbackQuery(str(i), user, "c", message=Message(1, None, chat), data=d))
+                for i, d in enumerate(datas)]
+    updates = make(legacy)
+    compact_updates = make(compact)
+
+    def old():
+        for u in updates:
+            for h in old_handlers:
+                if h.check_update(u):
+                    break
+
+    def new(batch=updates):
+        for u in batch:
+            router.check_update(u)
+
+    n = args.n
+    report("Пошук обробника callback'а (5 типових кнопок, на кнопку)", [
+        ("7 CallbackQueryHandler з regex", per_call(old, n) / len(updates)),
+        ("ROUTER.handler(), текстові", per_call(new, n) / len(updates)),
+        ("ROUTER.handler(), компактні", per_call(lambda: new(compact_updates), n) / len(updates)),
+    ])
+
+
+# ---- Обробка апдейтів ----
+
+@bench("updates")
+def bench_updates(args: argparse.Namespace) -> None:
+    """Стрес-тест процесора апдейтів: коректність user_data і пропускна здатність."""
+    import asyncio
+    from telegram import CallbackQuery, Chat, Message, Update, User
+    from telegram.ext import SimpleUpdateProcessor
+    from .utils.updates import PerUserUpdateProcessor
+
+    users, per_user, io = 200, 10, 0.005   # кожен хендлер "чекає мережу" 5 мс
+    updates = []
+    for uid in range(1, users + 1):         # серії натискань: апдейти гравця йдуть підряд
+        user, chat = User(uid, "u", False), Chat(uid, "private")
+        for k in range(per_user):
+            q = CallbackQuery(str(k), user, "c", message=Message(1, None, chat), data="shop:buy_potion")
+            updates.append(Update(uid * per_user + k, callback_query=q))
+
+    async def run(processor) -> tuple:
+        data: Dict[int, dict] = {}
+
+        async def handler(update: Update) -> None:
+            # read-modify-write через await — як купівля: прочитали золото, відредагували повідомлення, списали
+            ud = data.setdefault(update.effective_user.id, {"gold": per_user * 10, "potions": 0, "order": []})
+            gold = ud["gold"]
+            await asyncio.sleep(io)
+            ud["gold"] = gold - 10
+            ud["potions"] += 1
+            ud["order"].append(update.update_id)
+
+        await processor.initialize()
+        t0 = time.perf_counter()
+        # так само, як Application: задача на кожен апдейт, обробка — через процесор
+        await asyncio.gather(*(processor.process_update(u, handler(u)) for u in updates))
+        dt = time.perf_counter() - t0
+        await processor.shutdown()
+        assert not len(getattr(processor, "_slots", ())), "замки гравців не прибрано"
+        lost = sum(1 for ud in data.values() if ud["gold"] != 0 or ud["potions"] != per_user)
+        ordered = all(ud["order"] == sorted(ud["order"]) for ud in data.values())
+        return len(updates) / dt, lost, ordered
+
+    print(f"\n== Апдейти: {users} гравців × {per_user} натискань, хендлер з I/O {io * 1000:.0f} мс")
+    rows = [
+        ("послідовно (PTB за замовч.)", SimpleUpdateProcessor(1)),
+        ("concurrent_updates=64", SimpleUpdateProcessor(64)),
+        *((f"PerUserUpdateProcessor({n})", PerUserUpdateProcessor(n, 4096)) for n in (8, 32, 64, 256)),
+    ]
+    for label, proc in rows:
+        rate, bad, ordered = asyncio.run(run(proc))
+        print(f"  {label:<30} {rate:>8.0f} апд/с  зіпсованих гравців: {bad:>3}  порядок: {'так' if ordered else 'ні'}")
+
+
+# ---- Вихідні запити ----
+
+@bench("ratelimit")
+def bench_ratelimit(args: argparse.Namespace) -> None:
+    """Планувальник запитів проти фейкового Bot API: швидкості, пріоритети, злиття, RetryAfter."""
+    import asyncio
+    from telegram.error import RetryAfter
+    from .utils.ratelimit import OutboundScheduler, PRIORITY_BULK
+
+    async def scenario() -> None:
+        sent: List[tuple] = []
+        flood = {"left": 1}
+
+        async def api(endpoint, data, **kw):
+            # фейковий Bot API: фіксує час відправки; чат 999 один раз відповідає 429
+            if data.get("chat_id") == 999 and flood["left"]:
+                flood["left"] -= 1
+                raise RetryAfter(1)
+            sent.append((time.perf_counter(), endpoint, data))
+            return True
+
+        # ліміти в 10 разів вищі за реальні, щоб сценарій тривав секунди
+        rl = OutboundScheduler(global_rate=300, chat_rate=10, chat_burst=3)
+        await rl.initialize()
+        call = lambda ep, data, prio=None: rl.process_request(
+            api, (ep, data), {}, ep, data, {"priority": prio} if prio is not None else None)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(call("sendMessage", {"chat_id": c}) for c in range(1, 601)))
+        dt = time.perf_counter() - t0
+        print(f"\n== Планувальник: 600 чатів по 1 повідомленню, ліміт 300/с → {600 / dt:.0f}/с")
+
+        sent.clear()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(call("sendMessage", {"chat_id": 7}) for _ in range(23)))
+        print(f"  один чат, 23 повідомлення, 10/с з burst 3: {time.perf_counter() - t0:.2f} с (очікується ≈2.0)")
+
+        sent.clear()
+        bulk = [call("sendMessage", {"chat_id": 1000 + c}, PRIORITY_BULK) for c in range(300)]
+        tasks = [asyncio.ensure_future(b) for b in bulk]
+        await asyncio.sleep(0.1)
+        inter = [asyncio.ensure_future(call("editMessageText", {"chat_id": 2000 + c, "message_id": 1}))
+                 for c in range(30)]
+        await asyncio.gather(*tasks, *inter)
+        order = [d["chat_id"] for _, _, d in sent]
+        last_inter = max(order.index(2000 + c) for c in range(30))
+        print(f"  пріоритет: 30 інтерактивних поверх 300 розсилок — усі відправлені до позиції {last_inter + 1}/330")
+
+        sent.clear()
+        await call("editMessageText", {"chat_id": 5, "message_id": 9, "text": "0"})
+        await call("editMessageText", {"chat_id": 5, "message_id": 9, "text": "1"})
+        await call("editMessageText", {"chat_id": 5, "message_id": 9, "text": "2"})
+        results = await asyncio.gather(*(call("editMessageText", {"chat_id": 5, "message_id": 9, "text": str(i)})
+                                         for i in range(3, 20)))
+        texts = [d["text"] for _, _, d in sent]
+        print(f"  злиття: 20 редагувань одного повідомлення → відправлено {len(texts)} ({', '.join(texts)}), "
+              f"результат отримали всі: {all(results)}")
+
+        sent.clear()
+        t0 = time.perf_counter()
+        ok = await call("sendMessage", {"chat_id": 999})
+        print(f"  429 RetryAfter(1): повтор через {time.perf_counter() - t0:.2f} с, успіх: {ok}")
+        await rl.shutdown()
+
+    asyncio.run(scenario())
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rpg0.bench", description="Мікробенчмарки RPG0.")
+    ap.add_argument("names", nargs="*", help=f"які запускати: {', '.join(BENCHES)}")
+    ap.add_argument("-n", type=int, default=20_000, help="ітерацій на вимір")
+    args = ap.parse_args(argv)
+    for name in args.names or list(BENCHES):
+        if name not in BENCHES:
+            ap.error(f"невідомий бенчмарк: {name}")
+        BENCHES[name](args)
+
+
+if __name__ == "__main__":
+    main()
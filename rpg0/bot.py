@@ -4,48 +4,58 @@
 """
 import logging
 import os
+from typing import Optional
 from telegram.ext import (
-    Application, ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler,
+    Application, ApplicationBuilder, CommandHandler, MessageHandler,
     ConversationHandler, PicklePersistence, ContextTypes, filters,
 )
 from telegram.constants import ParseMode
 
 from .config import (
-    BOT_DISPLAY_NAME, PERSIST_FILE, DEFAULT_LOCATION,
+    BOT_DISPLAY_NAME, BOT_API_URL, PERSIST_FILE, PERSIST_BACKEND, PERSIST_DB, PERSIST_WRITE_DELAY,
+    PERSIST_LAZY, PERSIST_CACHE_SIZE, PERSIST_JOURNAL, PERSIST_COMPACT_EVERY,
+    PERSIST_COMPACT_INTERVAL, METRICS_REPORT_INTERVAL, DEFAULT_LOCATION,
+    UPDATE_CONCURRENCY, UPDATE_MAX_PENDING, RATE_LIMIT, RATE_GLOBAL_PER_SEC, RATE_CHAT_PER_SEC,
+    RATE_CHAT_BURST, RATE_GROUP_PER_MIN, RATE_MAX_RETRIES,
     WEBHOOK_URL, PORT, WEBHOOK_PATH
 )
-from .models import ensure_player_ud, Enemy
-from .handlers.registration import register, on_reg_action
+from .models import ensure_player_ud, mark_dirty, Enemy
+from .handlers.registration import register
 from .handlers.battle import (
     CHOOSING_ACTION, ENEMY_TURN, LOOTING,
-    on_battle_action, enemy_turn, after_loot, battle_keyboard
+    enemy_turn, battle_keyboard, auto_battle
 )
-from .handlers.shop import shop, on_shop_action
-from .handlers.travel import travel, on_travel_select
-from .handlers.quest import quest, on_quest_action
-from .handlers.inventory import inventory, on_inv_action
+from .handlers.shop import shop
+from .handlers.travel import travel
+from .handlers.quest import quest
+from .handlers.inventory import inventory
+from .handlers.expedition import expedition
 from .utils.loot import generate_loot
-from .handlers.guild import guild, on_guild_action
+from .utils.battle_engine import new_battle_state
+from .utils.spawns import spawn_enemy
+from .handlers.guild import guild
+from .storage.sqlite import SQLitePersistence
+from .storage.tracking import TrackedUserData
+from .utils.metrics import LoopStallMonitor
+from .utils.reaper import REAPER
+from .utils.updates import PerUserUpdateProcessor
+from .utils.ratelimit import OutboundScheduler
+from .router import ROUTER
 
 
 LOGGER = logging.getLogger("RPG")
 
+LOOP_MONITOR = LoopStallMonitor(report_every=METRICS_REPORT_INTERVAL)
+
 
 def format_stats(p) -> str:
-    inv_counts = {"⚪Звичайні": 0, "🟢Незвичайні": 0, "🔵Рідкісні": 0, "🟣Епічні": 0}
-    for it in p.inventory:
-        r = it.get("rarity", "common")
-        if r == "common":
-            inv_counts["⚪Звичайні"] += 1
-        elif r == "uncommon":
-            inv_counts["🟢Незвичайні"] += 1
-        elif r == "rare":
-            inv_counts["🔵Рідкісні"] += 1
-        elif r == "epic":
-            inv_counts["🟣Епічні"] += 1
-        elif r == "legendary":
-            inv_counts.setdefault("🟡Легендарні", 0)
-            inv_counts["🟡Легендарні"] += 1
+    inv_counts = {
+        "⚪Звичайні": p.inventory.by_rarity["common"],
+        "🟢Незвичайні": p.inventory.by_rarity["uncommon"],
+        "🔵Рідкісні": p.inventory.by_rarity["rare"],
+        "🟣Епічні": p.inventory.by_rarity["epic"],
+        "🟡Легендарні": p.inventory.by_rarity["legendary"],
+    }
     inv_str = ", ".join([f"{k}:{v}" for k, v in inv_counts.items() if v]) or "порожньо"
 
     eq_short = []
@@ -78,7 +88,8 @@ async def start(update, context: ContextTypes.DEFAULT_TYPE):
         "/newgame — почати нову гру\n"
         "/stats — характеристики героя\n"
         "/inventory — інвентар\n"
-        "/explore — вирушити у пригоду\n"
+        "/explore — вирушити у пригоду (/explore auto — з автобоєм)\n"
+        "/expedition N — експедиція з N подій одним звітом\n"
         "/travel — локації\n"
         "/shop — крамниця\n"
         "/quest — квести\n"
@@ -93,7 +104,7 @@ async def help_cmd(update, context):
 
 async def newgame(update, context):
     from .models import Player
-    context.user_data["player"] = Player().asdict()
+    context.user_data["player"] = Player()
     await update.message.reply_html("🆕 <b>Нова пригода розпочата!</b> Ваш герой створений. /register — щоб обрати клас.")
 
 
@@ -107,29 +118,7 @@ def get_location(ud):
 
 
 def spawn_enemy_for(p, location="Тракт") -> Enemy:
-    import random
-    tables = {
-        "Місто": [("П'яний хуліган", 18, 5, 1, 10, 8),
-                  ("Кишеньковий злодій", 20, 6, 2, 12, 12),
-                  ("Шибайголова", 22, 7, 2, 14, 14)],
-        "Тракт": [("Гоблін-набігник", 18, 5, 1, 12, 10),
-                  ("Вовк лісовий", 20, 6, 2, 14, 12),
-                  ("Розбійник тракту", 24, 8, 3, 18, 16)],
-        "Руїни": [("Кістяний вартовий", 22, 7, 2, 16, 14),
-                  ("Орк-берсерк", 28, 9, 3, 22, 20),
-                  ("Рицар-відступник", 32, 10, 4, 26, 24)],
-        "Гільдія авантюристів": [("Сторож гільдії (спаринг)", 18, 6, 2, 8, 0)],
-        "Старий ліс": [("Дикий кабан", 22, 7, 2, 16, 14),
-                       ("Лісовий дух", 24, 8, 3, 20, 18)],
-    }
-    name, base_hp, base_atk, base_def, exp, gold = random.choice(tables.get(location, tables["Тракт"]))
-    hp = base_hp + (p.level - 1) * 4
-    atk = base_atk + (p.level - 1)
-    defense = base_def + (p.level // 3)
-    exp_reward = exp + (p.level - 1) * 3
-    gold_reward = gold + random.randint(0, p.level * 2)
-    return Enemy(name=name, hp=hp, max_hp=hp, atk=atk, defense=defense,
-                 exp_reward=exp_reward, gold_reward=gold_reward)
+    return spawn_enemy(p.level, location)
 
 
 async def explore(update, context):
@@ -139,24 +128,32 @@ async def explore(update, context):
         return ConversationHandler.END
 
     location = get_location(context.user_data)
+    # /explore auto — бій (якщо трапиться) розігрується автоматично
+    auto = bool(context.args) and context.args[0].lower() in ("auto", "авто")
 
     import random as R
     roll = R.random()
     if roll < 0.6:
         enemy = spawn_enemy_for(p, location)
-        context.user_data["enemy"] = enemy.__dict__
+        context.user_data["enemy"] = enemy
         context.user_data["defending"] = False
+        # новий бій — свіжі КД/статуси і власний seed
+        context.user_data["battle_state"] = new_battle_state()
+        REAPER.touch_update(update)
+        if auto:
+            # одне підсумкове повідомлення замість повідомлення на кожен раунд
+            return await auto_battle(update, context)
         await update.message.reply_html(
             f"🔪 [{location}] Ви натрапили на <b>{enemy.name}</b>!\nHP ворога: {enemy.hp}/{enemy.max_hp}",
-            reply_markup=battle_keyboard(p, True, context.user_data.get("battle")),
+            reply_markup=battle_keyboard(p, True, context.user_data["battle_state"]),
         )
         return CHOOSING_ACTION
 
     elif roll < 0.85:
-        item = generate_loot(location)
+        item = generate_loot(location, pity=p.loot_pity)
         p.inventory.append(item)
         p.gold += item.get("gold", 0)
-        context.user_data["player"] = p.asdict()
+        mark_dirty(context.user_data)
         extra = f" (+{item['gold']} золота)" if item.get("gold") else ""
         await update.message.reply_html(
             f"🧰 Знахідка у локації <b>{location}</b>: {item['emoji']} <b>{item['name']}</b> — {item['title']}{extra}!"
@@ -167,7 +164,7 @@ async def explore(update, context):
         import random as R
         healed = min(p.max_hp - p.hp, R.randint(5, 12))
         p.hp += healed
-        context.user_data["player"] = p.asdict()
+        mark_dirty(context.user_data)
         await update.message.reply_html(f"⛺ Відпочинок: +{healed} HP. Тепер {p.hp}/{p.max_hp}.")
         return ConversationHandler.END
 
@@ -180,13 +177,59 @@ async def on_error(update, context):
     LOGGER.exception("Помилка в обробнику", exc_info=context.error)
 
 
-def build_app() -> Application:
+async def on_startup(app: Application) -> None:
+    LOOP_MONITOR.start()
+    REAPER.start()
+
+
+async def on_shutdown(app: Application) -> None:
+    await REAPER.stop()
+    await LOOP_MONITOR.stop()
+
+
+def build_persistence(busy=None):
+    """Обрати бекенд збереження за PERSIST_BACKEND. busy — PerUserUpdateProcessor.busy (для LRU)."""
+    if PERSIST_BACKEND == "sqlite":
+        return SQLitePersistence(
+            filepath=PERSIST_DB,
+            write_delay=PERSIST_WRITE_DELAY,
+            lazy=PERSIST_LAZY,
+            cache_size=PERSIST_CACHE_SIZE,
+            journal=PERSIST_JOURNAL,
+            compact_every=PERSIST_COMPACT_EVERY,
+            compact_interval=PERSIST_COMPACT_INTERVAL,
+            busy=busy,
+        )
+    return PicklePersistence(filepath=PERSIST_FILE)
+
+
+def build_app(base_url: Optional[str] = BOT_API_URL) -> Application:
+    """base_url — інший сервер Bot API замість api.telegram.org (локальний фейк навантажувального тесту)."""
     token = os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("Не знайдено BOT_TOKEN у змінних оточення.")
 
-    persistence = PicklePersistence(filepath=PERSIST_FILE)
-    app = ApplicationBuilder().token(token).persistence(persistence).build()
+    # різні гравці — паралельно, один гравець — по черзі (utils/updates.py)
+    processor = PerUserUpdateProcessor(UPDATE_CONCURRENCY, UPDATE_MAX_PENDING) if UPDATE_CONCURRENCY > 1 else None
+    persistence = build_persistence(busy=processor.busy if processor is not None else None)
+    builder = (
+        ApplicationBuilder().token(token).persistence(persistence)
+        .post_init(on_startup).post_shutdown(on_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if isinstance(persistence, SQLitePersistence):
+        # user_data з версіями — персистентність пропускає гравців без реальних змін
+        builder = builder.context_types(ContextTypes(user_data=TrackedUserData))
+    if processor is not None:
+        builder = builder.concurrent_updates(processor)
+    if RATE_LIMIT:
+        # усі виклики Bot API — через відра чату/бота з пріоритетами (utils/ratelimit.py)
+        builder = builder.rate_limiter(OutboundScheduler(
+            global_rate=RATE_GLOBAL_PER_SEC, chat_rate=RATE_CHAT_PER_SEC, chat_burst=RATE_CHAT_BURST,
+            group_rate=RATE_GROUP_PER_MIN / 60, max_retries=RATE_MAX_RETRIES,
+        ))
+    app = builder.build()
 
     # Команди
     app.add_handler(CommandHandler("start", start))
@@ -197,35 +240,23 @@ def build_app() -> Application:
     app.add_handler(CommandHandler("shop", shop))
     app.add_handler(CommandHandler("travel", travel))
     app.add_handler(CommandHandler("quest", quest))
+    app.add_handler(CommandHandler("expedition", expedition))
     app.add_handler(CommandHandler("register", register))
     app.add_handler(CommandHandler("guild", guild))            
 
-    app.add_handler(CallbackQueryHandler(on_guild_action, pattern=r"^guild:")) 
-
-    # Інвентар callbacks
-    app.add_handler(CallbackQueryHandler(on_inv_action, pattern=r"^inv:"))
-
-    # Магазин callbacks
-    app.add_handler(CallbackQueryHandler(on_shop_action, pattern=r"^shop:"))
-
-    # Реєстрація callbacks
-    app.add_handler(CallbackQueryHandler(on_reg_action, pattern=r"^reg:"))
-
-    # Подорож callbacks
-    app.add_handler(CallbackQueryHandler(on_travel_select, pattern=r"^travel:"))
-
-    # Квести callbacks
-    app.add_handler(CallbackQueryHandler(on_quest_action, pattern=r"^quest:"))
+    # Усі callback'и поза боєм (guild / inv / shop / reg / travel / quest) — один маршрутизатор
+    app.add_handler(ROUTER.handler(exclude=("battle", "continue")))
+    ROUTER.freeze()  # реєстр id для компактних callback_data — до першої клавіатури
 
     # Битва як розмова
     battle_conv = ConversationHandler(
         entry_points=[CommandHandler("explore", explore)],
         states={
             # У бою ловимо тільки callback’и з префіксом "battle:"
-            CHOOSING_ACTION: [CallbackQueryHandler(on_battle_action, pattern=r"^battle:")],
+            CHOOSING_ACTION: [ROUTER.handler("battle")],
             ENEMY_TURN: [],
             # Після бою ловимо рівно "continue"
-            LOOTING: [CallbackQueryHandler(after_loot, pattern=r"^continue$")],
+            LOOTING: [ROUTER.handler("continue")],
         },
         # Додаємо /explore у fallbacks, щоб /explore працював навіть коли розмова активна
         fallbacks=[
@@ -236,6 +267,8 @@ def build_app() -> Application:
         persistent=True,
     )
     app.add_handler(battle_conv)
+    # покинуті бої завершуються спільним таймером (див. utils/reaper.py)
+    REAPER.bind(app, battle_conv)
 
     # Unknown + errors
     app.add_handler(MessageHandler(filters.COMMAND, on_unknown))
@@ -7,7 +7,54 @@ import os
 
 # ---- Бот / збереження -------------------------------------------------------
 BOT_DISPLAY_NAME = os.getenv("BOT_DISPLAY_NAME", "RPG0")
+# Свій сервер Bot API (напр. фейк з rpg0.loadtest): "http://host:port/bot" — токен додається в кінець
+BOT_API_URL = os.getenv("BOT_API_URL")
 PERSIST_FILE = os.getenv("PERSIST_FILE", "rpgbot.pickle")
+# Бекенд збереження: "pickle" (один файл на все) або "sqlite" (рядок на гравця)
+PERSIST_BACKEND = os.getenv("PERSIST_BACKEND", "pickle").lower()
+PERSIST_DB = os.getenv("PERSIST_DB", "rpgbot.sqlite3")
+# Через скільки секунд черга змін скидається в SQLite однією транзакцією
+PERSIST_WRITE_DELAY = float(os.getenv("PERSIST_WRITE_DELAY", "1.0"))
+# Лінивий режим SQLite: гравці вантажаться з бази при першому апдейті
+PERSIST_LAZY = os.getenv("PERSIST_LAZY", "0").lower() in ("1", "true", "yes")
+# Скільки гравців тримати в пам'яті в лінивому режимі (0 — без обмеження)
+PERSIST_CACHE_SIZE = int(os.getenv("PERSIST_CACHE_SIZE", "2000"))
+# Журнал змін замість повних знімків + періодичне згортання
+PERSIST_JOURNAL = os.getenv("PERSIST_JOURNAL", "1").lower() in ("1", "true", "yes")
+PERSIST_COMPACT_EVERY = int(os.getenv("PERSIST_COMPACT_EVERY", "500"))       # записів журналу
+PERSIST_COMPACT_INTERVAL = float(os.getenv("PERSIST_COMPACT_INTERVAL", "600"))  # секунд
+
+# ---- Метрики -----------------------------------------------------------------
+# Як часто логувати затримки event loop (секунди, 0 — не логувати)
+METRICS_REPORT_INTERVAL = float(os.getenv("METRICS_REPORT_INTERVAL", "300"))
+
+# ---- Обробка апдейтів --------------------------------------------------------
+# Скільки апдейтів різних гравців виконувати одночасно (utils/updates.py);
+# апдейти одного гравця завжди йдуть по черзі. 1 — послідовно, як PTB за замовчуванням
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+# Межа апдейтів у роботі та в черзі разом
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "1024"))
+
+# ---- Ліміти Telegram ---------------------------------------------------------
+# Планувальник вихідних запитів (utils/ratelimit.py); 0 — вимкнути
+RATE_LIMIT = os.getenv("RATE_LIMIT", "1").lower() in ("1", "true", "yes")
+RATE_GLOBAL_PER_SEC = float(os.getenv("RATE_GLOBAL_PER_SEC", "30"))
+RATE_CHAT_PER_SEC = float(os.getenv("RATE_CHAT_PER_SEC", "1"))
+RATE_CHAT_BURST = int(os.getenv("RATE_CHAT_BURST", "3"))
+RATE_GROUP_PER_MIN = float(os.getenv("RATE_GROUP_PER_MIN", "20"))
+# Скільки разів повторювати запит після 429 RetryAfter
+RATE_MAX_RETRIES = int(os.getenv("RATE_MAX_RETRIES", "3"))
+
+# ---- Рендер повідомлень ------------------------------------------------------
+# Скільки повідомлень пам'ятати для пропуску однакових редагувань (utils/render.py)
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "10000"))
+# Скільки варіантів клавіатур тримати на кожну фабрику (utils/keyboards.py)
+KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", "1024"))
+
+# ---- Callback-дані -----------------------------------------------------------
+# Компактні callback_data ("~" + base64 з id маршруту/аргументів, utils/callback_codec.py);
+# 0 — лише текстовий формат "простір:дія:аргументи" (він розбирається завжди)
+CALLBACK_COMPACT = os.getenv("CALLBACK_COMPACT", "1").lower() in ("1", "true", "yes")
 
 # ---- Webhook / Render -------------------------------------------------------
 WEBHOOK_URL  = os.getenv("WEBHOOK_URL")             # наприклад: https://your-app.onrender.com
@@ -61,6 +108,66 @@ BACKSTORIES = {
     "Шляхтич":         {"desc": "має статки",            "gold": 50},
 }
 
+# ---- Автобій -------------------------------------------------------------------
+# Пити зілля, коли HP нижче цієї частки максимуму
+AUTO_BATTLE_POTION_HP = float(os.getenv("AUTO_BATTLE_POTION_HP", "0.35"))
+# Тікати, коли HP нижче цієї частки (0 — ніколи)
+AUTO_BATTLE_FLEE_HP = float(os.getenv("AUTO_BATTLE_FLEE_HP", "0.15"))
+# Запобіжник від нескінченного бою
+AUTO_BATTLE_MAX_ROUNDS = int(os.getenv("AUTO_BATTLE_MAX_ROUNDS", "50"))
+# Скільки рядків бойового логу показувати в підсумку
+AUTO_BATTLE_LOG_LINES = int(os.getenv("AUTO_BATTLE_LOG_LINES", "12"))
+
+# ---- Неактивні бої -------------------------------------------------------------
+# Через скільки секунд без дій бій завершується, а його стан прибирається (0 — ніколи)
+BATTLE_IDLE_TTL = float(os.getenv("BATTLE_IDLE_TTL", "1800"))
+BATTLE_REAPER_TICK = float(os.getenv("BATTLE_REAPER_TICK", "15"))    # крок колеса таймера, с
+BATTLE_REAPER_BATCH = int(os.getenv("BATTLE_REAPER_BATCH", "500"))   # гравців за один прохід
+
+# ---- Експедиції ----------------------------------------------------------------
+# Максимум подій за одну /expedition і поріг HP (частка максимуму) для завчасного повернення
+EXPEDITION_MAX_STEPS = int(os.getenv("EXPEDITION_MAX_STEPS", "20"))
+EXPEDITION_STOP_HP = float(os.getenv("EXPEDITION_STOP_HP", "0.3"))
+
+# ---- Вороги за локаціями ---------------------------------------------------
+# (ім'я, HP, ATK, DEF, EXP, золото[, опції]) — базові значення для 1 рівня гравця.
+# Опції (необов'язково): {"weight": 0.2, "tier": "elite", "levels": (5, 20)} —
+# вага появи, ранг ворога і діапазон рівнів гравця (див. utils/spawns.py).
+ENEMY_TABLES = {
+    "Місто": [("П'яний хуліган", 18, 5, 1, 10, 8),
+              ("Кишеньковий злодій", 20, 6, 2, 12, 12),
+              ("Шибайголова", 22, 7, 2, 14, 14)],
+    "Тракт": [("Гоблін-набігник", 18, 5, 1, 12, 10),
+              ("Вовк лісовий", 20, 6, 2, 14, 12),
+              ("Розбійник тракту", 24, 8, 3, 18, 16)],
+    "Руїни": [("Кістяний вартовий", 22, 7, 2, 16, 14),
+              ("Орк-берсерк", 28, 9, 3, 22, 20),
+              ("Рицар-відступник", 32, 10, 4, 26, 24)],
+    "Гільдія авантюристів": [("Сторож гільдії (спаринг)", 18, 6, 2, 8, 0)],
+    "Старий ліс": [("Дикий кабан", 22, 7, 2, 16, 14),
+                   ("Лісовий дух", 24, 8, 3, 20, 18)],
+}
+
+# Ранги ворогів: множники характеристик/нагороди і префікс імені
+ENEMY_TIERS = {
+    "normal": {},
+    "elite": {"hp": 1.5, "atk": 1.25, "defense": 1.25, "reward": 2.0, "prefix": "⭐ "},
+    "rare":  {"hp": 1.3, "atk": 1.1, "defense": 1.1, "reward": 3.0, "prefix": "✨ "},
+}
+
+# ---- Лут ---------------------------------------------------------------------
+# Ваги рідкості луту за рангом ворога (знахідки в локації — "normal"), див. utils/loot.py
+LOOT_RARITY_WEIGHTS = {
+    "normal": {"common": 60, "uncommon": 25, "rare": 12, "epic": 3},
+    "elite":  {"common": 35, "uncommon": 35, "rare": 20, "epic": 8, "legendary": 2},
+    "rare":   {"common": 20, "uncommon": 35, "rare": 28, "epic": 13, "legendary": 4},
+}
+# Pity: скільки дропів поспіль без рідкості (або вищої), щоб наступний був гарантовано нею (0 — вимкнено)
+LOOT_PITY = {
+    "rare": int(os.getenv("LOOT_PITY_RARE", "20")),
+    "epic": int(os.getenv("LOOT_PITY_EPIC", "60")),
+}
+
 # ---- Гільдія / вміння ------------------------------------------------------
 # Скільки активних умінь можна брати в бій одночасно
 SKILL_SLOT_MAX = 3
@@ -1,44 +1,33 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import random
-from typing import Tuple
-
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes, ConversationHandler
 
-from ..models import dict_to_player, dict_to_enemy
+from ..config import AUTO_BATTLE_LOG_LINES
+from ..models import ensure_player_ud, get_enemy_ud, mark_dirty
 from ..utils.loot import generate_loot
-from ..utils.skills import (
-    apply_skill,
-    turn_tick_cooldowns,
-    apply_start_of_enemy_turn_effects,
-    enemy_is_stunned,
-    consume_player_temp_buffs,
-    clear_player_def_buff_after_enemy_turn,
+from ..utils.battle_engine import (
+    BattleEngine,
+    BattleEvent,
+    roll_damage,  # noqa: F401 — реекспорт для старих імпортів
+    roll_player_attack,  # noqa: F401
+    WON,
+    LOST,
+    FLED,
+    INVALID,
 )
+from ..utils.autobattle import run_auto
+from ..utils.render import safe_edit
+from ..utils.keyboards import cached_keyboard, markup
+from ..utils.reaper import REAPER
+from ..router import ROUTER, WILDCARD
+from ..utils.callback_codec import SKILL
 
 # Стани розмови
 CHOOSING_ACTION, ENEMY_TURN, LOOTING = range(3)
 
-# ----- Кубики -----
-
-def roll_damage(atk: int, defense: int) -> int:
-    """Базовий підрахунок шкоди: (atk - def) з невеликою варіацією, мінімум 1."""
-    base = max(0, atk - defense)
-    variance = random.randint(-2, 2)
-    return max(1, base + variance)
-
-def roll_player_attack(atk: int, defense: int) -> Tuple[int, bool]:
-    """Атака гравця з 15% критом (×2)."""
-    crit = random.random() < 0.15
-    dmg = roll_damage(atk, defense)
-    if crit:
-        dmg *= 2
-    return dmg, crit
-
-
 # ----- Допоміжні рендери та клавіатури -----
 
 def _render_battle_header(p, e) -> str:
@@ -48,248 +37,240 @@ def _render_battle_header(p, e) -> str:
         f"👹 Ворог: {e.name} — HP {e.hp}/{e.max_hp} | ATK {e.atk} DEF {e.defense}\n"
     )
 
-def _skill_cd_label(bstate: dict, name: str) -> str:
-    cd = bstate.setdefault("cooldowns", {}).get(name, 0) or 0
-    return f"✨ {name} (КД {int(cd)})" if cd > 0 else f"✨ {name}"
+def _skill_cd_label(name: str, cd: int) -> str:
+    return f"✨ {name} (КД {cd})" if cd > 0 else f"✨ {name}"
 
-def battle_keyboard(p=None, in_battle: bool = True, battle_state: dict | None = None) -> InlineKeyboardMarkup:
-    """
-    Головна бойова клавіатура. Показує до 3х умінь з лоадауту гравця з КД.
-    """
+@cached_keyboard
+def _battle_markup(skills: tuple) -> InlineKeyboardMarkup:
+    """skills — ((назва, КД), ...) з лоадауту; однакові набори ділять одну розмітку."""
+    data = ROUTER.data
     rows = [
-        [InlineKeyboardButton("🗡️ Атака", callback_data="battle:attack")],
-        [InlineKeyboardButton("🛡️ Захист", callback_data="battle:defend")],
-        [InlineKeyboardButton("🧪 Зілля", callback_data="battle:potion")],
-        [InlineKeyboardButton("🏃 Втекти", callback_data="battle:run")],
+        (("🗡️ Атака", data("battle", "attack")),),
+        *(((_skill_cd_label(name, cd), data("battle", "skill", name)),) for name, cd in skills),
+        (("🛡️ Захист", data("battle", "defend")),),
+        (("🧪 Зілля", data("battle", "potion")),),
+        (("🤖 Автобій", data("battle", "auto")),),
+        (("🏃 Втекти", data("battle", "run")),),
     ]
+    return markup(rows)
 
+def battle_keyboard(p=None, in_battle: bool = True, battle_state: dict | None = None) -> InlineKeyboardMarkup:
+    """
+    Головна бойова клавіатура. Показує до 3х умінь з лоадауту гравця з КД
+    (блок умінь — одразу під атакою).
+    """
+    skills = ()
     if p is not None:
-        load = list(getattr(p, "skills_loadout", []) or [])[:3]
-        if load:
-            skill_buttons = []
-            for name in load:
-                label = _skill_cd_label(battle_state or {}, name)
-                skill_buttons.append([InlineKeyboardButton(label, callback_data=f"battle:skill:{name}")])
-            # Вставимо блок умінь на друге місце, щоб були одразу під атакою
-            rows = [rows[0]] + skill_buttons + rows[1:]
+        cds = (battle_state or {}).setdefault("cooldowns", {})
+        skills = tuple((name, max(0, int(cds.get(name, 0) or 0)))
+                       for name in list(getattr(p, "skills_loadout", []) or [])[:3])
+    return _battle_markup(skills)
+
 
-    return InlineKeyboardMarkup(rows)
+# ----- Адаптер над BattleEngine -----
+
+def _engine(context: ContextTypes.DEFAULT_TYPE) -> BattleEngine:
+    p = ensure_player_ud(context.user_data)
+    e = get_enemy_ud(context.user_data)
+    b = context.user_data.setdefault("battle_state", {})
+    mark_dirty(context.user_data, "player", "enemy")  # рушій змінює обох на місці
+    return BattleEngine(p, e, b)
+
+def render_event(ev: BattleEvent) -> str:
+    """Подія рушія -> рядок бойового логу."""
+    if ev.kind == "attack":
+        return f"🗡️ Ви атакуєте ворога та завдаєте {ev.value} шкоди{' (КРИТ!)' if ev.crit else ''}."
+    if ev.kind == "defend":
+        return f"🛡️ Ви займаєте оборонну стійку: +{ev.value} до захисту на цей раунд."
+    if ev.kind == "potion":
+        return f"🧪 Ви випиваєте зілля та відновлюєте {ev.value} HP."
+    if ev.kind == "run":
+        return "🏃 Ви успішно втекли з бою." if ev.ok else "🏃 Спроба втечі невдала!"
+    if ev.kind == "enemy_attack":
+        return f"🗡️ Ворог атакує вас та завдає {ev.value} шкоди."
+    if ev.kind == "stunned":
+        return "😵 Ворог оглушений і пропускає хід!"
+    if ev.kind == "enemy_defeated":
+        return "💀 Ворог переможений!"
+    if ev.kind == "player_defeated":
+        return "💀 Ви впали в бою…"
+    # skill / effect / invalid — текст уже готовий
+    return ev.text
+
+async def _show(update: Update, text: str, kb: InlineKeyboardMarkup | None = None) -> None:
+    q = update.callback_query
+    if q:
+        await safe_edit(q, text, parse_mode=ParseMode.HTML, reply_markup=kb)
+    else:
+        await update.message.reply_html(text, reply_markup=kb)
 
 
 # ----- Головний хендлер дій гравця -----
 
-async def on_battle_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def battle_action(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str, arg: str = "") -> int:
     """
-    Обробляє всі callback'и 'battle:*' у хід гравця.
+    Дія гравця в його хід (маршрути 'battle:*').
     ПІСЛЯ КОЖНОЇ ДІЇ ГРАВЦЯ переходимо в enemy_turn(update, context),
     де В КІНЦІ відбудеться ЄДИНИЙ тік кулдаунів.
     """
     q = update.callback_query
-    data = q.data if q else None
     if q:
         await q.answer()
+    REAPER.touch_update(update)
 
-    p = dict_to_player(context.user_data.get("player"))
-    e = dict_to_enemy(context.user_data.get("enemy"))
-    b = context.user_data.setdefault("battle_state", {})
-
+    eng = _engine(context)
+    p, e, b = eng.player, eng.enemy, eng.state
     header = _render_battle_header(p, e)
 
-    if not data or not data.startswith("battle:"):
+    if not action:
         # Невідомо — просто оновимо основне меню
-        kb = battle_keyboard(p, True, b)
-        if q:
-            await q.edit_message_text(header + "\nВаш хід — оберіть дію.", parse_mode=ParseMode.HTML, reply_markup=kb)
-        else:
-            await update.message.reply_html(header + "\nВаш хід — оберіть дію.", reply_markup=kb)
+        await _show(update, header + "\nВаш хід — оберіть дію.", battle_keyboard(p, True, b))
         return CHOOSING_ACTION
 
-    _, action, *rest = data.split(":", 2)
+    if action == "auto":
+        return await auto_battle(update, context)
+    res = eng.player_action(action, arg.strip())
 
-    # ---- Атака ----
-    if action == "attack":
-        atk_b, _def_b = consume_player_temp_buffs(p, b)
-        dmg, crit = roll_player_attack(p.atk + atk_b, e.defense)
-        e.hp -= dmg
-        context.user_data["player"] = p.asdict()
-        context.user_data["enemy"] = e.asdict()
-
-        text = header + f"\n🗡️ Ви атакуєте ворога та завдаєте {dmg} шкоди{' (КРИТ!)' if crit else ''}."
-
-        # Перевірка смерті ворога від удару гравця
-        if e.hp <= 0:
-            return await _on_enemy_defeated(update, context, text)
-
-        # ПЕРЕХІД НА ХІД ВОРОГА (без тіку КД тут)
-        context.user_data["last_log"] = text
-        return await enemy_turn(update, context)
-
-    # ---- Захист ----
-    if action == "defend":
-        pst = b.setdefault("p_status", {})
-        pst["def_up"] = 1
-        pst["def_up_val"] = max(2, int(p.level / 2) + 1)
-        context.user_data["battle_state"] = b
-
-        text = header + f"\n🛡️ Ви займаєте оборонну стійку: +{pst['def_up_val']} до захисту на цей раунд."
-        context.user_data["last_log"] = text
-        return await enemy_turn(update, context)
-
-    # ---- Зілля ----
-    if action == "potion":
-        healed = min(p.max_hp - p.hp, 8)
-        p.hp += healed
-        context.user_data["player"] = p.asdict()
-
-        text = header + f"\n🧪 Ви випиваєте зілля та відновлюєте {healed} HP."
-        context.user_data["last_log"] = text
-        return await enemy_turn(update, context)
-
-    # ---- Втеча ----
-    if action == "run":
-        if random.random() < 0.5:
-            msg = header + "\n🏃 Ви успішно втекли з бою."
-            if q:
-                await q.edit_message_text(msg, parse_mode=ParseMode.HTML)
-            else:
-                await update.message.reply_html(msg)
-            return ConversationHandler.END
-        else:
-            text = header + "\n🏃 Спроба втечі невдала!"
-            context.user_data["last_log"] = text
-            return await enemy_turn(update, context)
-
-    # ---- Уміння ----
-    if action == "skill":
-        skill_name = (rest[0] if rest else "").strip()
-        if not skill_name:
-            # Якщо натиснули кнопку без назви (не повинно статись) — повертаємося до меню
-            kb = battle_keyboard(p, True, b)
-            if q:
-                await q.edit_message_text(header + "\nВаш хід — оберіть дію.", parse_mode=ParseMode.HTML, reply_markup=kb)
-            else:
-                await update.message.reply_html(header + "\nВаш хід — оберіть дію.", reply_markup=kb)
-            return CHOOSING_ACTION
-
-        # Перевірка: чи в лоадауті
-        load = list(getattr(p, "skills_loadout", []) or [])
-        if skill_name not in load:
-            txt = header + "\nЦе уміння не входить до вашого активного набору."
-            kb = battle_keyboard(p, True, b)
-            if q:
-                await q.edit_message_text(txt, parse_mode=ParseMode.HTML, reply_markup=kb)
-            else:
-                await update.message.reply_html(txt, reply_markup=kb)
-            return CHOOSING_ACTION
-
-        # Виконуємо уміння (ставить КД всередині)
-        effect_text = apply_skill(p, e, skill_name, b)
-        context.user_data["player"] = p.asdict()
-        context.user_data["enemy"] = e.asdict()
-        context.user_data["battle_state"] = b
-
-        text = header + f"\n{effect_text}"
-
-        # Якщо ворог помер одразу
-        if e.hp <= 0:
-            return await _on_enemy_defeated(update, context, text)
-
-        # ПЕРЕХІД НА ХІД ВОРОГА (без тіку КД тут)
-        context.user_data["last_log"] = text
-        return await enemy_turn(update, context)
-
-    # Фолбек
-    kb = battle_keyboard(p, True, b)
-    if q:
-        await q.edit_message_text(header + "\nНевідома бойова дія.", parse_mode=ParseMode.HTML, reply_markup=kb)
-    else:
-        await update.message.reply_html(header + "\nНевідома бойова дія.", reply_markup=kb)
-    return CHOOSING_ACTION
+    if res.outcome == INVALID:
+        msg = res.events[0].text or "Ваш хід — оберіть дію."
+        await _show(update, header + "\n" + msg, battle_keyboard(p, True, b))
+        return CHOOSING_ACTION
 
+    text = header + "\n" + render_event(res.events[0])
+    if res.outcome == WON:
+        return await _on_enemy_defeated(update, context, text)
+    if res.outcome == FLED:
+        await _show(update, text)
+        return ConversationHandler.END
 
-# ----- Хід ворога -----
+    # ПЕРЕХІД НА ХІД ВОРОГА (без тіку КД тут)
+    context.user_data["last_log"] = text
+    return await enemy_turn(update, context)
 
-async def enemy_turn(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """
-    Повний хід ворога:
-    1) старт-ефекти (кровотеча тощо)
-    2) перевірка оглушення
-    3) атака ворога
-    4) скидання одноходового DEF-бафу
-    5) ЄДИНИЙ тік кулдаунів наприкінці
-    """
+
+async def on_battle_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Сумісність: розбирає callback_data сам (для викликів поза маршрутизатором)."""
     q = update.callback_query
-    if q:
-        await q.answer()
+    data = q.data if q else None
+    if not data or not data.startswith("battle:"):
+        return await battle_action(update, context, "")
+    _, action, *rest = data.split(":", 2)
+    return await battle_action(update, context, action, rest[0] if rest else "")
 
-    p = dict_to_player(context.user_data.get("player"))
-    e = dict_to_enemy(context.user_data.get("enemy"))
-    b = context.user_data.setdefault("battle_state", {})
 
-    header = _render_battle_header(p, e)
-    info = []
-
-    # Додамо лог попереднього повідомлення (дія гравця), якщо є
-    prev = context.user_data.pop("last_log", "")
-    if prev:
-        # При редагуванні старого меседжа prev вже містить header, тому виведемо тільки коментар без повторного header
-        # але простіше (і чистіше) виводити свіжий header та коротку суть
-        # Тож лишаємо info тільки з короткими рядками поточного ходу ворога
-        pass
-
-    # (1) стартовi ефекти ворога
-    start_txt = apply_start_of_enemy_turn_effects(e, b)
-    if start_txt:
-        info.append(start_txt)
-    context.user_data["enemy"] = e.asdict()
-
-    if e.hp <= 0:
-        text = header + ("\n".join(info) + "\n\n💀 Ворог переможений!" if info else "\n\n💀 Ворог переможений!")
-        return await _on_enemy_defeated(update, context, text, already_formatted=True)
+# Маршрути: окремий на кожну дію — щоб лічильники показували, чим саме грають.
+# Бойові хендлери відповідають на query самі (answer=False).
+def _battle_route(action: str):
+    async def route(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        return await battle_action(update, context, action)
+    route.__name__ = f"battle_{action}"
+    return route
 
-    # (2) оглушення
-    if enemy_is_stunned(b):
-        # Кінець раунду — ТІЛЬКИ ТУТ тік кулдаунів
-        turn_tick_cooldowns(b)
-        context.user_data["battle_state"] = b
-        text = header + ("\n".join(info) + "\n\n😵 Ворог оглушений і пропускає хід!" if info else "\n😵 Ворог оглушений і пропускає хід!")
-        kb = battle_keyboard(p, True, b)
-        if q:
-            await q.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=kb)
-        else:
-            await update.message.reply_html(text, reply_markup=kb)
-        return CHOOSING_ACTION
 
-    # (3) атака ворога (враховуємо одноходовий DEF-баф)
-    def_up = b.get("p_status", {}).get("def_up_val", 0) if b.get("p_status", {}).get("def_up") else 0
-    dmg = max(1, roll_damage(e.atk, p.defense + def_up))
-    p.hp -= dmg
-    context.user_data["player"] = p.asdict()
-    info.append(f"🗡️ Ворог атакує вас та завдає {dmg} шкоди.")
+for _action in ("attack", "defend", "potion", "run", "auto"):
+    ROUTER.add("battle", _action, _battle_route(_action), answer=False)
+
+
+@ROUTER.route("battle", "skill", SKILL, answer=False)
+async def battle_skill(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str) -> int:
+    return await battle_action(update, context, "skill", name)
+
+
+@ROUTER.route("battle", WILDCARD, str, answer=False)
+async def battle_other(update: Update, context: ContextTypes.DEFAULT_TYPE, rest: str) -> int:
+    """Решта дій (невідомі, кнопки луту) — рушій поверне «Невідома бойова дія.»."""
+    action, _, arg = rest.partition(":")
+    return await battle_action(update, context, action, arg)
+
+
+# ----- Хід ворога -----
+
+async def enemy_turn(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Хід ворога (правила — BattleEngine.enemy_turn), тут лише відмальовка. На query вже відповів battle_action."""
+    eng = _engine(context)
+    p, e, b = eng.player, eng.enemy, eng.state
+    header = _render_battle_header(p, e)
 
-    # (4) кінець ходу ворога — скинемо одноходовий DEF-баф
-    clear_player_def_buff_after_enemy_turn(b)
+    # Лог дії гравця не дублюємо: показуємо свіжий header і короткі рядки ходу ворога
+    context.user_data.pop("last_log", "")
 
-    # (5) ЄДИНИЙ тік кулдаунів
-    turn_tick_cooldowns(b)
-    context.user_data["battle_state"] = b
+    res = eng.enemy_turn()
+    info = [render_event(ev) for ev in res.events
+            if ev.kind not in ("stunned", "enemy_defeated", "player_defeated")]
+    stunned = any(ev.kind == "stunned" for ev in res.events)
 
-    # Перевірка смерті гравця
-    if p.hp <= 0:
+    if res.outcome == WON:
+        text = header + ("\n".join(info) + "\n\n💀 Ворог переможений!" if info else "\n\n💀 Ворог переможений!")
+        return await _on_enemy_defeated(update, context, text, already_formatted=True)
+
+    if res.outcome == LOST:
         text = header + ("\n".join(info) + "\n\n💀 Ви впали в бою…" if info else "\n\n💀 Ви впали в бою…")
-        if q:
-            await q.edit_message_text(text, parse_mode=ParseMode.HTML)
-        else:
-            await update.message.reply_html(text)
+        await _show(update, text)
         return ConversationHandler.END
 
     # Повертаємо хід гравцеві
-    text = header + ("\n".join(info) + "\n\nВаш хід — оберіть дію." if info else "\nВаш хід — оберіть дію.")
-    kb = battle_keyboard(p, True, b)
-    if q:
-        await q.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=kb)
-    else:
-        await update.message.reply_html(text, reply_markup=kb)
+    last = "😵 Ворог оглушений і пропускає хід!" if stunned else "Ваш хід — оберіть дію."
+    text = header + ("\n".join(info) + "\n\n" + last if info else "\n" + last)
+    await _show(update, text, battle_keyboard(p, True, b))
+    return CHOOSING_ACTION
+
+
+# ----- Автобій -----
+
+def _short_event(ev: BattleEvent) -> str:
+    """Стислий запис події для логу автобою."""
+    if ev.kind == "attack":
+        return f"🗡️{ev.value}{'‼️' if ev.crit else ''}"
+    if ev.kind == "skill":
+        return f"✨{ev.name}"
+    if ev.kind == "potion":
+        return f"🧪+{ev.value}"
+    if ev.kind == "defend":
+        return "🛡️"
+    if ev.kind == "run":
+        return "🏃✓" if ev.ok else "🏃✗"
+    if ev.kind == "effect":
+        return f"{ev.text.split(' ', 1)[0]}{ev.value}"
+    if ev.kind == "stunned":
+        return "😵"
+    if ev.kind == "enemy_attack":
+        return f"👹{ev.value}"
+    return ""
+
+def render_auto_log(log: list) -> str:
+    lines = []
+    for i, events in enumerate(log, 1):
+        parts = [s for s in (_short_event(ev) for ev in events) if s]
+        lines.append(f"{i}. " + " · ".join(parts))
+    if len(lines) > AUTO_BATTLE_LOG_LINES:
+        head = AUTO_BATTLE_LOG_LINES // 3
+        tail = AUTO_BATTLE_LOG_LINES - head - 1
+        lines = lines[:head] + [f"… ще {len(lines) - head - tail} р. …"] + lines[-tail:]
+    return "\n".join(lines)
+
+async def auto_battle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """
+    Розіграти весь бій на сервері й надіслати одне підсумкове повідомлення.
+    На query тут не відповідаємо: з кнопки сюди приходять лише через
+    battle_action, який уже відповів (повторний answer — зайвий запит до API).
+    """
+    eng = _engine(context)
+    p, e, b = eng.player, eng.enemy, eng.state
+    header = _render_battle_header(p, e)
+    res = run_auto(eng)
+
+    text = (header + f"\n🤖 Автобій, раундів: {res.rounds}\n" + render_auto_log(res.log)
+            + f"\n\nHP {p.hp}/{p.max_hp} | ворог {max(0, e.hp)}/{e.max_hp} | зілля {p.potions}")
+    if res.outcome == WON:
+        return await _on_enemy_defeated(update, context, text)
+    if res.outcome == LOST:
+        await _show(update, text + "\n\n💀 Ви впали в бою…")
+        return ConversationHandler.END
+    if res.outcome == FLED:
+        await _show(update, text + "\n\n🏃 Ви успішно втекли з бою.")
+        return ConversationHandler.END
+    # ліміт раундів — повертаємо керування гравцеві
+    await _show(update, text + "\n\nБій затягнувся — оберіть дію.", battle_keyboard(p, True, b))
     return CHOOSING_ACTION
 
 
@@ -299,16 +280,20 @@ async def _on_enemy_defeated(update: Update, context: ContextTypes.DEFAULT_TYPE,
     """Екран перемоги + лут."""
     q = update.callback_query
 
-    loot = generate_loot(context.user_data.get("location", ""))
+    p = ensure_player_ud(context.user_data)
+    e = get_enemy_ud(context.user_data)
+    loot = generate_loot(context.user_data.get("location", ""), tier=getattr(e, "tier", "normal"),
+                         pity=p.loot_pity)
+    mark_dirty(context.user_data)  # лічильники pity
     kb = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🎒 Забрати лут", callback_data="battle:take_loot")],
-        [InlineKeyboardButton("➡️ Далі", callback_data="battle:after_loot")],
+        [InlineKeyboardButton("🎒 Забрати лут", callback_data=ROUTER.data("battle", "take_loot"))],
+        [InlineKeyboardButton("➡️ Далі", callback_data=ROUTER.data("battle", "after_loot"))],
     ])
     context.user_data["loot_pending"] = loot
 
     if q:
-        await q.edit_message_text(text if already_formatted else (text + "\n\n💀 Ворог переможений!"),
-                                  parse_mode=ParseMode.HTML, reply_markup=kb)
+        await safe_edit(q, text if already_formatted else (text + "\n\n💀 Ворог переможений!"),
+                        parse_mode=ParseMode.HTML, reply_markup=kb)
     else:
         await update.message.reply_html(text if already_formatted else (text + "\n\n💀 Ворог переможений!"),
                                         reply_markup=kb)
@@ -317,11 +302,13 @@ async def _on_enemy_defeated(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
 # Після лута / завершення бою
 
+@ROUTER.route("continue", answer=False)
 async def after_loot(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     q = update.callback_query
+    REAPER.touch_update(update)
     if q:
         await q.answer()
-        await q.edit_message_text("➡️ Продовжуємо пригоду! Використайте /explore.")
+        await safe_edit(q, "➡️ Продовжуємо пригоду! Використайте /explore.")
     else:
         await update.message.reply_text("➡️ Продовжуємо пригоду! Використайте /explore.")
     return ConversationHandler.END
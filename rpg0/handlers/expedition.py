@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+/expedition N — N подій /explore за одну команду з одним підсумком.
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+from ..config import DEFAULT_LOCATION, EXPEDITION_MAX_STEPS, LOC_SHOP
+from ..models import ensure_player_ud, mark_dirty
+from ..utils.expedition import run_expedition, STOP_LOW_HP, STOP_DEFEAT
+
+RARITY_ORDER = ("legendary", "epic", "rare", "uncommon", "common")
+
+def render_report(rep, location: str, asked: int) -> str:
+    lines = [f"🧭 Експедиція: <b>{location}</b> — подій {rep.steps}/{asked}"]
+    lines.append(f"⚔️ Боїв: перемог {rep.won}, втеч {rep.fled}, поразок {rep.lost}")
+    if rep.kills:
+        lines.append("   " + ", ".join(f"{name}×{n}" for name, n in rep.kills.most_common()))
+    if rep.rests:
+        lines.append(f"⛺ Привалів: {rep.rests} (+{rep.healed} HP)")
+    if rep.items:
+        items = sorted(rep.items, key=lambda it: RARITY_ORDER.index(it.get("rarity", "common")))
+        shown = ", ".join(f"{it['emoji']}{it['name']}" for it in items[:8])
+        more = f" і ще {len(items) - 8}" if len(items) > 8 else ""
+        lines.append(f"🧰 Знахідки ({len(items)}): {shown}{more}")
+    lines.append(f"💰 Золото: +{rep.gold} | ✨ EXP: +{rep.exp}")
+    lu = rep.level_up
+    if lu and lu.levels:
+        lines.append(f"🆙 Рівень {lu.start_level} → {lu.level} (+{lu.max_hp} HP, +{lu.atk} ATK, +{lu.defense} DEF)")
+        if lu.skill_levels:
+            lines.append("📚 Доступне нове вміння — завітайте до /guild.")
+    if rep.stopped == STOP_LOW_HP:
+        lines.append("🩹 Повернулися раніше: мало HP.")
+    elif rep.stopped == STOP_DEFEAT:
+        lines.append("💀 Експедицію перервано поразкою.")
+    return "\n".join(lines)
+
+async def expedition(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    p = ensure_player_ud(context.user_data)
+    if not p.registered:
+        await update.message.reply_html("Спершу зареєструйтесь у гільдії: /register")
+        return
+    location = context.user_data.get("location", DEFAULT_LOCATION)
+    if location == LOC_SHOP:
+        await update.message.reply_html("У крамниці пригод немає — вийдіть до Міста.")
+        return
+    try:
+        steps = int(context.args[0]) if context.args else 5
+    except ValueError:
+        await update.message.reply_html(f"Використання: /expedition N (1–{EXPEDITION_MAX_STEPS})")
+        return
+    steps = max(1, min(EXPEDITION_MAX_STEPS, steps))
+
+    rep = run_expedition(p, location, steps)
+    mark_dirty(context.user_data)
+    text = render_report(rep, location, steps) + f"\n\n❤️ HP: {p.hp}/{p.max_hp} | 🧪 Зілля: {p.potions} | 💰 {p.gold}"
+    await update.message.reply_html(text)
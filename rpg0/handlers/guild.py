@@ -6,23 +6,39 @@ from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
 from ..config import LOC_GUILD, SKILL_SLOT_MAX, GUILD_RESPEC_COST
-from ..models import ensure_player_ud
+from ..models import ensure_player_ud, mark_dirty
 from ..utils.skills import CLASS_SKILLS, skill_short_desc
+from ..utils.render import safe_edit
+from ..utils.keyboards import cached_keyboard, column
+from ..router import ROUTER, WILDCARD
+from ..utils.callback_codec import SKILL
 
 
 def _kb(options, prefix: str | None = None) -> InlineKeyboardMarkup:
     """
-    Будує одноколонкову Inline-клавіатуру.
+    Будує одноколонкову Inline-клавіатуру (з кешу — одна розмітка на набір опцій).
     options: iterable[(text, data)]
     Якщо prefix передано — додає його як "prefix:data", інакше бере data як є.
     """
-    def cb(data: str) -> str:
-        return f"{prefix}:{data}" if prefix else data
+    return column(tuple(options), prefix)
 
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(txt, callback_data=cb(data))]
-        for txt, data in options
-    ])
+
+@cached_keyboard
+def _menu_kb(has_known: bool, has_loadout: bool, pending: bool) -> InlineKeyboardMarkup:
+    rows = []
+    # Додати/зняти з лоадауту
+    if has_known:
+        rows.append([InlineKeyboardButton("➕ Додати в лоадаут", callback_data=ROUTER.data("guild", "add"))])
+    if has_loadout:
+        rows.append([InlineKeyboardButton("➖ Зняти з лоадауту", callback_data=ROUTER.data("guild", "remove"))])
+
+    # Навчитися новому (якщо є право вибору)
+    if pending:
+        rows.append([InlineKeyboardButton("🆕 Вивчити нове вміння", callback_data=ROUTER.data("guild", "learn"))])
+
+    # Скинути лоадаут (платно/за ресурс, опційно)
+    rows.append([InlineKeyboardButton(f"♻️ Скинути лоадаут (−{GUILD_RESPEC_COST}з)", callback_data=ROUTER.data("guild", "respec"))])
+    return InlineKeyboardMarkup(rows)
 
 
 def _render_loadout(p) -> str:
@@ -71,134 +87,156 @@ async def guild(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         _render_known(p),
     ]
 
-    rows = []
-    # Додати/зняти з лоадауту
-    if known:
-        rows.append([InlineKeyboardButton("➕ Додати в лоадаут", callback_data="guild:add")])
-    if loadout:
-        rows.append([InlineKeyboardButton("➖ Зняти з лоадауту", callback_data="guild:remove")])
+    kb = _menu_kb(bool(known), bool(loadout), pending)
+    await update.message.reply_html("\n".join(text), reply_markup=kb)
 
-    # Навчитися новому (якщо є право вибору)
-    if pending:
-        rows.append([InlineKeyboardButton("🆕 Вивчити нове вміння", callback_data="guild:learn")])
 
-    # Скинути лоадаут (платно/за ресурс, опційно)
-    rows.append([InlineKeyboardButton(f"♻️ Скинути лоадаут (−{GUILD_RESPEC_COST}з)", callback_data="guild:respec")])
+# ---- Callback'и (маршрути guild:*) ----
 
-    kb = InlineKeyboardMarkup(rows) if rows else None
-    await update.message.reply_html("\n".join(text), reply_markup=kb)
+async def _require_guild(q, context) -> bool:
+    if not _in_guild(context):
+        await safe_edit(q, f"Ви не в {LOC_GUILD}. Зайдіть туди через /travel.")
+        return False
+    return True
 
 
-async def on_guild_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Callback-логіка гільдії."""
+@ROUTER.route("guild", "add")
+async def guild_add(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Підменю додавання до лоадауту."""
     q = update.callback_query
-    await q.answer()
+    if not await _require_guild(q, context):
+        return
     p = ensure_player_ud(context.user_data)
-    data = q.data  # guild:*
+    known = list(getattr(p, "skills_known", []) or [])
+    loadout = list(getattr(p, "skills_loadout", []) or [])
+    free = [s for s in known if s not in loadout]
+    if not free:
+        await safe_edit(q, "Немає доступних умінь, які можна додати.", parse_mode=ParseMode.HTML)
+        return
+    opts = [(f"➕ {s}", ROUTER.data("guild", "addpick", s)) for s in free]
+    await safe_edit(
+        q,
+        "Оберіть уміння для додавання до активного набору:",
+        reply_markup=_kb(opts),  # без префікса — callback_data залишаються як у opts
+    )
 
-    if not _in_guild(context):
-        await q.edit_message_text(f"Ви не в {LOC_GUILD}. Зайдіть туди через /travel.")
-        return
-
-    # Підменю додавання до лоадауту
-    if data == "guild:add":
-        known = list(getattr(p, "skills_known", []) or [])
-        loadout = list(getattr(p, "skills_loadout", []) or [])
-        free = [s for s in known if s not in loadout]
-        if not free:
-            await q.edit_message_text("Немає доступних умінь, які можна додати.", parse_mode=ParseMode.HTML)
-            return
-        opts = [(f"➕ {s}", f"guild:addpick:{s}") for s in free]
-        await q.edit_message_text(
-            "Оберіть уміння для додавання до активного набору:",
-            reply_markup=_kb(opts),  # без префікса — callback_data залишаються як у opts
-        )
+
+@ROUTER.route("guild", "addpick", SKILL)
+async def guild_add_pick(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str) -> None:
+    q = update.callback_query
+    if not await _require_guild(q, context):
         return
+    p = ensure_player_ud(context.user_data)
+    loadout = list(getattr(p, "skills_loadout", []) or [])
+    if name in loadout:
+        await safe_edit(q, "Це уміння вже в наборі.", parse_mode=ParseMode.HTML)
+        return
+    if len(loadout) >= SKILL_SLOT_MAX:
+        await safe_edit(q, f"Досягнуто ліміт {SKILL_SLOT_MAX} активних умінь.", parse_mode=ParseMode.HTML)
+        return
+    loadout.append(name)
+    p.skills_loadout = loadout
+    mark_dirty(context.user_data)
+    await safe_edit(q, f"✅ Додано в лоадаут: <b>{name}</b>.", parse_mode=ParseMode.HTML)
 
-    if data.startswith("guild:addpick:"):
-        name = data.split(":", 2)[2]
-        loadout = list(getattr(p, "skills_loadout", []) or [])
-        if name in loadout:
-            await q.edit_message_text("Це уміння вже в наборі.", parse_mode=ParseMode.HTML)
-            return
-        if len(loadout) >= SKILL_SLOT_MAX:
-            await q.edit_message_text(f"Досягнуто ліміт {SKILL_SLOT_MAX} активних умінь.", parse_mode=ParseMode.HTML)
-            return
-        loadout.append(name)
-        p.skills_loadout = loadout
-        context.user_data["player"] = p.asdict()
-        await q.edit_message_text(f"✅ Додано в лоадаут: <b>{name}</b>.", parse_mode=ParseMode.HTML)
-        return
-
-    # Підменю зняття з лоадауту
-    if data == "guild:remove":
-        loadout = list(getattr(p, "skills_loadout", []) or [])
-        if not loadout:
-            await q.edit_message_text("Лоадаут порожній.", parse_mode=ParseMode.HTML)
-            return
-        opts = [(f"➖ {s}", f"guild:rempick:{s}") for s in loadout]
-        await q.edit_message_text(
-            "Оберіть уміння для зняття з активного набору:",
-            reply_markup=_kb(opts),
-        )
+
+@ROUTER.route("guild", "remove")
+async def guild_remove(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Підменю зняття з лоадауту."""
+    q = update.callback_query
+    if not await _require_guild(q, context):
+        return
+    p = ensure_player_ud(context.user_data)
+    loadout = list(getattr(p, "skills_loadout", []) or [])
+    if not loadout:
+        await safe_edit(q, "Лоадаут порожній.", parse_mode=ParseMode.HTML)
         return
+    opts = [(f"➖ {s}", ROUTER.data("guild", "rempick", s)) for s in loadout]
+    await safe_edit(
+        q,
+        "Оберіть уміння для зняття з активного набору:",
+        reply_markup=_kb(opts),
+    )
 
-    if data.startswith("guild:rempick:"):
-        name = data.split(":", 2)[2]
-        loadout = list(getattr(p, "skills_loadout", []) or [])
-        if name not in loadout:
-            await q.edit_message_text("Уміння відсутнє в наборі.", parse_mode=ParseMode.HTML)
-            return
-        loadout = [s for s in loadout if s != name]
-        p.skills_loadout = loadout
-        context.user_data["player"] = p.asdict()
-        await q.edit_message_text(f"✅ Знято з лоадауту: <b>{name}</b>.", parse_mode=ParseMode.HTML)
-        return
-
-    # Вивчення нового уміння (коли pending_skill_choice=True)
-    if data == "guild:learn":
-        cls = getattr(p, "class_name", None)
-        pool = list(CLASS_SKILLS.get(cls, {}).keys())
-        known = set(getattr(p, "skills_known", []) or [])
-        choices = [s for s in pool if s not in known]
-        if not getattr(p, "pending_skill_choice", False):
-            await q.edit_message_text("Зараз у вас немає нового вибору уміння.", parse_mode=ParseMode.HTML)
-            return
-        if not choices:
-            await q.edit_message_text("Для вашого класу нових умінь немає.", parse_mode=ParseMode.HTML)
-            p.pending_skill_choice = False
-            context.user_data["player"] = p.asdict()
-            return
-        opts = [(f"🆕 {s}", f"guild:learnpick:{s}") for s in choices[:6]]  # показуємо до 6
-        await q.edit_message_text(
-            "Оберіть нове уміння для вивчення:",
-            reply_markup=_kb(opts),
-        )
+
+@ROUTER.route("guild", "rempick", SKILL)
+async def guild_remove_pick(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str) -> None:
+    q = update.callback_query
+    if not await _require_guild(q, context):
         return
+    p = ensure_player_ud(context.user_data)
+    loadout = list(getattr(p, "skills_loadout", []) or [])
+    if name not in loadout:
+        await safe_edit(q, "Уміння відсутнє в наборі.", parse_mode=ParseMode.HTML)
+        return
+    loadout = [s for s in loadout if s != name]
+    p.skills_loadout = loadout
+    mark_dirty(context.user_data)
+    await safe_edit(q, f"✅ Знято з лоадауту: <b>{name}</b>.", parse_mode=ParseMode.HTML)
+
 
-    if data.startswith("guild:learnpick:"):
-        name = data.split(":", 2)[2]
-        known = list(getattr(p, "skills_known", []) or [])
-        if name in known:
-            await q.edit_message_text("Це уміння вже відоме.", parse_mode=ParseMode.HTML)
-            return
-        known.append(name)
-        p.skills_known = known
+@ROUTER.route("guild", "learn")
+async def guild_learn(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Вивчення нового уміння (коли pending_skill_choice=True)."""
+    q = update.callback_query
+    if not await _require_guild(q, context):
+        return
+    p = ensure_player_ud(context.user_data)
+    cls = getattr(p, "class_name", None)
+    pool = list(CLASS_SKILLS.get(cls, {}).keys())
+    known = set(getattr(p, "skills_known", []) or [])
+    choices = [s for s in pool if s not in known]
+    if not getattr(p, "pending_skill_choice", False):
+        await safe_edit(q, "Зараз у вас немає нового вибору уміння.", parse_mode=ParseMode.HTML)
+        return
+    if not choices:
+        await safe_edit(q, "Для вашого класу нових умінь немає.", parse_mode=ParseMode.HTML)
         p.pending_skill_choice = False
-        context.user_data["player"] = p.asdict()
-        await q.edit_message_text(f"🎓 Вивчено нове уміння: <b>{name}</b>!", parse_mode=ParseMode.HTML)
+        mark_dirty(context.user_data)
+        return
+    opts = [(f"🆕 {s}", ROUTER.data("guild", "learnpick", s)) for s in choices[:6]]  # показуємо до 6
+    await safe_edit(
+        q,
+        "Оберіть нове уміння для вивчення:",
+        reply_markup=_kb(opts),
+    )
+
+
+@ROUTER.route("guild", "learnpick", SKILL)
+async def guild_learn_pick(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str) -> None:
+    q = update.callback_query
+    if not await _require_guild(q, context):
+        return
+    p = ensure_player_ud(context.user_data)
+    known = list(getattr(p, "skills_known", []) or [])
+    if name in known:
+        await safe_edit(q, "Це уміння вже відоме.", parse_mode=ParseMode.HTML)
         return
+    known.append(name)
+    p.skills_known = known
+    p.pending_skill_choice = False
+    mark_dirty(context.user_data)
+    await safe_edit(q, f"🎓 Вивчено нове уміння: <b>{name}</b>!", parse_mode=ParseMode.HTML)
+
 
-    # Скидання лоадауту за золото
-    if data == "guild:respec":
-        if p.gold < GUILD_RESPEC_COST:
-            await q.edit_message_text("Недостатньо золота для скидання лоадауту.", parse_mode=ParseMode.HTML)
-            return
-        p.gold -= GUILD_RESPEC_COST
-        p.skills_loadout = []
-        context.user_data["player"] = p.asdict()
-        await q.edit_message_text("♻️ Лоадаут скинуто. Ви можете знову обрати уміння.", parse_mode=ParseMode.HTML)
+@ROUTER.route("guild", "respec")
+async def guild_respec(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Скидання лоадауту за золото."""
+    q = update.callback_query
+    if not await _require_guild(q, context):
         return
+    p = ensure_player_ud(context.user_data)
+    if p.gold < GUILD_RESPEC_COST:
+        await safe_edit(q, "Недостатньо золота для скидання лоадауту.", parse_mode=ParseMode.HTML)
+        return
+    p.gold -= GUILD_RESPEC_COST
+    p.skills_loadout = []
+    mark_dirty(context.user_data)
+    await safe_edit(q, "♻️ Лоадаут скинуто. Ви можете знову обрати уміння.", parse_mode=ParseMode.HTML)
+
 
-    # Фолбек
-    await q.edit_message_text("Невідома дія гільдії.")
+@ROUTER.route("guild", WILDCARD, str)
+async def guild_unknown(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str) -> None:
+    q = update.callback_query
+    if await _require_guild(q, context):
+        await safe_edit(q, "Невідома дія гільдії.")
@@ -5,8 +5,11 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
-from ..models import ensure_player_ud
+from ..models import ensure_player_ud, mark_dirty
 from ..utils.equipment import equip_item, unequip_slot, repair_item
+from ..utils.render import safe_edit
+from ..router import ROUTER, WILDCARD
+from ..utils.callback_codec import SLOT
 
 def render_inventory(p) -> tuple[str, InlineKeyboardMarkup]:
     eq_lines = []
@@ -21,61 +24,55 @@ def render_inventory(p) -> tuple[str, InlineKeyboardMarkup]:
     for i, it in enumerate(p.inventory):
         inv_lines.append(f"{i+1}. {it['emoji']} <b>{it['name']}</b> — {it['title']} [{it['type']}] (+ATK {it.get('atk',0)}, +DEF {it.get('defense',0)}, 🔧 {it.get('durability',0)})")
         if it.get("type") in ("weapon","armor","accessory"):
-            kb_rows.append([InlineKeyboardButton(f"Надягти #{i+1}", callback_data=f"inv:equip:{i}")])
-        kb_rows.append([InlineKeyboardButton(f"Ремонт #{i+1}", callback_data=f"inv:repair:{i}")])
+            kb_rows.append([InlineKeyboardButton(f"Надягти #{i+1}", callback_data=ROUTER.data("inv", "equip", i))])
+        kb_rows.append([InlineKeyboardButton(f"Ремонт #{i+1}", callback_data=ROUTER.data("inv", "repair", i))])
 
     undress = []
     for slot in ("weapon","armor","accessory"):
         if p.equipment.get(slot):
-            undress.append(InlineKeyboardButton(f"Зняти {slot}", callback_data=f"inv:unequip:{slot}"))
+            undress.append(InlineKeyboardButton(f"Зняти {slot}", callback_data=ROUTER.data("inv", "unequip", slot)))
     if undress:
         kb_rows.append(undress)
 
     text = (f"🎒 Інвентар:\n🧪 Зілля: {p.potions}\n💰 Золото: {p.gold}\n\n"
             "Екіпірування:\n" + ("\n".join(eq_lines) if eq_lines else "—") + "\n\n"
             "Речі в рюкзаку:\n" + ("\n".join(inv_lines) if inv_lines else "— немає предметів —"))
-    return text, InlineKeyboardMarkup(kb_rows or [[InlineKeyboardButton("Оновити", callback_data="inv:refresh")]])
+    return text, InlineKeyboardMarkup(kb_rows or [[InlineKeyboardButton("Оновити", callback_data=ROUTER.data("inv", "refresh"))]])
 
 async def inventory(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     p = ensure_player_ud(context.user_data)
     text, kb = render_inventory(p)
     await update.message.reply_html(text, reply_markup=kb)
 
-async def on_inv_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    q = update.callback_query
-    await q.answer()
-    p = ensure_player_ud(context.user_data)
-    parts = q.data.split(":", 2)
-    action = parts[1] if len(parts) > 1 else ""
-
-    if action == "equip":
-        idx = int(parts[2])
-        ok, msg = equip_item(p, idx)
-        context.user_data["player"] = p.asdict()
-        text, kb = render_inventory(p)
-        await q.edit_message_text(msg + "\n\n" + text, reply_markup=kb, parse_mode=ParseMode.HTML)
-        return
+async def _rerender(q, p, msg: str = "") -> None:
+    text, kb = render_inventory(p)
+    await safe_edit(q, (msg + "\n\n" + text) if msg else text, reply_markup=kb, parse_mode=ParseMode.HTML)
 
-    if action == "unequip":
-        slot = parts[2]
-        ok, msg = unequip_slot(p, slot)
-        context.user_data["player"] = p.asdict()
-        text, kb = render_inventory(p)
-        await q.edit_message_text(msg + "\n\n" + text, reply_markup=kb, parse_mode=ParseMode.HTML)
-        return
+@ROUTER.route("inv", "equip", int)
+async def inv_equip(update: Update, context: ContextTypes.DEFAULT_TYPE, idx: int) -> None:
+    p = ensure_player_ud(context.user_data)
+    ok, msg = equip_item(p, idx)
+    if ok:
+        mark_dirty(context.user_data)
+    await _rerender(update.callback_query, p, msg)
 
-    if action == "repair":
-        idx = int(parts[2])
-        ok, msg = repair_item(p, idx)
-        context.user_data["player"] = p.asdict()
-        text, kb = render_inventory(p)
-        await q.edit_message_text(msg + "\n\n" + text, reply_markup=kb, parse_mode=ParseMode.HTML)
-        return
+@ROUTER.route("inv", "unequip", SLOT)
+async def inv_unequip(update: Update, context: ContextTypes.DEFAULT_TYPE, slot: str) -> None:
+    p = ensure_player_ud(context.user_data)
+    ok, msg = unequip_slot(p, slot)
+    if ok:
+        mark_dirty(context.user_data)
+    await _rerender(update.callback_query, p, msg)
 
-    if action == "refresh":
-        text, kb = render_inventory(p)
-        await q.edit_message_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
-        return
+@ROUTER.route("inv", "repair", int)
+async def inv_repair(update: Update, context: ContextTypes.DEFAULT_TYPE, idx: int) -> None:
+    p = ensure_player_ud(context.user_data)
+    ok, msg = repair_item(p, idx)
+    if ok:
+        mark_dirty(context.user_data)
+    await _rerender(update.callback_query, p, msg)
 
-    text, kb = render_inventory(p)
-    await q.edit_message_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+@ROUTER.route("inv", WILDCARD, str)
+async def inv_refresh(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str) -> None:
+    """inv:refresh і будь-яка невідома дія — просто перемалювати інвентар."""
+    await _rerender(update.callback_query, ensure_player_ud(context.user_data))
@@ -3,33 +3,41 @@ from __future__ import annotations
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
-from ..models import ensure_player_ud
+from ..models import ensure_player_ud, mark_dirty
 from ..utils.loot import price_of_item, sell_value
+from ..utils.catalog import Item, register
 from ..utils.equipment import equip_item, unequip_slot
+from ..utils.render import safe_edit
 from ..config import LOC_SHOP, LOC_CITY
+from ..router import ROUTER, WILDCARD
+from ..utils.callback_codec import SHOP_MENU
 
 def _kb(rows): 
     return InlineKeyboardMarkup(rows)
 
 def kb_shop_main() -> InlineKeyboardMarkup:
     return _kb([
-        [InlineKeyboardButton("🛒 Купити спорядження", callback_data="shop:menu:buy")],
-        [InlineKeyboardButton("🧪 Купити зілля (+1 за 10з)", callback_data="shop:buy_potion")],
-        [InlineKeyboardButton("💰 Продати з рюкзака", callback_data="shop:menu:sell")],
-        [InlineKeyboardButton("⬅️ Вийти до Міста", callback_data="shop:leave")],
+        [InlineKeyboardButton("🛒 Купити спорядження", callback_data=ROUTER.data("shop", "menu", "buy"))],
+        [InlineKeyboardButton("🧪 Купити зілля (+1 за 10з)", callback_data=ROUTER.data("shop", "buy_potion"))],
+        [InlineKeyboardButton("💰 Продати з рюкзака", callback_data=ROUTER.data("shop", "menu", "sell"))],
+        [InlineKeyboardButton("⬅️ Вийти до Міста", callback_data=ROUTER.data("shop", "leave"))],
     ])
 
-def shop_stock() -> list[dict]:
-    # Статичний набір — можна розширювати
-    return [
-        {"name":"Кинджал ремісника","rarity":"common","title":"⚪ Звичайний","emoji":"⚪","type":"weapon","atk":1,"defense":0,"price":15,"equipped":False,"durability":20,"durability_max":20},
-        {"name":"Шкіряний нагрудник","rarity":"common","title":"⚪ Звичайний","emoji":"⚪","type":"armor","atk":0,"defense":1,"price":15,"equipped":False,"durability":25,"durability_max":25},
-        {"name":"Срібний перстень","rarity":"uncommon","title":"🟢 Незвичайний","emoji":"🟢","type":"accessory","atk":1,"defense":1,"price":35,"equipped":False,"durability":30,"durability_max":30},
-        {"name":"Меч лісника","rarity":"uncommon","title":"🟢 Незвичайний","emoji":"🟢","type":"weapon","atk":2,"defense":0,"price":38,"equipped":False,"durability":35,"durability_max":35},
-        {"name":"Лати стража","rarity":"rare","title":"🔵 Рідкісний","emoji":"🔵","type":"armor","atk":0,"defense":3,"price":70,"equipped":False,"durability":50,"durability_max":50},
-    ]
-
-def format_item_line(it: dict, idx: int | None = None, with_price: bool = False, sell_mode: bool = False) -> str:
+# Статичний набір — можна розширювати
+SHOP_GOODS = [
+    register(name="Кинджал ремісника", rarity="common", itype="weapon", atk=1, defense=0, base_price=15, durability_max=20),
+    register(name="Шкіряний нагрудник", rarity="common", itype="armor", atk=0, defense=1, base_price=15, durability_max=25),
+    register(name="Срібний перстень", rarity="uncommon", itype="accessory", atk=1, defense=1, base_price=35, durability_max=30),
+    register(name="Меч лісника", rarity="uncommon", itype="weapon", atk=2, defense=0, base_price=38, durability_max=35),
+    register(name="Лати стража", rarity="rare", itype="armor", atk=0, defense=3, base_price=70, durability_max=50),
+]
+
+def shop_stock() -> list[Item]:
+    # ціна береться з шаблону, у екземплярі — лише поточна міцність
+    return [Item(tpl, durability=tpl.durability_max) for tpl in SHOP_GOODS]
+
+def format_item_line(it, idx: int | None = None, with_price: bool = False, sell_mode: bool = False,
+                     value: int | None = None) -> str:
     t = f"{it['emoji']} <b>{it['name']}</b> — {it['title']} [{it['type']}] (+ATK {it.get('atk',0)}, +DEF {it.get('defense',0)})"
     if "durability" in it and ("durability_max" in it or isinstance(it.get("durability"), int)):
         # показуємо тільки 'durability', або 'durability/durability_max' коли є обидва
@@ -40,7 +48,7 @@ def format_item_line(it: dict, idx: int | None = None, with_price: bool = False,
     if with_price and it.get("price"):
         t += f" — ціна: {it['price']}з"
     if sell_mode:
-        t += f" — продаж: {sell_value(it)}з"
+        t += f" — продаж: {sell_value(it) if value is None else value}з"
     if idx is not None:
         t = f"{idx}. " + t
     return t
@@ -49,19 +57,21 @@ def format_item_line(it: dict, idx: int | None = None, with_price: bool = False,
 def render_shop_buy() -> tuple[str, InlineKeyboardMarkup]:
     goods = shop_stock()
     lines = [format_item_line(g, idx=i+1, with_price=True) for i,g in enumerate(goods)]
-    kb = [[InlineKeyboardButton(f"Купити {i+1}", callback_data=f"shop:buygear:{i}")] for i in range(len(goods))]
-    kb.append([InlineKeyboardButton("⬅️ Назад", callback_data="shop:menu:main")])
+    kb = [[InlineKeyboardButton(f"Купити {i+1}", callback_data=ROUTER.data("shop", "buygear", i))] for i in range(len(goods))]
+    kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=ROUTER.data("shop", "menu", "main"))])
     return "🛒 Товари:\n" + "\n".join(lines), InlineKeyboardMarkup(kb)
 
 def render_shop_sell(p) -> tuple[str, InlineKeyboardMarkup]:
     if not p.inventory:
-        return "Нічого продавати.", InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data="shop:menu:main")]])
+        return "Нічого продавати.", InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data=ROUTER.data("shop", "menu", "main"))]])
     lines, kb = [], []
     for i, it in enumerate(p.inventory):
-        lines.append(format_item_line(it, idx=i+1, sell_mode=True))
-        kb.append([InlineKeyboardButton(f"Продати #{i+1} за {sell_value(it)}з", callback_data=f"shop:sell:{i}")])
-    kb.append([InlineKeyboardButton("⬅️ Назад", callback_data="shop:menu:main")])
-    return "💰 Продаж інвентарю:\n" + "\n".join(lines), InlineKeyboardMarkup(kb)
+        value = sell_value(it)
+        lines.append(format_item_line(it, idx=i+1, sell_mode=True, value=value))
+        kb.append([InlineKeyboardButton(f"Продати #{i+1} за {value}з", callback_data=ROUTER.data("shop", "sell", i))])
+    kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=ROUTER.data("shop", "menu", "main"))])
+    total = f"\nУсього за рюкзак: {p.inventory.sell_total}з"
+    return "💰 Продаж інвентарю:\n" + "\n".join(lines) + total, InlineKeyboardMarkup(kb)
 
 async def shop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -77,8 +87,8 @@ async def shop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     if loc == LOC_CITY:
         kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🛒 Увійти до Крамниці зараз", callback_data="shop:enter")],
-            [InlineKeyboardButton("⬅️ Залишитись у Місті", callback_data="shop:cancel")],
+            [InlineKeyboardButton("🛒 Увійти до Крамниці зараз", callback_data=ROUTER.data("shop", "enter"))],
+            [InlineKeyboardButton("⬅️ Залишитись у Місті", callback_data=ROUTER.data("shop", "cancel"))],
         ])
         await update.message.reply_html("Ви в Місті. Перейти до <b>Крамниця (Місто)</b>?", reply_markup=kb)
         return
@@ -86,105 +96,124 @@ async def shop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         f"🏪 Крамниця — це локація в Місті.\nСпершу перейдіть у <b>{LOC_CITY}</b> ➜ <b>{LOC_SHOP}</b> через /travel."
     )
 
-async def on_shop_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+# ---- Callback'и (маршрути shop:*) ----
+
+@ROUTER.route("shop", "enter")
+async def shop_enter(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Швидкий вхід із Міста."""
     q = update.callback_query
-    await q.answer()
     p = ensure_player_ud(context.user_data)
-    loc = context.user_data.get("location")
-
-    data = q.data.split(":", 1)
-    action = data[1] if len(data) > 1 else ""
-
-    # Швидкий вхід із Міста
-    if action == "enter":
-        if loc != LOC_CITY:
-            await q.edit_message_text("❌ Швидкий перехід доступний лише з Міста.")
-            return
-        context.user_data["location"] = LOC_SHOP
-        await q.edit_message_text(f"🏪 Увійшли до Крамниці. Ваше золото: <b>{p.gold}</b>.", parse_mode=ParseMode.HTML, reply_markup=kb_shop_main())
+    if context.user_data.get("location") != LOC_CITY:
+        await safe_edit(q, "❌ Швидкий перехід доступний лише з Міста.")
         return
+    context.user_data["location"] = LOC_SHOP
+    await safe_edit(q, f"🏪 Увійшли до Крамниці. Ваше золото: <b>{p.gold}</b>.", parse_mode=ParseMode.HTML, reply_markup=kb_shop_main())
 
-    if action == "cancel":
-        await q.edit_message_text("Залишилися в Місті.")
-        return
+@ROUTER.route("shop", "cancel")
+async def shop_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await safe_edit(update.callback_query, "Залишилися в Місті.")
 
-    # Далі діє класична логіка магазину — тільки якщо ми вже в крамниці
+async def _in_shop(q, context) -> bool:
+    """Далі діє класична логіка магазину — тільки якщо ми вже в крамниці."""
     if context.user_data.get("location") != LOC_SHOP:
-        await q.edit_message_text("❌ Ви не в крамниці. Перейдіть у Місто ➜ Крамниця через /travel, або скористайтесь /shop у Місті.")
-        return
+        await safe_edit(q, "❌ Ви не в крамниці. Перейдіть у Місто ➜ Крамниця через /travel, або скористайтесь /shop у Місті.")
+        return False
+    return True
 
-    if action == "menu:main":
-        await q.edit_message_text(f"🏪 Крамниця. Ваше золото: <b>{p.gold}</b>.", reply_markup=kb_shop_main(), parse_mode=ParseMode.HTML)
+@ROUTER.route("shop", "menu", SHOP_MENU)
+async def shop_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, menu: str) -> None:
+    q = update.callback_query
+    if not await _in_shop(q, context):
         return
-
-    if action == "menu:buy":
+    p = ensure_player_ud(context.user_data)
+    if menu == "buy":
         text, kb = render_shop_buy()
-        await q.edit_message_text(text + f"\n\nВаше золото: <b>{p.gold}</b>", reply_markup=kb, parse_mode=ParseMode.HTML)
-        return
-
-    if action == "menu:sell":
+    elif menu == "sell":
         text, kb = render_shop_sell(p)
-        await q.edit_message_text(text + f"\n\nВаше золото: <b>{p.gold}</b>", reply_markup=kb, parse_mode=ParseMode.HTML)
+    elif menu == "main":
+        await safe_edit(q, f"🏪 Крамниця. Ваше золото: <b>{p.gold}</b>.", reply_markup=kb_shop_main(), parse_mode=ParseMode.HTML)
         return
-
-    if action == "leave":
-        # миттєво повертаємо в Місто
-        context.user_data["location"] = LOC_CITY
-        await q.edit_message_text("↩️ Повернення до Міста виконано. Використайте /travel для подальшого шляху.")
+    else:
+        await safe_edit(q, "Невідома дія магазину.", reply_markup=kb_shop_main())
         return
+    await safe_edit(q, text + f"\n\nВаше золото: <b>{p.gold}</b>", reply_markup=kb, parse_mode=ParseMode.HTML)
 
-    # Купівля спорядження зі стоку
-    if action.startswith("buygear:"):
-        idx = int(action.split(":",1)[1])
-        goods = shop_stock()
-        if idx < 0 or idx >= len(goods):
-            await q.edit_message_text("Невірний товар.", reply_markup=kb_shop_main())
-            return
-        item = goods[idx].copy()
-        price = item["price"]
-        if p.gold < price:
-            await q.edit_message_text("Недостатньо золота.", reply_markup=kb_shop_main())
-            return
-        p.gold -= price
-        p.inventory.append(item)
-        context.user_data["player"] = p.asdict()
-        text, kb = render_shop_buy()
-        await q.edit_message_text(
-            f"✅ Куплено: {item['emoji']} <b>{item['name']}</b> за {price}з.\n\n" + text + f"\n\nВаше золото: <b>{p.gold}</b>",
-            reply_markup=kb, parse_mode=ParseMode.HTML
-        )
+@ROUTER.route("shop", "leave")
+async def shop_leave(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    q = update.callback_query
+    if not await _in_shop(q, context):
         return
+    # миттєво повертаємо в Місто
+    context.user_data["location"] = LOC_CITY
+    await safe_edit(q, "↩️ Повернення до Міста виконано. Використайте /travel для подальшого шляху.")
 
-    # Зілля
-    if action == "buy_potion":
-        if p.gold >= 10:
-            p.gold -= 10
-            p.potions += 1
-            context.user_data["player"] = p.asdict()
-            await q.edit_message_text(f"🧪 Придбано зілля за 10з. Тепер золота: <b>{p.gold}</b>.", parse_mode=ParseMode.HTML, reply_markup=kb_shop_main())
-        else:
-            await q.edit_message_text("Недостатньо золота.", reply_markup=kb_shop_main())
+@ROUTER.route("shop", "buygear", int)
+async def shop_buy_gear(update: Update, context: ContextTypes.DEFAULT_TYPE, idx: int) -> None:
+    """Купівля спорядження зі стоку."""
+    q = update.callback_query
+    if not await _in_shop(q, context):
         return
+    p = ensure_player_ud(context.user_data)
+    goods = shop_stock()
+    if idx < 0 or idx >= len(goods):
+        await safe_edit(q, "Невірний товар.", reply_markup=kb_shop_main())
+        return
+    item = goods[idx].copy()
+    price = item["price"]
+    if p.gold < price:
+        await safe_edit(q, "Недостатньо золота.", reply_markup=kb_shop_main())
+        return
+    p.gold -= price
+    p.inventory.append(item)
+    mark_dirty(context.user_data)
+    text, kb = render_shop_buy()
+    await safe_edit(
+        q,
+        f"✅ Куплено: {item['emoji']} <b>{item['name']}</b> за {price}з.\n\n" + text + f"\n\nВаше золото: <b>{p.gold}</b>",
+        reply_markup=kb, parse_mode=ParseMode.HTML
+    )
 
-    # Продаж предмета з інвентаря
-    if action.startswith("sell:"):
-        idx = int(action.split(":",1)[1])
-        if idx < 0 or idx >= len(p.inventory):
-            await q.edit_message_text("Невірний індекс.", reply_markup=kb_shop_main())
-            return
-        it = p.inventory[idx]
-        if it.get("equipped"):
-            await q.edit_message_text("Зніміть предмет перед продажем.", reply_markup=kb_shop_main())
-            return
-        gain = sell_value(it)
-        p.gold += gain
-        p.inventory.pop(idx)
-        context.user_data["player"] = p.asdict()
-        text, kb = render_shop_sell(p)
-        await q.edit_message_text(
-            f"💰 Продано: {it['emoji']} <b>{it['name']}</b> за {gain}з.\n\n" + text + f"\n\nВаше золото: <b>{p.gold}</b>",
-            reply_markup=kb, parse_mode=ParseMode.HTML
-        )
+@ROUTER.route("shop", "buy_potion")
+async def shop_buy_potion(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    q = update.callback_query
+    if not await _in_shop(q, context):
         return
+    p = ensure_player_ud(context.user_data)
+    if p.gold >= 10:
+        p.gold -= 10
+        p.potions += 1
+        mark_dirty(context.user_data)
+        await safe_edit(q, f"🧪 Придбано зілля за 10з. Тепер золота: <b>{p.gold}</b>.", parse_mode=ParseMode.HTML, reply_markup=kb_shop_main())
+    else:
+        await safe_edit(q, "Недостатньо золота.", reply_markup=kb_shop_main())
+
+@ROUTER.route("shop", "sell", int)
+async def shop_sell(update: Update, context: ContextTypes.DEFAULT_TYPE, idx: int) -> None:
+    """Продаж предмета з інвентаря."""
+    q = update.callback_query
+    if not await _in_shop(q, context):
+        return
+    p = ensure_player_ud(context.user_data)
+    if idx < 0 or idx >= len(p.inventory):
+        await safe_edit(q, "Невірний індекс.", reply_markup=kb_shop_main())
+        return
+    it = p.inventory[idx]
+    if it.get("equipped"):
+        await safe_edit(q, "Зніміть предмет перед продажем.", reply_markup=kb_shop_main())
+        return
+    gain = sell_value(it)
+    p.gold += gain
+    p.inventory.pop(idx)
+    mark_dirty(context.user_data)
+    text, kb = render_shop_sell(p)
+    await safe_edit(
+        q,
+        f"💰 Продано: {it['emoji']} <b>{it['name']}</b> за {gain}з.\n\n" + text + f"\n\nВаше золото: <b>{p.gold}</b>",
+        reply_markup=kb, parse_mode=ParseMode.HTML
+    )
 
-    await q.edit_message_text("Невідома дія магазину.", reply_markup=kb_shop_main())
+@ROUTER.route("shop", WILDCARD, str)
+async def shop_unknown(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str) -> None:
+    q = update.callback_query
+    if await _in_shop(q, context):
+        await safe_edit(q, "Невідома дія магазину.", reply_markup=kb_shop_main())
@@ -4,19 +4,24 @@ from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import ContextTypes
 from ..config import ADJACENT, LOCATION_ORDER, LOC_CITY, LOC_GUILD, LOC_SHOP
 from ..models import ensure_player_ud
+from ..utils.render import safe_edit
+from ..utils.keyboards import cached_keyboard
+from ..router import ROUTER, WILDCARD
+from ..utils.callback_codec import LOCATION
 
 def _kb(rows): 
     return InlineKeyboardMarkup(rows)
 
+@cached_keyboard
 def _build_travel_kb(current: str) -> InlineKeyboardMarkup:
-    """Показує лише суміжні локації з поточною."""
+    """Показує лише суміжні локації з поточною (одна розмітка на локацію)."""
     neighbors = ADJACENT.get(current, [])
-    rows = [[InlineKeyboardButton(f"➡️ {loc}", callback_data=f"travel:{loc}")]
+    rows = [[InlineKeyboardButton(f"➡️ {loc}", callback_data=ROUTER.data("travel", loc))]
             for loc in LOCATION_ORDER if loc in neighbors]
     # Якщо ви в Місті — окремо підсвітити крамницю, але залишаємо її серед сусідів
     if current == LOC_CITY and LOC_SHOP in neighbors:
-        rows.append([InlineKeyboardButton("🛒 Перейти в Крамницю (швидко)", callback_data=f"travel:{LOC_SHOP}")])
-    return _kb(rows or [[InlineKeyboardButton("Немає доступних переходів", callback_data="travel:none")]])
+        rows.append([InlineKeyboardButton("🛒 Перейти в Крамницю (швидко)", callback_data=ROUTER.data("travel", LOC_SHOP))])
+    return _kb(rows or [[InlineKeyboardButton("Немає доступних переходів", callback_data=ROUTER.data("travel", "none"))]])
 
 def _neighbors_table(current: str) -> str:
     """Коротка “табличка переходів” з підказками та обмеженнями для локації."""
@@ -52,18 +57,18 @@ async def travel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
     await update.message.reply_html(text, reply_markup=_build_travel_kb(current))
 
-async def on_travel_select(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+@ROUTER.route("travel", "none")
+async def travel_none(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await safe_edit(update.callback_query, "Немає доступних переходів із цієї локації.")
+
+@ROUTER.route("travel", WILDCARD, LOCATION)
+async def on_travel_select(update: Update, context: ContextTypes.DEFAULT_TYPE, target: str) -> None:
+    """travel:<локація> — перехід у суміжну локацію."""
     q = update.callback_query
-    await q.answer()
     current = context.user_data.get("location") or "Тракт"
-    data = q.data
-    if data == "travel:none":
-        await q.edit_message_text("Немає доступних переходів із цієї локації.")
-        return
-    target = data.split(":", 1)[1]
     # Перевірка дозволеності переходу
     if target not in ADJACENT.get(current, []):
-        await q.edit_message_text(f"❌ Перехід у “{target}” недоступний з “{current}”.")
+        await safe_edit(q, f"❌ Перехід у “{target}” недоступний з “{current}”.")
         return
 
     context.user_data["location"] = target
@@ -72,4 +77,4 @@ async def on_travel_select(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         f"{_neighbors_table(target)}\n\n"
         "Оберіть наступний напрямок:"
     )
-    await q.edit_message_text(text, reply_markup=_build_travel_kb(target), parse_mode="HTML")
+    await safe_edit(q, text, reply_markup=_build_travel_kb(target), parse_mode="HTML")
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Навантажувальний тест без Telegram: python -m rpg0.loadtest [--players N] [--mode polling|webhook]
+
+Піднімає FakeBotAPI на 127.0.0.1, збирає справжній build_app() з
+base_url на нього (persistence — у тимчасовій теці), запускає його в
+режимі polling або webhook і пускає рій гравців. У звіті:
+- апдейтів/с і кількість відповідей/таймаутів;
+- затримка з боку гравця (p50/p95/p99/max по діях) і час самих
+  обробників (handler.* з маршрутизатора);
+- час flush персистентності (persist.flush) і фінального збереження;
+- пам'ять процесу (RSS) до і після, розмір user_data на гравця.
+
+Число "апдейтів/с при p99 < X" з однаковими --players/--duration/--seed —
+відтворювана ємність релізу. Фейковий сервер і рій працюють у тому ж
+event loop, що й бот, тож абсолютне число — нижня межа; порівнювати варто
+прогони на одній машині.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pickle
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def rss_bytes() -> int:
+    """Резидентна пам'ять процесу (Linux — /proc, інакше пік з resource)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    from ..utils.metrics import percentile
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # модулі бота читають config під час імпорту — оточення вже налаштоване в main()
+    from ..bot import build_app
+    from ..utils import metrics
+    from .fakeapi import FakeBotAPI
+    from .swarm import run_swarm
+
+    metrics.reset()
+    api = FakeBotAPI(flood_per_chat=args.flood)
+    base_url = await api.start()
+    app = build_app(base_url=base_url)
+    rss_before = rss_bytes()
+
+    t0 = time.perf_counter()
+    async with app:
+        await app.post_init(app)  # run_polling/run_webhook роблять це самі
+        await app.start()
+        if args.mode == "webhook":
+            port = _free_port()
+            await app.updater.start_webhook(
+                listen="127.0.0.1", port=port, url_path="hook",
+                webhook_url=f"http://127.0.0.1:{port}/hook", drop_pending_updates=True,
+            )
+        else:
+            await app.updater.start_polling(poll_interval=0, timeout=10, drop_pending_updates=True)
+
+        stats = await run_swarm(api, args.players, args.duration, think=args.think,
+                                timeout=args.timeout, seed=args.seed)
+        elapsed = time.perf_counter() - t0
+
+        await app.updater.stop()
+        await app.stop()
+        t_flush = time.perf_counter()
+        await app.update_persistence()
+        final_flush = time.perf_counter() - t_flush
+        rss_after = rss_bytes()
+        sizes = [len(pickle.dumps(dict(data))) for data in app.user_data.values()]
+        await app.post_shutdown(app)
+    await api.stop()
+
+    snap = metrics.snapshot()
+    handlers = {name[len("handler."):]: value for name, value in sorted(snap.items())
+                if name.startswith("handler.") and isinstance(value, dict)}
+    calls = dict(api.calls)
+    calls.pop("getUpdates", None)
+    return {
+        "mode": args.mode,
+        "backend": os.environ["PERSIST_BACKEND"],
+        "players": args.players,
+        "elapsed": elapsed,
+        "updates": api.updates_sent,
+        "updates_per_sec": api.updates_sent / elapsed if elapsed else 0.0,
+        "responses": stats.responses,
+        "timeouts": dict(stats.timeouts),
+        "scenarios": dict(stats.scenarios),
+        "api_calls": calls,
+        "api_429": api.flooded,
+        "actions": {name: _percentiles(values) for name, values in sorted(stats.latency.items())},
+        "handlers": handlers,
+        "updates_wait": snap.get("updates.wait"),
+        "loop_stall": snap.get("loop.stall"),
+        "persist_flush": snap.get("persist.flush"),
+        "final_flush": final_flush,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "user_data_bytes": sum(sizes) / len(sizes) if sizes else 0.0,
+    }
+
+
+def print_report(r: Dict[str, Any]) -> None:
+    ms = lambda s: s * 1000  # noqa: E731
+    print(f"\n== Навантажувальний тест: {r['players']} гравців, {r['mode']}, {r['backend']}, {r['elapsed']:.1f} с")
+    print(f"  апдейтів: {r['updates']} ({r['updates_per_sec']:.1f}/с), відповідей: {r['responses']}, "
+          f"таймаутів: {sum(r['timeouts'].values())} {r['timeouts'] or ''}")
+    print(f"  виклики API: {', '.join(f'{k}={v}' for k, v in sorted(r['api_calls'].items()))}; 429: {r['api_429']}")
+
+    print("\n  Затримка гравця (апдейт -> відповідь бота), мс:")
+    print(f"    {'дія':<18} {'к-сть':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, p in r["actions"].items():
+        print(f"    {name:<18} {p['count']:>6} {ms(p['p50']):>8.1f} {ms(p['p95']):>8.1f} "
+              f"{ms(p['p99']):>8.1f} {ms(p['max']):>8.1f}")
+
+    if r["handlers"]:
+        print("\n  Обробники callback'ів (час у хендлері), мс:")
+        for name, p in r["handlers"].items():
+            print(f"    {name:<26} {p['count']:>6} p50={ms(p['p50']):.2f} p99={ms(p['p99']):.2f} max={ms(p['max']):.2f}")
+
+    for title, key in (("Очікування апдейту в черзі", "updates_wait"), ("Затримка event loop", "loop_stall"),
+                       ("Flush персистентності", "persist_flush")):
+        p = r.get(key)
+        if p:
+            print(f"\n  {title}: p50={ms(p['p50']):.1f} мс, p99={ms(p['p99']):.1f} мс, "
+                  f"max={ms(p['max']):.1f} мс ({p['count']} вим.)")
+    print(f"  Фінальне збереження: {ms(r['final_flush']):.1f} мс")
+
+    mb = 1024 * 1024
+    print(f"\n  Пам'ять: RSS {r['rss_before'] / mb:.1f} -> {r['rss_after'] / mb:.1f} МБ "
+          f"(+{(r['rss_after'] - r['rss_before']) / mb:.1f}), "
+          f"user_data ≈ {r['user_data_bytes'] / 1024:.1f} КБ на гравця")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rpg0.loadtest",
+                                 description="Навантажувальний тест RPG0 на локальному фейковому Bot API.")
+    ap.add_argument("--players", type=int, default=100, help="віртуальних гравців")
+    ap.add_argument("--duration", type=float, default=20.0, help="секунд гри (поточні дії догравають після)")
+    ap.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    ap.add_argument("--backend", choices=("sqlite", "pickle"), default="sqlite", help="PERSIST_BACKEND")
+    ap.add_argument("--think", type=float, default=0.5, help="середня пауза гравця між діями, с")
+    ap.add_argument("--timeout", type=float, default=10.0, help="скільки гравець чекає відповіді, с")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--flood", type=int, default=0,
+                    help="фейкове 429, якщо чат отримує більше N повідомлень/с (0 — вимкнено)")
+    ap.add_argument("--no-ratelimit", action="store_true", help="без OutboundScheduler (RATE_LIMIT=0)")
+    ap.add_argument("--json", metavar="FILE", help="зберегти результати в JSON")
+    ap.add_argument("-v", "--verbose", action="store_true", help="логи бота")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    with tempfile.TemporaryDirectory(prefix="rpg0-loadtest-") as tmp:
+        os.environ.update({
+            "BOT_TOKEN": "123456:LOADTEST",
+            "PERSIST_BACKEND": args.backend,
+            "PERSIST_DB": os.path.join(tmp, "rpgbot.sqlite3"),
+            "PERSIST_FILE": os.path.join(tmp, "rpgbot.pickle"),
+            "METRICS_REPORT_INTERVAL": "0",
+            "RATE_LIMIT": "0" if args.no_ratelimit else "1",
+        })
+        result = asyncio.run(run(args))
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
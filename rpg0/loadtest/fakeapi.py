@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Локальний фейковий сервер Bot API для навантажувальних тестів.
+
+Вміє рівно стільки, скільки потрібно боту: getMe, getUpdates (long polling),
+setWebhook/deleteWebhook (у режимі webhook апдейти відправляються POST-ом
+на зареєстровану адресу), sendMessage, editMessageText/ReplyMarkup,
+answerCallbackQuery; на решту методів відповідає {"ok": true}.
+Як і справжній Telegram, відповідає 400 «message is not modified» на
+редагування без змін, а з `flood_per_chat` — 429 RetryAfter, коли чат
+отримує більше повідомлень за секунду.
+
+Гравці (swarm.py) пишуть боту через send_text()/press() і читають відповіді
+з inbox(user_id) — кожна відправка/редагування бота в їхній чат потрапляє
+туди як ("message", повідомлення), а відповідь на callback з текстом —
+як ("answer", параметри).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+import tornado.httpserver
+import tornado.netutil
+import tornado.web
+
+BOT_USER = {"id": 7000000001, "is_bot": True, "first_name": "RPG0", "username": "rpg0_loadtest_bot"}
+
+# Параметри, які PTB шле JSON-рядками у form-data
+_JSON_FIELDS = frozenset({
+    "chat_id", "message_id", "reply_markup", "offset", "limit", "timeout", "allowed_updates",
+    "entities", "show_alert", "cache_time", "drop_pending_updates", "disable_web_page_preview",
+    "link_preview_options", "reply_parameters", "commands",
+})
+
+
+def _ok(result: Any) -> Tuple[int, Dict[str, Any]]:
+    return 200, {"ok": True, "result": result}
+
+
+def _error(code: int, description: str, **parameters: Any) -> Tuple[int, Dict[str, Any]]:
+    body: Dict[str, Any] = {"ok": False, "error_code": code, "description": description}
+    if parameters:
+        body["parameters"] = parameters
+    return code, body
+
+
+class _MethodHandler(tornado.web.RequestHandler):
+    def initialize(self, api: "FakeBotAPI") -> None:
+        self.api = api
+
+    async def post(self, token: str, method: str) -> None:
+        status, body = await self.api.call(method, self._params())
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(body, ensure_ascii=False))
+
+    get = post
+
+    def _params(self) -> Dict[str, Any]:
+        if self.request.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(self.request.body or b"{}")
+        params: Dict[str, Any] = {}
+        for name, values in self.request.body_arguments.items():
+            raw = values[-1].decode("utf-8")
+            if name in _JSON_FIELDS:
+                try:
+                    params[name] = json.loads(raw)
+                    continue
+                except ValueError:
+                    pass
+            params[name] = raw
+        return params
+
+
+class FakeBotAPI:
+    def __init__(self, flood_per_chat: int = 0, keep_messages: int = 8):
+        self.flood_per_chat = flood_per_chat
+        self.keep_messages = keep_messages
+        self.calls: Counter = Counter()
+        self.flooded = 0
+        self.updates_sent = 0
+        self._update_ids = itertools.count(1)
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._has_updates = asyncio.Event()
+        self._webhook: Optional[str] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._server: Optional[tornado.httpserver.HTTPServer] = None
+        self._inboxes: Dict[int, asyncio.Queue] = {}
+        self._messages: Dict[int, "OrderedDict[int, Dict[str, Any]]"] = {}
+        self._msg_ids: Dict[int, int] = {}
+        self._sent_at: Dict[int, Deque[float]] = {}
+        self._queries: Dict[str, int] = {}  # id callback_query -> гравець
+
+    # ---- Сервер ----
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        """Запустити сервер на вільному порту; повертає base_url для build_app()."""
+        app = tornado.web.Application([(r"/bot([^/]+)/(\w+)", _MethodHandler, {"api": self})])
+        sockets = tornado.netutil.bind_sockets(0, host)
+        self._server = tornado.httpserver.HTTPServer(app)
+        self._server.add_sockets(sockets)
+        self._http = httpx.AsyncClient(timeout=30)
+        port = sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/bot"
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.stop()
+            await self._server.close_all_connections()
+            self._server = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._has_updates.set()  # відпустити getUpdates, що чекає
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self.calls[method] += 1
+        handler = getattr(self, "_m_" + method, None)
+        if handler is None:
+            return _ok(True)
+        return await handler(params)
+
+    # ---- Сторона гравця ----
+
+    @staticmethod
+    def user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"Гравець{user_id}", "language_code": "uk"}
+
+    @staticmethod
+    def chat(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "type": "private", "first_name": f"Гравець{user_id}"}
+
+    def inbox(self, user_id: int) -> asyncio.Queue:
+        box = self._inboxes.get(user_id)
+        if box is None:
+            box = self._inboxes[user_id] = asyncio.Queue()
+        return box
+
+    async def send_text(self, user_id: int, text: str) -> None:
+        """Гравець пише боту (команди — з entity bot_command, як у клієнті Telegram)."""
+        msg = {
+            "message_id": self._next_message_id(user_id),
+            "date": int(time.time()),
+            "chat": self.chat(user_id),
+            "from": self.user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        await self._deliver({"message": msg})
+
+    async def press(self, user_id: int, message: Dict[str, Any], callback_data: str) -> None:
+        """Гравець натискає inline-кнопку під повідомленням бота."""
+        query_id = str(next(self._update_ids))
+        self._queries[query_id] = user_id
+        await self._deliver({"callback_query": {
+            "id": query_id,
+            "from": self.user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": callback_data,
+        }})
+
+    async def _deliver(self, update: Dict[str, Any]) -> None:
+        update["update_id"] = next(self._update_ids)
+        self.updates_sent += 1
+        if self._webhook is not None and self._http is not None:
+            await self._http.post(self._webhook, json=update)
+        else:
+            self._queue.append(update)
+            self._has_updates.set()
+
+    # ---- Повідомлення бота ----
+
+    def _next_message_id(self, chat_id: int) -> int:
+        n = self._msg_ids.get(chat_id, 0) + 1
+        self._msg_ids[chat_id] = n
+        return n
+
+    def _flood(self, chat_id: int) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if not self.flood_per_chat:
+            return None
+        now = time.monotonic()
+        window = self._sent_at.setdefault(chat_id, deque())
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        if len(window) >= self.flood_per_chat:
+            self.flooded += 1
+            return _error(429, "Too Many Requests: retry after 1", retry_after=1)
+        window.append(now)
+        return None
+
+    def _store(self, chat_id: int, msg: Dict[str, Any]) -> None:
+        box = self._messages.setdefault(chat_id, OrderedDict())
+        box[msg["message_id"]] = msg
+        box.move_to_end(msg["message_id"])
+        while len(box) > self.keep_messages:
+            box.popitem(last=False)
+        if chat_id in self._inboxes or chat_id > 0:
+            self.inbox(chat_id).put_nowait(("message", msg))
+
+    # ---- Методи Bot API ----
+
+    async def _m_getMe(self, params: Dict[str, Any]):
+        return _ok(BOT_USER)
+
+    async def _m_getUpdates(self, params: Dict[str, Any]):
+        offset = int(params.get("offset") or 0)
+        while self._queue and self._queue[0]["update_id"] < offset:
+            self._queue.popleft()  # підтверджені ботом
+        if not self._queue:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        return _ok(list(itertools.islice(self._queue, 0, limit)))
+
+    async def _m_setWebhook(self, params: Dict[str, Any]):
+        self._webhook = params.get("url") or None
+        return _ok(True)
+
+    async def _m_deleteWebhook(self, params: Dict[str, Any]):
+        self._webhook = None
+        if params.get("drop_pending_updates"):
+            self._queue.clear()
+        return _ok(True)
+
+    async def _m_sendMessage(self, params: Dict[str, Any]):
+        chat_id = int(params["chat_id"])
+        flood = self._flood(chat_id)
+        if flood:
+            return flood
+        msg = {
+            "message_id": self._next_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": self.chat(chat_id),
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        if params.get("reply_markup"):
+            msg["reply_markup"] = params["reply_markup"]
+        self._store(chat_id, msg)
+        return _ok(msg)
+
+    async def _edit(self, params: Dict[str, Any], text: Optional[str]):
+        if "chat_id" not in params:
+            return _ok(True)  # inline-повідомлення: боту не потрібні
+        chat_id = int(params["chat_id"])
+        old = self._messages.get(chat_id, {}).get(int(params["message_id"]))
+        if old is None:
+            return _error(400, "Bad Request: message to edit not found")
+        markup = params.get("reply_markup")
+        if (text is None or text == old.get("text")) and markup == old.get("reply_markup"):
+            return _error(400, "Bad Request: message is not modified: specified new message content "
+                               "and reply markup are exactly the same as a current content and reply markup "
+                               "of the message")
+        flood = self._flood(chat_id)
+        if flood:
+            return flood
+        msg = dict(old, edit_date=int(time.time()))
+        if text is not None:
+            msg["text"] = text
+        if markup:
+            msg["reply_markup"] = markup
+        else:
+            msg.pop("reply_markup", None)
+        self._store(chat_id, msg)
+        return _ok(msg)
+
+    async def _m_editMessageText(self, params: Dict[str, Any]):
+        return await self._edit(params, params.get("text", ""))
+
+    async def _m_editMessageReplyMarkup(self, params: Dict[str, Any]):
+        return await self._edit(params, None)
+
+    async def _m_answerCallbackQuery(self, params: Dict[str, Any]):
+        user_id = self._queries.pop(str(params.get("callback_query_id")), None)
+        if user_id is not None and params.get("text"):
+            # сповіщення з текстом — теж відповідь гравцю (напр. «немає зілля»)
+            self.inbox(user_id).put_nowait(("answer", params))
+        return _ok(True)
+
+
+__all__ = ["FakeBotAPI", "BOT_USER"]
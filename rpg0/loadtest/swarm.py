@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Рій віртуальних гравців для навантажувального тесту.
+
+Кожен гравець — окремий Telegram-користувач на FakeBotAPI: /start,
+/register (клас, передісторія, підтвердження через reg:-кнопки), а далі
+цикл із паузою "на подумати" і випадковим сценарієм — бій через /explore,
+подорож, крамниця, гільдія, /stats. Кнопки шукаються за текстом:
+callback_data компактні й непрозорі, тож гравець тисне те, що бачить.
+
+Затримка дії — від відправки апдейту до першого повідомлення/редагування
+бота в чаті гравця або сповіщення-відповіді на кнопку (те, що відчуває людина).
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .fakeapi import FakeBotAPI
+from ..config import BACKSTORIES, CLASSES
+
+# Сценарій -> вага
+SCENARIOS = (
+    ("explore", 0.5),
+    ("travel", 0.2),
+    ("shop", 0.1),
+    ("guild", 0.1),
+    ("stats", 0.1),
+)
+MAX_BATTLE_ROUNDS = 30
+
+
+class SwarmStats:
+    """Затримки по діях і лічильники таймаутів — спільні для всього рою."""
+
+    def __init__(self) -> None:
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.timeouts: Counter = Counter()
+        self.scenarios: Counter = Counter()
+
+    @property
+    def responses(self) -> int:
+        return sum(len(v) for v in self.latency.values())
+
+
+def buttons(message: Optional[Dict[str, Any]]) -> Iterator[Tuple[str, str]]:
+    """(текст, callback_data) усіх inline-кнопок повідомлення."""
+    markup = (message or {}).get("reply_markup") or {}
+    for row in markup.get("inline_keyboard", ()):
+        for button in row:
+            if "callback_data" in button:
+                yield button["text"], button["callback_data"]
+
+
+def find_button(message: Optional[Dict[str, Any]], prefix: str) -> Optional[str]:
+    for text, data in buttons(message):
+        if text.startswith(prefix):
+            return data
+    return None
+
+
+class Player:
+    def __init__(self, api: FakeBotAPI, user_id: int, rng: random.Random, stats: SwarmStats,
+                 timeout: float = 10.0, think: float = 0.5):
+        self.api = api
+        self.user_id = user_id
+        self.rng = rng
+        self.stats = stats
+        self.timeout = timeout
+        self.think = think
+        self.inbox = api.inbox(user_id)
+
+    # ---- Дії ----
+
+    async def _act(self, name: str, send) -> Optional[Dict[str, Any]]:
+        """Відправити апдейт і дочекатися відповіді бота; None — таймаут або лише сповіщення."""
+        while not self.inbox.empty():
+            self.inbox.get_nowait()  # запізнілі відповіді попередніх дій
+        t0 = time.perf_counter()
+        await send
+        try:
+            kind, message = await asyncio.wait_for(self.inbox.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts[name] += 1
+            return None
+        self.stats.latency[name].append(time.perf_counter() - t0)
+        return message if kind == "message" else None
+
+    async def command(self, text: str) -> Optional[Dict[str, Any]]:
+        return await self._act(text.split()[0], self.api.send_text(self.user_id, text))
+
+    async def press(self, message: Optional[Dict[str, Any]], prefix: str, name: str) -> Optional[Dict[str, Any]]:
+        data = find_button(message, prefix)
+        if data is None:
+            return None
+        return await self._act(name, self.api.press(self.user_id, message, data))
+
+    async def pause(self) -> None:
+        if self.think:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think)
+
+    # ---- Сценарії ----
+
+    async def register(self) -> bool:
+        await self.command("/start")
+        msg = await self.command("/register")
+        msg = await self.press(msg, self.rng.choice(list(CLASSES)), "reg:class")
+        msg = await self.press(msg, self.rng.choice(list(BACKSTORIES)), "reg:back")
+        msg = await self.press(msg, "✅ Підтвердити", "reg:confirm")
+        return msg is not None
+
+    async def explore(self) -> None:
+        msg = await self.command("/explore")
+        for _ in range(MAX_BATTLE_ROUNDS):
+            if find_button(msg, "🗡️ Атака") is None:
+                return  # знахідка/відпочинок або бій завершився (лут — наступний /explore)
+            await self.pause()
+            roll = self.rng.random()
+            if roll < 0.05:
+                msg = await self.press(msg, "🤖 Автобій", "battle:auto")
+            elif roll < 0.15 and "Зілля закінчились" not in msg.get("text", ""):
+                # повторне «немає зілля» — те саме повідомлення, бот його не редагує
+                msg = await self.press(msg, "🧪 Зілля", "battle:potion")
+            elif roll < 0.3:
+                skills = [text for text, _ in buttons(msg) if text.startswith("✨") and "КД" not in text]
+                msg = await self.press(msg, self.rng.choice(skills), "battle:skill") if skills else \
+                    await self.press(msg, "🗡️ Атака", "battle:attack")
+            else:
+                msg = await self.press(msg, "🗡️ Атака", "battle:attack")
+
+    async def travel(self) -> None:
+        msg = await self.command("/travel")
+        targets = [text for text, _ in buttons(msg) if text.startswith("➡️")]
+        if targets:
+            await self.pause()
+            await self.press(msg, self.rng.choice(targets), "travel")
+
+    async def shop(self) -> None:
+        msg = await self.command("/shop")
+        if find_button(msg, "🛒 Увійти до Крамниці зараз"):
+            await self.pause()
+            msg = await self.press(msg, "🛒 Увійти до Крамниці зараз", "shop:enter")
+        if find_button(msg, "🧪 Купити зілля"):
+            await self.pause()
+            msg = await self.press(msg, "🧪 Купити зілля", "shop:buy_potion")
+            await self.pause()
+            await self.press(msg, "⬅️ Вийти до Міста", "shop:leave")
+
+    async def guild(self) -> None:
+        msg = await self.command("/guild")
+        if find_button(msg, "➕ Додати в лоадаут"):
+            await self.pause()
+            msg = await self.press(msg, "➕ Додати в лоадаут", "guild:add")
+            await self.press(msg, "➕", "guild:addpick")
+
+    async def stats_cmd(self) -> None:
+        await self.command("/stats")
+
+    async def run(self, deadline: float) -> None:
+        # розтягнути старт, щоб рій не прийшов одним пакетом
+        await asyncio.sleep(self.rng.uniform(0, max(self.think, 0.1)))
+        if not await self.register():
+            return
+        names, weights = zip(*SCENARIOS)
+        while time.monotonic() < deadline:
+            await self.pause()
+            scenario = self.rng.choices(names, weights)[0]
+            self.stats.scenarios[scenario] += 1
+            await getattr(self, "stats_cmd" if scenario == "stats" else scenario)()
+
+
+async def run_swarm(api: FakeBotAPI, players: int, duration: float, think: float = 0.5,
+                    timeout: float = 10.0, seed: int = 0, first_user_id: int = 100_000) -> SwarmStats:
+    """Запустити `players` гравців на `duration` секунд (плюс дограти поточні дії)."""
+    stats = SwarmStats()
+    deadline = time.monotonic() + duration
+    swarm = [
+        Player(api, first_user_id + i, random.Random(seed * 1_000_003 + i), stats, timeout, think)
+        for i in range(players)
+    ]
+    await asyncio.gather(*(p.run(deadline) for p in swarm))
+    return stats
+
+
+__all__ = ["Player", "SwarmStats", "SCENARIOS", "run_swarm", "buttons", "find_button"]
@@ -2,10 +2,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict, field
-from typing import Dict, Any, Tuple, List
+from math import isqrt
+from typing import Dict, Any, Tuple, List, Optional, Sequence
 
+from .utils.catalog import as_item
+from .utils.inventory import Inventory
 
-@dataclass
+
+@dataclass(slots=True)
 class Player:
     # Базові
     name: str = "Мандрівник"
@@ -24,7 +28,7 @@ class Player:
     registered: bool = False
 
     # Інвентар/апгрейди/екіп
-    inventory: list = field(default_factory=list)
+    inventory: Inventory = field(default_factory=Inventory)
     upgrades: dict = field(default_factory=dict)
     equipment: dict = field(default_factory=lambda: {"weapon": None, "armor": None, "accessory": None})
 
@@ -33,6 +37,15 @@ class Player:
     skills_loadout: List[str] = field(default_factory=list)    # активні у бою (до N)
     pending_skill_choice: bool = False                         # прапорець “є нове вміння на вибір”
 
+    # Лут: дропів поспіль без рідкості (див. LOOT_PITY / utils/loot.py)
+    loot_pity: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # Предмети — екземпляри каталогу; старі словники зі збережень конвертуються тут
+        if not isinstance(self.inventory, Inventory):
+            self.inventory = Inventory(as_item(it) for it in self.inventory)
+        self.equipment = {slot: as_item(it) for slot, it in self.equipment.items()}
+
     # Технічне
     def asdict(self) -> Dict[str, Any]:
         return asdict(self)
@@ -49,28 +62,66 @@ class Player:
         return healed
 
     def gain_exp(self, amount: int) -> Tuple[int, bool]:
+        res = self.apply_exp(amount)
+        return self.level, res.levels > 0
+
+    def apply_exp(self, amount: int) -> "LevelUp":
+        """
+        Нарахувати досвід одним оновленням, без циклу по рівнях.
+        Вартість k рівнів від рівня L — арифметична прогресія:
+        sum(20 + (L+i-1)*10, i=0..k-1) = 5k² + (10L+5)k.
+        """
         from .config import SKILL_SELECT_INTERVAL
         self.exp += amount
-        leveled = False
-        while self.exp >= self._exp_to_next():
-            self.exp -= self._exp_to_next()
-            self.level += 1
-            leveled = True
-            # Прирости характеристик
-            self.max_hp += 5
-            self.atk += 2
-            self.defense += 1
-            self.hp = self.max_hp
-            # Кожні N рівнів — пропозиція вміння
-            if self.level % SKILL_SELECT_INTERVAL == 0:
-                self.pending_skill_choice = True
-        return self.level, leveled
+        start = self.level
+        b = 10 * start + 5
+        k = 0
+        if self.exp >= self._exp_to_next():
+            # найбільше k з 5k² + bk <= exp
+            k = (isqrt(b * b + 20 * self.exp) - b) // 10
+            while 5 * (k + 1) ** 2 + b * (k + 1) <= self.exp:
+                k += 1
+            while k and 5 * k * k + b * k > self.exp:
+                k -= 1
+        res = LevelUp(start_level=start, level=start + k, exp=self.exp - (5 * k * k + b * k))
+        if not k:
+            return res
+        res.max_hp, res.atk, res.defense = 5 * k, 2 * k, k
+        n = SKILL_SELECT_INTERVAL
+        # range, а не список: гігантський грант не розгортає мільярди рівнів у пам'ять
+        res.skill_levels = range((start // n + 1) * n, start + k + 1, n) if n > 0 else range(0)
+
+        self.level, self.exp = res.level, res.exp
+        self.max_hp += res.max_hp
+        self.atk += res.atk
+        self.defense += res.defense
+        self.hp = self.max_hp
+        # Кожні N рівнів — пропозиція вміння
+        if res.skill_levels:
+            self.pending_skill_choice = True
+        return res
 
     def _exp_to_next(self) -> int:
         return 20 + (self.level - 1) * 10
 
 
-@dataclass
+@dataclass(slots=True)
+class LevelUp:
+    """Результат apply_exp: підсумковий рівень, залишок досвіду, прирости й рівні з вибором уміння."""
+    start_level: int
+    level: int
+    exp: int
+    max_hp: int = 0
+    atk: int = 0
+    defense: int = 0
+    skill_levels: Sequence[int] = ()
+
+    @property
+    def levels(self) -> int:
+        return self.level - self.start_level
+
+
+@dataclass(slots=True)
 class Enemy:
     name: str
     hp: int
@@ -79,22 +130,46 @@ class Enemy:
     defense: int
     exp_reward: int
     gold_reward: int
+    tier: str = "normal"      # ранг (ENEMY_TIERS) — впливає на таблицю луту
+
+    def asdict(self) -> Dict[str, Any]:
+        return asdict(self)
 
     def is_alive(self) -> bool:
         return self.hp > 0
 
 
 # ----- Хелпери стану користувача -----
+# У user_data живуть самі об'єкти Player/Enemy: хендлери змінюють їх на місці,
+# а в dict/байти вони перетворюються лише під час збереження (storage/codec.py).
+# Старі збереження зі словниками конвертуються при першому доступі.
+# Мутація на місці не проходить через __setitem__, тож хендлер, що змінює
+# гравця/ворога, викликає mark_dirty(); читання (/stats, меню) версію не чіпає.
+
+def mark_dirty(user_data: Dict[str, Any], *keys: str) -> None:
+    """Позначити об'єкти в user_data зміненими (TrackedUserData.touch); за замовчуванням — гравця."""
+    touch = getattr(user_data, "touch", None)
+    if touch is not None:
+        for key in keys or ("player",):
+            touch(key)
 
 def ensure_player_ud(user_data: Dict[str, Any]) -> Player:
-    if "player" not in user_data:
-        user_data["player"] = Player().asdict()
-    p = dict_to_player(user_data["player"])
-    user_data["player"] = p.asdict()
+    p = user_data.get("player")
+    if not isinstance(p, Player):
+        p = dict_to_player(p) if p else Player()
+        user_data["player"] = p
     return p
 
+def get_enemy_ud(user_data: Dict[str, Any]) -> Optional[Enemy]:
+    e = user_data.get("enemy")
+    if e is None or isinstance(e, Enemy):
+        return e
+    e = dict_to_enemy(e)
+    user_data["enemy"] = e
+    return e
+
 def dict_to_player(d: Dict[str, Any]) -> Player:
-    return Player(**d)
+    return d if isinstance(d, Player) else Player(**d)
 
 def dict_to_enemy(d: Dict[str, Any]) -> Enemy:
-    return Enemy(**d)
+    return d if isinstance(d, Enemy) else Enemy(**d)
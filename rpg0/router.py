@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Єдиний маршрутизатор callback'ів inline-кнопок.
+
+callback_data має вигляд "простір:дія[:аргументи]". Маршрутизатор розбирає
+його один раз і знаходить маршрут одним пошуком у словнику (простір, дія) —
+замість ланцюжка regex-хендлерів PTB і if/elif усередині кожного з них.
+Аргументи маршруту типізовані (int/str/...): "shop:sell:3" викликає
+callback(update, context, 3). Маршрут з дією "*" ловить решту дій простору
+(дія стає першим аргументом).
+
+Маршрути реєструються декоратором у модулях хендлерів:
+
+    @ROUTER.route("shop", "sell", int)
+    async def shop_sell(update, context, idx): ...
+
+а в build_app() додається ROUTER.handler(...) — один BaseHandler на всі
+простори (або на підмножину, напр. для станів ConversationHandler).
+Лічильники викликів маршрутів — ROUTER.stats() і metrics ("callback.<маршрут>").
+
+Клавіатури будують callback_data через ROUTER.data("shop", "sell", 3): за
+CALLBACK_COMPACT це компактний "~..." (utils/callback_codec.py), інакше —
+текстовий "shop:sell:3". resolve() розуміє обидва формати; кнопка з іншої
+версії реєстру потрапляє на маршрут ROUTER.stale.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler
+
+from .config import CALLBACK_COMPACT
+from .utils import metrics
+from .utils.callback_codec import PREFIX, MAX_LEN, CallbackCodec, StaleCallback
+
+LOGGER = logging.getLogger("RPG")
+
+WILDCARD = "*"
+
+
+class Route:
+    __slots__ = ("namespace", "action", "callback", "types", "answer", "name", "metric", "sample", "hits")
+
+    def __init__(self, namespace: str, action: str, callback: Callable, types: Tuple[type, ...],
+                 answer: bool = True):
+        self.namespace = namespace
+        self.action = action
+        self.callback = callback
+        self.types = types
+        self.answer = answer
+        self.name = f"{namespace}:{action}" if action else namespace
+        self.metric = "callback." + self.name
+        self.sample = "handler." + self.name  # час виконання, с
+        self.hits = 0
+
+    def parse_args(self, raw: str) -> Optional[tuple]:
+        """Рядок аргументів -> кортеж типізованих значень; None — не підходить під маршрут."""
+        if not self.types:
+            return () if not raw else None
+        parts = raw.split(":", len(self.types) - 1)
+        if len(parts) != len(self.types):
+            return None
+        try:
+            return tuple(t(v) for t, v in zip(self.types, parts))
+        except ValueError:
+            return None
+
+
+async def _stale(update: Update, context: Any) -> None:
+    await update.callback_query.answer("Кнопка застаріла — відкрийте меню ще раз.", show_alert=True)
+
+
+class CallbackRouter:
+    def __init__(self, compact: bool = CALLBACK_COMPACT) -> None:
+        self._routes: Dict[Tuple[str, str], Route] = {}
+        self._codec: Optional[CallbackCodec] = None
+        self.compact = compact
+        self.frozen = False
+        # Компактна кнопка з іншої версії реєстру (після деплою зі зміненими маршрутами/даними)
+        self.stale = Route("", "stale", _stale, (), answer=False)
+
+    def add(self, namespace: str, action: str, callback: Callable, *types: type, answer: bool = True) -> Route:
+        if self.frozen:
+            raise RuntimeError(f"Маршрут {namespace}:{action} додано після freeze(): реєстр уже закодовано.")
+        key = (namespace, action)
+        if key in self._routes:
+            raise ValueError(f"Маршрут {namespace}:{action} уже зареєстровано.")
+        route = self._routes[key] = Route(namespace, action, callback, types, answer)
+        self._codec = None
+        return route
+
+    def route(self, namespace: str, action: str = "", *types: type, answer: bool = True):
+        """Декоратор: зареєструвати async-функцію (update, context, *args) як маршрут."""
+        def deco(fn):
+            self.add(namespace, action, fn, *types, answer=answer)
+            return fn
+        return deco
+
+    # ---- Кодування callback_data ----
+
+    def codec(self) -> CallbackCodec:
+        """Знімок реєстру для компактного формату (будується при першій потребі)."""
+        if self._codec is None:
+            self._codec = CallbackCodec(self._routes.values())
+        return self._codec
+
+    def freeze(self) -> None:
+        """
+        Побудувати реєстр id заздалегідь (при старті бота) і закрити реєстр:
+        маршрут, доданий пізніше, змінив би тег і зробив би застарілими
+        кнопки, які вже розіслано.
+        """
+        codec = self.codec()
+        self.frozen = True
+        LOGGER.info("Callback-кодек: %d маршрутів, тег %04x", len(codec.routes), codec.tag)
+
+    def data(self, namespace: str, action: str = "", *args: Any) -> str:
+        """callback_data для кнопки: компактна, якщо можна, інакше "простір:дія:аргументи"."""
+        text = ":".join([namespace, action, *map(str, args)] if action else [namespace, *map(str, args)])
+        if not self.compact:
+            return text
+        route = self._routes.get((namespace, action))
+        if route is None or len(args) != len(route.types):
+            route = self._routes.get((namespace, WILDCARD))
+            args = (text.partition(":")[2],)
+        encoded = self.codec().encode(route, args) if route is not None else None
+        if encoded is None or len(encoded) >= len(text.encode("utf-8")):
+            return text
+        return encoded
+
+    def resolve(self, data: str) -> Optional[Tuple[Route, tuple]]:
+        if data.startswith(PREFIX):
+            if len(data) > MAX_LEN:
+                return None
+            try:
+                return self.codec().decode(data)
+            except StaleCallback:
+                return self.stale, ()
+            except ValueError:
+                return None
+        ns, _, rest = data.partition(":")
+        action, _, raw = rest.partition(":")
+        route = self._routes.get((ns, action))
+        if route is not None:
+            args = route.parse_args(raw)
+            if args is not None:
+                return route, args
+        # невідома дія або аргументи не підійшли — до запасного маршруту простору
+        route = self._routes.get((ns, WILDCARD))
+        if route is None:
+            return None
+        args = route.parse_args(rest)
+        return None if args is None else (route, args)
+
+    def handler(self, *namespaces: str, exclude: Iterable[str] = ()) -> "RouterHandler":
+        """BaseHandler для PTB: усі простори, лише `namespaces`, або всі, крім `exclude`."""
+        return RouterHandler(self, frozenset(namespaces), frozenset(exclude))
+
+    def routes(self) -> Iterable[Route]:
+        return self._routes.values()
+
+    def stats(self) -> Dict[str, int]:
+        """Скільки разів спрацював кожен маршрут."""
+        out = {r.name: r.hits for r in self._routes.values()}
+        out["stale"] = self.stale.hits
+        return out
+
+
+async def _unused(update: Any, context: Any) -> None:  # pragma: no cover
+    return None
+
+
+class RouterHandler(BaseHandler):
+    """Один хендлер PTB на весь маршрутизатор: розбір у check_update, виклик маршруту в handle_update."""
+
+    __slots__ = ("router", "namespaces", "exclude")
+
+    def __init__(self, router: CallbackRouter, namespaces: frozenset, exclude: frozenset, block: bool = True):
+        super().__init__(_unused, block=block)
+        self.router = router
+        self.namespaces = namespaces
+        self.exclude = exclude
+
+    def check_update(self, update: object) -> Optional[Tuple[Route, tuple]]:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        hit = self.router.resolve(data)
+        if hit is None:
+            return None
+        ns = hit[0].namespace
+        if (self.namespaces and ns not in self.namespaces) or ns in self.exclude:
+            return None
+        return hit
+
+    async def handle_update(self, update: Update, application: Any, check_result: Tuple[Route, tuple],
+                            context: Any) -> Any:
+        route, args = check_result
+        route.hits += 1
+        metrics.inc(route.metric)
+        t0 = time.perf_counter()
+        try:
+            if route.answer:
+                await update.callback_query.answer()
+            return await route.callback(update, context, *args)
+        finally:
+            metrics.observe(route.sample, time.perf_counter() - t0)
+
+
+# Єдиний маршрутизатор бота; хендлери реєструють у ньому свої маршрути під час імпорту
+ROUTER = CallbackRouter()
+
+
+__all__ = ["Route", "CallbackRouter", "RouterHandler", "ROUTER", "WILDCARD"]
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Монте-Карло симулятор балансу: python -m rpg0.sim
+
+Ганяє тисячі/мільйони боїв одночасно як операції над масивами NumPy
+(рядок масиву = один бій) і рахує для кожного клас × передісторія ×
+локація × рівень: відсоток перемог, ходів до вбивства, втрачене HP,
+витрачені зілля, а також золото/EXP за годину з урахуванням розкладу
+/explore 60/25/15 (бій / знахідка / відпочинок).
+
+Формули — ті самі, що в грі:
+- roll_damage / roll_player_attack (utils/battle_engine.py): max(1, atk-def ± 2), крит 15% ×2;
+- уміння класу (utils/skills.py): dmg, кровотеча 5% max HP за хід, оглушення, бафи на 1 хід,
+  тік кулдаунів наприкінці ходу ворога;
+- вороги, їхні ваги/ранги і масштабування за рівнем — з реєстру utils/spawns.py;
+- золото знахідки — як у generate_loot.
+
+Припущення симуляції (задаються прапорцями):
+- гравець починає бій з повним HP, без спорядження;
+- вміння відкриваються по одному кожні SKILL_SELECT_INTERVAL рівнів у порядку CLASS_SKILLS;
+- політика: зілля нижче порогу HP (поки є), далі перше готове вміння, інакше атака;
+- нагорода бою (exp_reward/gold_reward) зараховується за перемогу.
+
+NumPy — необов'язкова залежність, потрібна лише для симулятора: pip install numpy
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - залежить від оточення
+    np = None
+
+from .config import BACKSTORIES, CLASSES, ENEMY_TABLES, SKILL_SELECT_INTERVAL, SKILL_SLOT_MAX
+from .utils.skills import CLASS_SKILLS
+from .utils.spawns import scaled_stats, spawn_table
+
+# Коди типів умінь у масивах. Ефекти з utils/effects.py, яких тут немає (shield, regen, …),
+# симулятор не моделює — їх треба додати сюди разом з векторною поведінкою.
+SKILL_TYPES = ("dmg", "bleed", "stun", "buff_def", "buff_atk", "heal")
+_NO_SKILL = -1
+_DMG, _BLEED, _STUN, _BUFF_DEF, _BUFF_ATK, _HEAL = range(len(SKILL_TYPES))
+
+POTION_HEAL = 8         # бойове зілля (on_battle_action: potion)
+CRIT_CHANCE = 0.15
+BLEED_SHARE = 0.05
+EXPLORE_BATTLE, EXPLORE_LOOT = 0.60, 0.85   # пороги roll у explore()
+
+# Золото знахідки: (поріг random(), min, max) як у generate_loot
+_LOOT_GOLD = ((0.60, 0, 4), (0.85, 2, 8), (0.97, 5, 12), (1.01, 10, 20))
+
+
+def _require_numpy() -> None:
+    if np is None:
+        sys.exit("Симулятору потрібен NumPy: pip install numpy")
+
+
+# ---- Побудова вхідних масивів ----
+
+def player_stats(cls: str, bs: str, level: int) -> Dict[str, int]:
+    """Характеристики гравця: база Player + бонуси реєстрації + прирости рівнів."""
+    hp, atk, defense, potions = 30, 6, 2, 2
+    for src in (CLASSES.get(cls, {}), BACKSTORIES.get(bs, {})):
+        hp += src.get("hp", 0)
+        atk += src.get("atk", 0)
+        defense += src.get("defense", 0)
+        potions += src.get("potions", 0)
+    ups = level - 1
+    return {"hp": hp + 5 * ups, "atk": atk + 2 * ups, "def": defense + ups, "potions": potions}
+
+
+def skill_slots(cls: str, level: int, n_skills: int | None = None) -> List[tuple]:
+    """[(тип, сила, КД)] для вмінь, які гравець має на цьому рівні."""
+    n = min(SKILL_SLOT_MAX, level // SKILL_SELECT_INTERVAL) if n_skills is None else n_skills
+    out = []
+    for sdef in list(CLASS_SKILLS.get(cls, {}).values())[:n]:
+        out.append((SKILL_TYPES.index(sdef["type"]), int(sdef["power"]), int(sdef["cd"])))
+    return out
+
+
+def _enemy_block(location: str, level: int):
+    """Масиви шаблонів ворогів локації, вже масштабовані під рівень, і їхні ймовірності появи."""
+    pairs = spawn_table(location).weights_for(level) or spawn_table("Тракт").weights_for(level)
+    stats = [scaled_stats(t, level) for t, _w in pairs]
+    weights = np.array([w for _t, w in pairs], dtype=float)
+    cols = [np.array([st[i] for st in stats], dtype=np.int32) for i in range(1, 6)]
+    return (*cols, weights / weights.sum())
+
+
+# ---- Векторизований бій ----
+
+def _roll(rng, base, n):
+    """roll_damage для масивів: max(1, max(0, base) + randint(-2, 2))."""
+    return np.maximum(1, np.maximum(0, base) + rng.integers(-2, 3, size=n, dtype=np.int32))
+
+
+def simulate_battles(rng, p_hp, p_atk, p_def, potions, sk_type, sk_power, sk_cd,
+                     e_hp, e_atk, e_def, potion_threshold: float = 0.35, max_turns: int = 60):
+    """
+    Провести len(p_hp) незалежних боїв. sk_* — масиви (R, SKILL_SLOT_MAX), тип -1 = слота немає.
+    Повертає dict масивів: won, turns, hp_lost, potions_used.
+    """
+    n = len(p_hp)
+    p_max = p_hp.copy()
+    hp = p_hp.copy()
+    ehp = e_hp.copy()
+    emax = e_hp
+    pots = potions.copy()
+    pots_used = np.zeros(n, np.int32)
+    cds = np.zeros(sk_type.shape, np.int32)
+    bleed = np.zeros(n, np.int32)
+    stun = np.zeros(n, np.int32)
+    atk_up = np.zeros(n, np.int32)
+    def_up = np.zeros(n, np.int32)
+    turns = np.zeros(n, np.int32)
+    won = np.zeros(n, bool)
+    act = np.ones(n, bool)
+    bleed_dmg = np.maximum(1, (emax * BLEED_SHARE).astype(np.int32))
+
+    for _ in range(max_turns):
+        if not act.any():
+            break
+        idx = np.flatnonzero(act)
+        k = len(idx)
+
+        # (1) політика гравця
+        drink = (hp[idx] < potion_threshold * p_max[idx]) & (pots[idx] > 0) & (hp[idx] < p_max[idx])
+        chosen = np.full(k, _NO_SKILL, np.int32)
+        free = ~drink
+        for s in range(sk_type.shape[1]):
+            t = sk_type[idx, s]
+            useful = (t != _NO_SKILL) & (cds[idx, s] == 0)
+            useful &= ~((t == _BLEED) & (bleed[idx] > 0))
+            useful &= ~((t == _STUN) & (stun[idx] > 0))
+            useful &= ~((t == _BUFF_ATK) & (atk_up[idx] > 0))
+            pick = free & useful
+            chosen[pick] = s
+            free &= ~pick
+        attack = free
+
+        # (2) дія гравця
+        d = idx[drink]
+        healed = np.minimum(p_max[d] - hp[d], POTION_HEAL)
+        hp[d] += healed
+        pots[d] -= 1
+        pots_used[d] += 1
+
+        sk = chosen >= 0
+        if sk.any():
+            si = idx[sk]
+            slot = chosen[sk]
+            t = sk_type[si, slot]
+            pw = sk_power[si, slot]
+            m = t == _DMG
+            if m.any():
+                r = si[m]
+                ehp[r] -= _roll(rng, p_atk[r] + pw[m] - e_def[r], len(r))
+            m = t == _BLEED
+            bleed[si[m]] = np.maximum(bleed[si[m]], pw[m])
+            m = t == _STUN
+            stun[si[m]] = np.maximum(stun[si[m]], pw[m])
+            m = t == _BUFF_DEF
+            def_up[si[m]] = pw[m]
+            m = t == _BUFF_ATK
+            atk_up[si[m]] = pw[m]
+            m = t == _HEAL
+            hp[si[m]] += np.minimum(p_max[si[m]] - hp[si[m]], pw[m])
+            cds[si, slot] = sk_cd[si, slot]
+
+        a = idx[attack]
+        if len(a):
+            dmg = _roll(rng, p_atk[a] + atk_up[a] - e_def[a], len(a))
+            crit = rng.random(len(a)) < CRIT_CHANCE
+            ehp[a] -= np.where(crit, dmg * 2, dmg)
+            atk_up[a] = 0
+
+        turns[idx] += 1
+        dead = idx[ehp[idx] <= 0]
+        won[dead] = True
+        act[dead] = False
+
+        # (3) хід ворога: кровотеча -> оглушення -> атака -> скидання DEF-бафу -> тік КД
+        idx = np.flatnonzero(act)
+        b = idx[bleed[idx] > 0]
+        ehp[b] -= bleed_dmg[b]
+        bleed[b] -= 1
+        dead = idx[ehp[idx] <= 0]
+        won[dead] = True
+        act[dead] = False
+
+        idx = np.flatnonzero(act)
+        stunned = stun[idx] > 0
+        stun[idx[stunned]] -= 1
+        hit = idx[~stunned]
+        if len(hit):
+            hp[hit] -= _roll(rng, e_atk[hit] - (p_def[hit] + def_up[hit]), len(hit))
+            def_up[hit] = 0
+        cds[idx] = np.maximum(0, cds[idx] - 1)
+        act[hit[hp[hit] <= 0]] = False
+
+    return {
+        "won": won,
+        "turns": turns,
+        "hp_lost": np.clip(p_hp - hp, 0, None),
+        "potions_used": pots_used,
+    }
+
+
+def _loot_gold(rng, n):
+    r = rng.random(n)
+    out = np.zeros(n, np.int32)
+    lo = 0.0
+    for hi, gmin, gmax in _LOOT_GOLD:
+        m = (r >= lo) & (r < hi)
+        out[m] = rng.integers(gmin, gmax + 1, size=int(m.sum()), dtype=np.int32)
+        lo = hi
+    return out
+
+
+# ---- Прогін сітки ----
+
+def run(classes: Sequence[str], backstories: Sequence[str], locations: Sequence[str], levels: Sequence[int],
+        battles: int = 2000, seed: int = 0, potion_threshold: float = 0.35, max_turns: int = 60,
+        action_sec: float = 5.0, chunk_rows: int = 1_000_000) -> List[Dict[str, object]]:
+    """Прогнати сітку комбінацій; кожна — `battles` боїв. Повертає рядки звіту."""
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    combos = list(itertools.product(classes, backstories, locations, levels))
+    per_chunk = max(1, chunk_rows // battles)
+    rows: List[Dict[str, object]] = []
+    slots = SKILL_SLOT_MAX
+
+    for c0 in range(0, len(combos), per_chunk):
+        chunk = combos[c0:c0 + per_chunk]
+        cols = {k: [] for k in ("p_hp", "p_atk", "p_def", "pots", "e_hp", "e_atk", "e_def", "exp", "gold")}
+        sk_t, sk_p, sk_c = [], [], []
+        for cls, bs, loc, lvl in chunk:
+            st = player_stats(cls, bs, lvl)
+            hp, atk, dfn, exp, gold, prob = _enemy_block(loc, lvl)
+            pick = rng.choice(len(hp), size=battles, p=prob)
+            cols["p_hp"].append(np.full(battles, st["hp"], np.int32))
+            cols["p_atk"].append(np.full(battles, st["atk"], np.int32))
+            cols["p_def"].append(np.full(battles, st["def"], np.int32))
+            cols["pots"].append(np.full(battles, st["potions"], np.int32))
+            cols["e_hp"].append(hp[pick])
+            cols["e_atk"].append(atk[pick])
+            cols["e_def"].append(dfn[pick])
+            cols["exp"].append(exp[pick])
+            cols["gold"].append(gold[pick] + rng.integers(0, 2 * lvl + 1, size=battles, dtype=np.int32))
+            sks = skill_slots(cls, lvl) + [(_NO_SKILL, 0, 0)] * slots
+            sk_t.append(np.tile([s[0] for s in sks[:slots]], (battles, 1)))
+            sk_p.append(np.tile([s[1] for s in sks[:slots]], (battles, 1)))
+            sk_c.append(np.tile([s[2] for s in sks[:slots]], (battles, 1)))
+        a = {k: np.concatenate(v) for k, v in cols.items()}
+        res = simulate_battles(
+            rng, a["p_hp"], a["p_atk"], a["p_def"], a["pots"],
+            np.concatenate(sk_t).astype(np.int32), np.concatenate(sk_p).astype(np.int32),
+            np.concatenate(sk_c).astype(np.int32),
+            a["e_hp"], a["e_atk"], a["e_def"], potion_threshold, max_turns,
+        )
+
+        shape = (len(chunk), battles)
+        won = res["won"].reshape(shape)
+        turns = res["turns"].reshape(shape)
+        hp_lost = res["hp_lost"].reshape(shape)
+        pots = res["potions_used"].reshape(shape)
+        exp = np.where(won, a["exp"].reshape(shape), 0)
+        gold = np.where(won, a["gold"].reshape(shape), 0)
+        loot = _loot_gold(rng, won.size).reshape(shape)
+
+        win_rate = won.mean(axis=1)
+        kills = np.maximum(1, won.sum(axis=1))
+        # одна дія /explore: 60% бій (turns дій), 25% знахідка, 15% відпочинок (по одній дії)
+        sec = (EXPLORE_BATTLE * turns.mean(axis=1) + (1 - EXPLORE_BATTLE)) * action_sec
+        loot_share = EXPLORE_LOOT - EXPLORE_BATTLE
+        gold_h = (EXPLORE_BATTLE * gold.mean(axis=1) + loot_share * loot.mean(axis=1)) / sec * 3600
+        exp_h = EXPLORE_BATTLE * exp.mean(axis=1) / sec * 3600
+
+        for i, (cls, bs, loc, lvl) in enumerate(chunk):
+            rows.append({
+                "class": cls, "backstory": bs, "location": loc, "level": lvl,
+                "win_rate": float(win_rate[i]),
+                "turns_to_kill": float((turns[i] * won[i]).sum() / kills[i]),
+                "hp_lost": float(hp_lost[i].mean()),
+                "potions": float(pots[i].mean()),
+                "gold_per_hour": float(gold_h[i]),
+                "exp_per_hour": float(exp_h[i]),
+            })
+    return rows
+
+
+# ---- CLI ----
+
+def _csv_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rpg0.sim", description="Монте-Карло симулятор балансу RPG0.")
+    ap.add_argument("--classes", default=",".join(CLASSES), help="класи через кому")
+    ap.add_argument("--backstories", default=",".join(BACKSTORIES), help="передісторії через кому")
+    ap.add_argument("--locations", default=",".join(ENEMY_TABLES), help="локації через кому")
+    ap.add_argument("--levels", default="1,3,5,10,15", help="рівні через кому")
+    ap.add_argument("--battles", type=int, default=2000, help="боїв на кожну комбінацію")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--potion-threshold", type=float, default=0.35, help="пити зілля нижче цієї частки HP")
+    ap.add_argument("--max-turns", type=int, default=60)
+    ap.add_argument("--action-sec", type=float, default=5.0, help="секунд на одну дію гравця (для /год)")
+    ap.add_argument("--csv", help="зберегти результати в CSV замість таблиці")
+    args = ap.parse_args(argv)
+    _require_numpy()
+
+    levels = [int(v) for v in _csv_list(args.levels)]
+    t0 = time.perf_counter()
+    rows = run(_csv_list(args.classes), _csv_list(args.backstories), _csv_list(args.locations), levels,
+               battles=args.battles, seed=args.seed, potion_threshold=args.potion_threshold,
+               max_turns=args.max_turns, action_sec=args.action_sec)
+    elapsed = time.perf_counter() - t0
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+    else:
+        print(f"{'клас':<9} {'передісторія':<15} {'локація':<21} {'рів':>3} {'перемог':>8} "
+              f"{'ходів':>6} {'-HP':>6} {'зілля':>6} {'золото/год':>11} {'EXP/год':>8}")
+        for r in rows:
+            print(f"{r['class']:<9} {r['backstory']:<15} {r['location']:<21} {r['level']:>3} "
+                  f"{r['win_rate']:>7.1%} {r['turns_to_kill']:>6.1f} {r['hp_lost']:>6.1f} {r['potions']:>6.2f} "
+                  f"{r['gold_per_hour']:>11.0f} {r['exp_per_hour']:>8.0f}")
+    total = len(rows) * args.battles
+    print(f"{total} боїв за {elapsed:.2f} с ({total / max(elapsed, 1e-9):,.0f} боїв/с)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,700 @@
+# -*- coding: utf-8 -*-
+"""
+Компактне версіоноване бінарне кодування Player / Enemy / предметів.
+
+Формат запису: [версія][тип запису] далі пари (id поля, значення).
+- цілі — zigzag-varint;
+- рідкісність, тип предмета і слот — індекси в незмінних таблицях;
+- рядки — індекс в таблиці інтернованих рядків версії або літерал UTF-8;
+- стандартні `title`/`emoji` для рідкісності кодуються одним байтом-прапорцем;
+- предмет зі статичного каталогу — це лише id шаблону + стан екземпляра;
+- невідомі ключі зберігаються в полі 0 (узагальнене кодування), тож
+  round-trip не губить нічого, що додали інші модулі.
+
+Player/Enemy кодуються прямо зі слотів (без asdict()-копії). Тіла
+записів типових предметів (шаблон + стан) запам'ятовуються в обидва боки:
+рюкзак — це десятки однакових речей, і їх не треба щоразу розбирати.
+
+Таблиці лише доповнюються в кінці; будь-яка інша зміна — це нова
+версія CODEC_VERSION зі своєю таблицею рядків.
+"""
+from __future__ import annotations
+
+import dataclasses
+import pickle
+import re
+import struct
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.catalog import RARITY_EMOJI, RARITY_TITLE, Item, as_item, template
+
+CODEC_VERSION = 1
+
+# Типи записів
+REC_PLAYER, REC_ENEMY, REC_ITEM = 1, 2, 3
+
+RARITIES = ("common", "uncommon", "rare", "epic", "legendary")
+ITEM_TYPES = ("weapon", "armor", "accessory")
+SLOTS = ("weapon", "armor", "accessory")
+
+STD_TITLE = RARITY_TITLE
+STD_EMOJI = RARITY_EMOJI
+
+# Інтерновані рядки v1: класи, передісторії, уміння, локації, назви предметів і ворогів
+_STRINGS_V1 = (
+    "Мандрівник",
+    "Рицар", "Стрілець", "Маг",
+    "Селянин", "Учень алхіміка", "Вигнанець", "Адепт храму", "Шляхтич",
+    "Щитова стійка", "Рубаючий удар", "Оглушення",
+    "Прицільний постріл", "Кровоточива стріла", "Уклон",
+    "Вогняний снаряд", "Крижане скування", "Імпульс сили",
+    "Гільдія авантюристів", "Місто", "Крамниця", "Тракт", "Руїни", "Старий ліс",
+    "Кишеньковий амулет", "Гільдійський жетон", "Срібний перстень",
+    "Моховитий талісман", "Клинок мандрівника", "Шкіряний тубус",
+    "Осколок руни", "Іржавий герб", "Кістяний оберіг",
+    "Значок учня", "Пам’ятна бляшка", "Пробний жетон",
+    "Кинджал ремісника", "Шкіряний нагрудник", "Меч лісника", "Лати стража",
+    "П'яний хуліган", "Кишеньковий злодій", "Шибайголова",
+    "Гоблін-набігник", "Вовк лісовий", "Розбійник тракту",
+    "Кістяний вартовий", "Орк-берсерк", "Рицар-відступник",
+    "Сторож гільдії (спаринг)", "Дикий кабан", "Лісовий дух",
+)
+_STRING_TABLES = {1: _STRINGS_V1}
+_STRING_IDS = {v: {s: i for i, s in enumerate(t)} for v, t in _STRING_TABLES.items()}
+
+
+class CodecError(ValueError):
+    pass
+
+
+# ---- Примітиви ----
+
+def _varint_bytes(n: int) -> bytes:
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+# zigzag-varint типових малих чисел (статів, цін, міцності) — готовими байтами
+_SVARINT = {n: _varint_bytes(n << 1 if n >= 0 else (-n << 1) - 1) for n in range(-64, 8192)}
+
+
+class _Writer:
+    __slots__ = ("buf", "sids")
+
+    def __init__(self, version: int = CODEC_VERSION):
+        self.buf = bytearray()
+        self.sids = _STRING_IDS[version]
+
+    def uvarint(self, n: int) -> None:
+        while n > 0x7F:
+            self.buf.append((n & 0x7F) | 0x80)
+            n >>= 7
+        self.buf.append(n)
+
+    def svarint(self, n: int) -> None:
+        b = _SVARINT.get(n)
+        if b is not None:
+            self.buf += b
+        else:
+            self.uvarint(n << 1 if n >= 0 else (-n << 1) - 1)
+
+    def string(self, s: str) -> None:
+        sid = self.sids.get(s)
+        if sid is not None:
+            self.uvarint(sid + 1)
+            return
+        raw = s.encode("utf-8")
+        self.uvarint(0)
+        self.uvarint(len(raw))
+        self.buf += raw
+
+
+class _Reader:
+    __slots__ = ("buf", "pos", "strings")
+
+    def __init__(self, buf: bytes, version: int):
+        self.buf = buf
+        self.pos = 0
+        try:
+            self.strings = _STRING_TABLES[version]
+        except KeyError:
+            raise CodecError(f"Невідома версія кодека: {version}") from None
+
+    def byte(self) -> int:
+        b = self.buf[self.pos]
+        self.pos += 1
+        return b
+
+    def uvarint(self) -> int:
+        buf, pos = self.buf, self.pos
+        b = buf[pos]
+        pos += 1
+        if b < 0x80:
+            self.pos = pos
+            return b
+        result, shift = b & 0x7F, 7
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                self.pos = pos
+                return result
+            shift += 7
+
+    def svarint(self) -> int:
+        n = self.uvarint()
+        return (n >> 1) ^ -(n & 1)
+
+    def string(self) -> str:
+        sid = self.uvarint()
+        if sid:
+            return self.strings[sid - 1]
+        n = self.uvarint()
+        raw = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        return raw.decode("utf-8")
+
+
+# ---- Узагальнене значення (для невідомих ключів і upgrades) ----
+
+_T_NONE, _T_FALSE, _T_TRUE, _T_INT, _T_STR, _T_FLOAT, _T_LIST, _T_DICT, _T_PICKLE = range(9)
+
+
+def _write_any(w: _Writer, v: Any) -> None:
+    if v is None:
+        w.uvarint(_T_NONE)
+    elif v is True or v is False:
+        w.uvarint(_T_TRUE if v else _T_FALSE)
+    elif type(v) is int:
+        w.uvarint(_T_INT)
+        w.svarint(v)
+    elif type(v) is str:
+        w.uvarint(_T_STR)
+        w.string(v)
+    elif type(v) is float:
+        w.uvarint(_T_FLOAT)
+        w.buf += struct.pack("<d", v)
+    elif type(v) is list:
+        w.uvarint(_T_LIST)
+        w.uvarint(len(v))
+        for x in v:
+            _write_any(w, x)
+    elif type(v) is dict and all(type(k) is str for k in v):
+        w.uvarint(_T_DICT)
+        w.uvarint(len(v))
+        for k, x in v.items():
+            w.string(k)
+            _write_any(w, x)
+    else:
+        raw = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+        w.uvarint(_T_PICKLE)
+        w.uvarint(len(raw))
+        w.buf += raw
+
+
+def _read_any(r: _Reader) -> Any:
+    t = r.uvarint()
+    if t == _T_NONE:
+        return None
+    if t in (_T_FALSE, _T_TRUE):
+        return t == _T_TRUE
+    if t == _T_INT:
+        return r.svarint()
+    if t == _T_STR:
+        return r.string()
+    if t == _T_FLOAT:
+        (v,) = struct.unpack_from("<d", r.buf, r.pos)
+        r.pos += 8
+        return v
+    if t == _T_LIST:
+        return [_read_any(r) for _ in range(r.uvarint())]
+    if t == _T_DICT:
+        return {r.string(): _read_any(r) for _ in range(r.uvarint())}
+    if t == _T_PICKLE:
+        n = r.uvarint()
+        v = pickle.loads(r.buf[r.pos:r.pos + n])
+        r.pos += n
+        return v
+    raise CodecError(f"Невідомий тег значення: {t}")
+
+
+# ---- Схеми записів: ключ -> (id поля, тип) ----
+
+_INT, _BOOL, _STR, _RARITY, _ITYPE, _ANY, _ITEMS, _EQUIP, _STRS = range(9)
+
+_ITEM_FIELDS: Dict[str, Tuple[int, int]] = {
+    "name": (1, _STR), "rarity": (2, _RARITY), "title": (3, _STR), "emoji": (4, _STR),
+    "type": (5, _ITYPE), "atk": (6, _INT), "def": (7, _INT), "defense": (8, _INT),
+    "price": (9, _INT), "equipped": (10, _BOOL), "durability": (11, _INT),
+    "durability_max": (12, _INT), "dur": (13, _INT), "gold": (14, _INT),
+    "cid": (17, _INT),
+}
+# Прапорці без значення: title/emoji дорівнюють стандартним для рідкісності
+_F_STD_TITLE, _F_STD_EMOJI = 15, 16
+# Стан екземпляра, що пишеться поруч з id шаблону
+_ITEM_STATE = ("price", "equipped", "dur", "durability", "gold")
+
+_PLAYER_FIELDS: Dict[str, Tuple[int, int]] = {
+    "name": (1, _STR), "level": (2, _INT), "exp": (3, _INT), "hp": (4, _INT),
+    "max_hp": (5, _INT), "atk": (6, _INT), "defense": (7, _INT), "potions": (8, _INT),
+    "gold": (9, _INT), "class_name": (10, _STR), "backstory": (11, _STR),
+    "registered": (12, _BOOL), "inventory": (13, _ITEMS), "upgrades": (14, _ANY),
+    "equipment": (15, _EQUIP), "skills_known": (16, _STRS), "skills_loadout": (17, _STRS),
+    "pending_skill_choice": (18, _BOOL), "loot_pity": (19, _ANY),
+}
+
+_ENEMY_FIELDS: Dict[str, Tuple[int, int]] = {
+    "name": (1, _STR), "hp": (2, _INT), "max_hp": (3, _INT), "atk": (4, _INT),
+    "defense": (5, _INT), "exp_reward": (6, _INT), "gold_reward": (7, _INT),
+    "tier": (8, _STR),
+}
+
+_F_EXTRA = 0
+
+
+def _by_id(fields: Dict[str, Tuple[int, int]]) -> Dict[int, Tuple[str, int]]:
+    return {fid: (key, kind) for key, (fid, kind) in fields.items()}
+
+
+_ITEM_IDS = _by_id(_ITEM_FIELDS)
+_PLAYER_IDS = _by_id(_PLAYER_FIELDS)
+_ENEMY_IDS = _by_id(_ENEMY_FIELDS)
+
+
+def _fits(kind: int, v: Any) -> bool:
+    """Чи підходить значення під типізоване поле (інакше — в extras)."""
+    if kind == _INT:
+        return type(v) is int
+    if kind == _BOOL:
+        return type(v) is bool
+    if kind == _STR:
+        return type(v) is str
+    if kind == _RARITY:
+        return v in RARITIES
+    if kind == _ITYPE:
+        return v in ITEM_TYPES
+    if kind == _ITEMS:
+        return isinstance(v, list) and all(isinstance(x, (dict, Item)) for x in v)
+    if kind == _EQUIP:
+        return isinstance(v, dict) and all(
+            k in SLOTS and (x is None or isinstance(x, (dict, Item))) for k, x in v.items()
+        )
+    if kind == _STRS:
+        return type(v) is list and all(type(x) is str for x in v)
+    return True
+
+
+def _write_value(w: _Writer, kind: int, v: Any) -> None:
+    if kind == _INT:
+        w.svarint(v)
+    elif kind == _BOOL:
+        w.uvarint(1 if v else 0)
+    elif kind == _STR:
+        w.string(v)
+    elif kind == _RARITY:
+        w.uvarint(RARITIES.index(v))
+    elif kind == _ITYPE:
+        w.uvarint(ITEM_TYPES.index(v))
+    elif kind == _ITEMS:
+        _write_items(w, v)
+    elif kind == _EQUIP:
+        w.uvarint(len(v))
+        for slot, it in v.items():
+            w.uvarint(SLOTS.index(slot))
+            if it is None:
+                w.uvarint(0)
+            else:
+                w.uvarint(1)
+                _write_item_body(w, it)
+    elif kind == _STRS:
+        w.uvarint(len(v))
+        for s in v:
+            w.string(s)
+    else:
+        _write_any(w, v)
+
+
+def _read_value(r: _Reader, kind: int) -> Any:
+    if kind == _INT:
+        return r.svarint()
+    if kind == _BOOL:
+        return bool(r.uvarint())
+    if kind == _STR:
+        return r.string()
+    if kind == _RARITY:
+        return RARITIES[r.uvarint()]
+    if kind == _ITYPE:
+        return ITEM_TYPES[r.uvarint()]
+    if kind == _ITEMS:
+        return _read_items(r, r.uvarint())
+    if kind == _EQUIP:
+        out = {}
+        for _ in range(r.uvarint()):
+            slot = SLOTS[r.uvarint()]
+            out[slot] = _read_item_body(r) if r.uvarint() else None
+        return out
+    if kind == _STRS:
+        return [r.string() for _ in range(r.uvarint())]
+    return _read_any(r)
+
+
+def _split_fields(d: Dict[str, Any], fields: Dict[str, Tuple[int, int]],
+                  skip: Callable[[str, Any], bool] = lambda k, v: False):
+    """Розкласти dict на типізовані поля схеми та «зайві» ключі (підуть у поле 0)."""
+    known: List[Tuple[int, int, Any]] = []
+    extra: Dict[str, Any] = {}
+    for k, v in d.items():
+        spec = fields.get(k)
+        if spec is not None and _fits(spec[1], v):
+            if not skip(k, v):
+                known.append((spec[0], spec[1], v))
+        else:
+            extra[k] = v
+    return known, extra
+
+
+def _split_object(obj: Any, fields: Dict[str, Tuple[int, int]]):
+    """Те саме для dataclass (Player/Enemy): поля читаються зі слотів, без asdict()-копії."""
+    known: List[Tuple[int, int, Any]] = []
+    extra: Dict[str, Any] = {}
+    for k in _field_names(type(obj)):
+        v = getattr(obj, k)
+        spec = fields.get(k)
+        if spec is not None and _fits(spec[1], v):
+            known.append((spec[0], spec[1], v))
+        else:
+            extra[k] = v
+    return known, extra
+
+
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> Tuple[str, ...]:
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in dataclasses.fields(cls))
+    return names
+
+
+def _write_record(w: _Writer, known, extra, flags: List[int] = ()) -> None:
+    """[кількість][id значення]... ; прапорці — id без значення."""
+    w.uvarint(len(known) + len(flags) + (1 if extra else 0))
+    for fid in flags:
+        w.uvarint(fid)
+    for fid, kind, v in known:
+        w.uvarint(fid)
+        _write_value(w, kind, v)
+    if extra:
+        w.uvarint(_F_EXTRA)
+        _write_any(w, extra)
+
+
+# Стан статичного предмета: (id поля, атрибут Item) у порядку запису
+_STATE_FIDS = ((9, "price"), (10, "equipped"), (13, "dur"), (11, "durability"), (14, "gold"))
+# точні типи: 5.0 == 5 і True == 1, тож у ключі кешу інші типи збіглися б із цілими
+_INT_OR_NONE = frozenset((int, type(None)))
+_BOOL_OR_NONE = frozenset((bool, type(None)))
+# (cid, стан) -> готове тіло запису: у рюкзаках багато однакових предметів
+_ITEM_BODIES: Dict[tuple, bytes] = {}
+_ITEM_BODIES_MAX = 4096
+
+
+def _static_item_body(it: Item) -> Optional[bytes]:
+    """Тіло запису предмета з каталогу без extras; None — стан нетиповий (загальний шлях)."""
+    price, equipped, dur, durability, gold = it.price, it.equipped, it.dur, it.durability, it.gold
+    if (type(price) not in _INT_OR_NONE or type(dur) not in _INT_OR_NONE
+            or type(durability) not in _INT_OR_NONE or type(gold) not in _INT_OR_NONE
+            or type(equipped) not in _BOOL_OR_NONE):
+        return None
+    key = (it.tpl.cid, price, equipped, dur, durability, gold)
+    body = _ITEM_BODIES.get(key)
+    if body is not None:
+        return body
+    w = _Writer()
+    n = 1
+    for (fid, _attr), v in zip(_STATE_FIDS, key[1:]):
+        if v is None:
+            continue
+        n += 1
+        w.uvarint(fid)
+        if fid == 10:
+            w.uvarint(1 if v else 0)
+        else:
+            w.svarint(v)
+    w.uvarint(17)
+    w.svarint(it.tpl.cid)
+    body = _varint_bytes(n) + bytes(w.buf)
+    if len(_ITEM_BODIES) >= _ITEM_BODIES_MAX:
+        _ITEM_BODIES.clear()
+    _ITEM_BODIES[key] = body
+    return body
+
+
+def _write_items(w: _Writer, items: List[Any]) -> None:
+    """Рюкзак: типові предмети — готовими тілами з _ITEM_BODIES, решта — загальним шляхом."""
+    w.uvarint(len(items))
+    buf, get = w.buf, _ITEM_BODIES.get
+    for it in items:
+        if type(it) is Item and it.tpl.static and not it.extra:
+            price, equipped, dur, durability, gold = it.price, it.equipped, it.dur, it.durability, it.gold
+            if (type(price) in _INT_OR_NONE and type(dur) in _INT_OR_NONE and type(durability) in _INT_OR_NONE
+                    and type(gold) in _INT_OR_NONE and type(equipped) in _BOOL_OR_NONE):
+                body = get((it.tpl.cid, price, equipped, dur, durability, gold))
+                if body is not None:
+                    buf += body
+                    continue
+        _write_item_body(w, it)
+
+
+def _write_item_body(w: _Writer, it: Any) -> None:
+    if isinstance(it, Item):
+        if it.tpl.static and not it.extra:
+            body = _static_item_body(it)
+            if body is not None:
+                w.buf += body
+                return
+        if it.tpl.static:
+            state = {k: getattr(it, k) for k in _ITEM_STATE if getattr(it, k) is not None}
+            state["cid"] = it.tpl.cid
+            if it.extra:
+                state.update(it.extra)
+            known, extra = _split_fields(state, _ITEM_FIELDS)
+            _write_record(w, known, extra)
+            return
+        it = it.to_dict()
+    rarity = it.get("rarity")
+    flags = []
+    if rarity in STD_TITLE and it.get("title") == STD_TITLE[rarity]:
+        flags.append(_F_STD_TITLE)
+    if rarity in STD_EMOJI and it.get("emoji") == STD_EMOJI[rarity]:
+        flags.append(_F_STD_EMOJI)
+
+    def skip(k: str, v: Any) -> bool:
+        return (k == "title" and _F_STD_TITLE in flags) or (k == "emoji" and _F_STD_EMOJI in flags)
+
+    known, extra = _split_fields(it, _ITEM_FIELDS, skip)
+    _write_record(w, known, extra, flags)
+
+
+def _read_fields(r: _Reader, ids: Dict[int, Tuple[str, int]]) -> Tuple[Dict[str, Any], List[int]]:
+    out: Dict[str, Any] = {}
+    flags: List[int] = []
+    for _ in range(r.uvarint()):
+        fid = r.uvarint()
+        if fid == _F_EXTRA:
+            out.update(_read_any(r))
+        elif fid in ids:
+            key, kind = ids[fid]
+            out[key] = _read_value(r, kind)
+        else:
+            flags.append(fid)
+    return out, flags
+
+
+# Запис статичного предмета: [к-сть] (поле стану, varint)* (17, varint cid). Регулярка лише
+# знаходить межі запису; що він справді такий, гарантує розбір нижче.
+_STATIC_RECORD = re.compile(rb"[\x01-\x06](?:[\x09\x0a\x0b\x0d\x0e][\x80-\xff]*[\x00-\x7f])*"
+                            rb"\x11[\x80-\xff]*[\x00-\x7f]")
+# байти запису -> (шаблон, стан): ті самі предмети в рюкзаках читаються без розбору
+_ITEM_STATES: Dict[bytes, tuple] = {}
+
+
+def _parse_static_item(raw: bytes) -> Optional[tuple]:
+    r = _Reader(raw, CODEC_VERSION)
+    n = r.uvarint()
+    price = dur = durability = gold = cid = None
+    equipped = False
+    for _ in range(n):
+        if r.pos >= len(raw):
+            return None  # регулярка захопила лише початок довшого запису (з extras)
+        fid, v = r.uvarint(), r.uvarint()
+        if fid == 10:
+            equipped = bool(v)
+            continue
+        v = (v >> 1) ^ -(v & 1)
+        if fid == 17:
+            cid = v
+        elif fid == 9:
+            price = v
+        elif fid == 13:
+            dur = v
+        elif fid == 11:
+            durability = v
+        elif fid == 14:
+            gold = v
+        else:
+            return None
+    if cid is None or r.pos != len(raw):
+        return None
+    return template(cid), price, equipped, dur, durability, gold
+
+
+def _read_static_item(r: _Reader) -> Optional[Item]:
+    """Швидкий шлях: запис = стан + cid. None — інші поля (тоді читає загальний шлях)."""
+    m = _STATIC_RECORD.match(r.buf, r.pos)
+    if m is None:
+        return None
+    raw = m.group()
+    state = _ITEM_STATES.get(raw)
+    if state is None:
+        state = _parse_static_item(raw)
+        if state is None:
+            return None
+        if len(_ITEM_STATES) >= _ITEM_BODIES_MAX:
+            _ITEM_STATES.clear()
+        _ITEM_STATES[raw] = state
+    r.pos = m.end()
+    return Item(*state)
+
+
+def _read_items(r: _Reader, n: int) -> List[Item]:
+    out = []
+    match, buf, get = _STATIC_RECORD.match, r.buf, _ITEM_STATES.get
+    for _ in range(n):
+        m = match(buf, r.pos)
+        state = get(m.group()) if m is not None else None
+        if state is not None:
+            r.pos = m.end()
+            out.append(Item(*state))
+        else:
+            out.append(_read_item_body(r))
+    return out
+
+
+def _read_item_body(r: _Reader) -> Item:
+    start = r.pos
+    item = _read_static_item(r)
+    if item is not None:
+        return item
+    r.pos = start
+    it, flags = _read_fields(r, _ITEM_IDS)
+    if "cid" in it:
+        tpl = template(it.pop("cid"))
+        state = {k: it.pop(k) for k in _ITEM_STATE if k in it}
+        return Item(tpl, extra=it or None, **state)
+    rarity = it.get("rarity")
+    if _F_STD_TITLE in flags:
+        it["title"] = STD_TITLE[rarity]
+    if _F_STD_EMOJI in flags:
+        it["emoji"] = STD_EMOJI[rarity]
+    return as_item(it)
+
+
+# ---- Публічне API ----
+
+_SCHEMAS = {REC_PLAYER: (_PLAYER_FIELDS, _PLAYER_IDS), REC_ENEMY: (_ENEMY_FIELDS, _ENEMY_IDS)}
+
+
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    if isinstance(obj, (dict, Item)):
+        return obj
+    if hasattr(obj, "asdict"):
+        return obj.asdict()
+    return dict(obj.__dict__)
+
+
+def _encode(rec: int, obj: Any) -> bytes:
+    w = _Writer()
+    w.buf += bytes((CODEC_VERSION, rec))
+    if rec == REC_ITEM:
+        _write_item_body(w, _as_dict(obj))
+    else:
+        fields, _ = _SCHEMAS[rec]
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            # живий Player/Enemy — прямо зі слотів, без проміжного dict
+            known, extra = _split_object(obj, fields)
+        else:
+            known, extra = _split_fields(_as_dict(obj), fields)
+        _write_record(w, known, extra)
+    return bytes(w.buf)
+
+
+def _decode(rec: int, blob: bytes) -> Dict[str, Any]:
+    if len(blob) < 2:
+        raise CodecError("Порожній запис.")
+    r = _Reader(blob, blob[0])
+    if blob[1] != rec:
+        raise CodecError(f"Очікувався запис типу {rec}, отримано {blob[1]}.")
+    r.pos = 2
+    if rec == REC_ITEM:
+        return _read_item_body(r)
+    _, ids = _SCHEMAS[rec]
+    out, _flags = _read_fields(r, ids)
+    return out
+
+
+def encode_player(p: Any) -> bytes:
+    """Player (або його dict) -> bytes."""
+    return _encode(REC_PLAYER, p)
+
+
+def decode_player(blob: bytes) -> Dict[str, Any]:
+    return _decode(REC_PLAYER, blob)
+
+
+def encode_enemy(e: Any) -> bytes:
+    return _encode(REC_ENEMY, e)
+
+
+def decode_enemy(blob: bytes) -> Dict[str, Any]:
+    return _decode(REC_ENEMY, blob)
+
+
+def encode_item(it: Any) -> bytes:
+    return _encode(REC_ITEM, it)
+
+
+def decode_item(blob: bytes) -> Item:
+    return _decode(REC_ITEM, blob)
+
+
+# ---- user_data для персистентності ----
+
+# Ключі user_data, які кодуються компактно, і їхні (encode, decode)
+PACKED_KEYS = {
+    "player": (encode_player, decode_player),
+    "enemy": (encode_enemy, decode_enemy),
+    "loot_pending": (encode_item, decode_item),
+}
+
+
+class Packed(bytes):
+    """Маркер: значення user_data закодоване цим кодеком."""
+
+
+def pack_state(ud: Dict[Any, Any]) -> Dict[Any, Any]:
+    """Копія user_data, де player/enemy/loot_pending замінені компактними байтами."""
+    out = dict(ud)
+    for key, (enc, _dec) in PACKED_KEYS.items():
+        v = out.get(key)
+        if v is not None and not isinstance(v, Packed):
+            out[key] = Packed(enc(v))
+    return out
+
+
+def unpack_state(ud: Dict[Any, Any]) -> Dict[Any, Any]:
+    for key, (_enc, dec) in PACKED_KEYS.items():
+        v = ud.get(key)
+        if isinstance(v, Packed):
+            ud[key] = dec(bytes(v))
+    return ud
+
+
+__all__ = [
+    "CODEC_VERSION",
+    "CodecError",
+    "encode_player",
+    "decode_player",
+    "encode_enemy",
+    "decode_enemy",
+    "encode_item",
+    "decode_item",
+    "pack_state",
+    "unpack_state",
+]
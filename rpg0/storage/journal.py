@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Журнал змін стану гравця.
+
+Замість повного знімка user_data записуємо компактний список операцій
+між останнім збереженим і поточним станом: дельти характеристик
+(`inc`), додавання/видалення речей (`ins`/`pop`), зміну локації чи
+прогресу квесту (`set`/`del`). Знімок + хвіст журналу = актуальний стан.
+
+Живі Player/Enemy порівнюються по полях, тож шлях веде крізь них так само,
+як крізь dict зі знімка: ("player", "gold").
+
+Операції — кортежі, шлях — кортеж ключів/індексів від кореня user_data:
+    ("set", path, value)
+    ("del", path)
+    ("inc", path, delta)
+    ("ins", path, index, value)
+    ("pop", path, index)
+"""
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, List, Tuple
+
+Op = Tuple[Any, ...]
+
+
+def _is_int(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _diff_list(old: list, new: list, path: tuple, out: List[Op]) -> None:
+    # Спільний префікс і суфікс — типовий випадок append/pop однієї речі
+    n_old, n_new = len(old), len(new)
+    pre = 0
+    while pre < n_old and pre < n_new and old[pre] == new[pre]:
+        pre += 1
+    suf = 0
+    while suf < n_old - pre and suf < n_new - pre and old[n_old - 1 - suf] == new[n_new - 1 - suf]:
+        suf += 1
+    removed = n_old - pre - suf
+    inserted = new[pre:n_new - suf]
+    if removed + len(inserted) > n_new:
+        # Перестановка «всього» — дешевше записати список цілком
+        out.append(("set", path, list(new)))
+        return
+    out.extend(("pop", path, pre) for _ in range(removed))
+    out.extend(("ins", path, pre + i, v) for i, v in enumerate(inserted))
+
+
+def _plain(v: Any) -> Any:
+    """Player/Enemy у значенні операції — dict: знімок читається кодеком як dict, і шляхи журналу
+    (напр. ("player", "gold")) мають вести в dict."""
+    return v.asdict() if dataclasses.is_dataclass(v) and not isinstance(v, type) else v
+
+
+def _diff(old: Any, new: Any, path: tuple, out: List[Op]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k, v in new.items():
+            if k not in old:
+                out.append(("set", path + (k,), _plain(v)))
+            elif old[k] != v:
+                _diff(old[k], v, path + (k,), out)
+        out.extend(("del", path + (k,)) for k in old if k not in new)
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_list(old, new, path, out)
+    elif _is_int(old) and _is_int(new):
+        out.append(("inc", path, new - old))
+    elif type(old) is type(new) and dataclasses.is_dataclass(new):
+        # живий Player/Enemy — по полях, без asdict()-копії обох сторін
+        for f in dataclasses.fields(new):
+            a, b = getattr(old, f.name), getattr(new, f.name)
+            if a != b:
+                _diff(a, b, path + (f.name,), out)
+    else:
+        out.append(("set", path, _plain(new)))
+
+
+def diff(old: dict, new: dict) -> List[Op]:
+    """Операції, що переводять `old` у `new`. Порожній список — змін немає."""
+    out: List[Op] = []
+    if old != new:
+        _diff(old, new, (), out)
+    return out
+
+
+def _parent(state: Any, path: tuple) -> Any:
+    for k in path[:-1]:
+        state = state[k]
+    return state
+
+
+def _target(state: Any, path: tuple) -> Any:
+    for k in path:
+        state = state[k]
+    return state
+
+
+def apply(state: dict, ops: List[Op]) -> dict:
+    """Застосувати операції до `state` на місці й повернути його."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if kind == "set":
+            if not path:
+                state.clear()
+                state.update(op[2])
+            else:
+                _parent(state, path)[path[-1]] = op[2]
+        elif kind == "del":
+            _parent(state, path).pop(path[-1], None)
+        elif kind == "inc":
+            _parent(state, path)[path[-1]] += op[2]
+        elif kind == "ins":
+            _target(state, path).insert(op[2], op[3])
+        elif kind == "pop":
+            _target(state, path).pop(op[2])
+    return state
+
+
+__all__ = ["diff", "apply"]
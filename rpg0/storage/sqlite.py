@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite-персистентність для PTB: один рядок на гравця / чат / ключ розмови.
+
+На відміну від PicklePersistence, яка щоразу перезаписує весь файл,
+тут записуються лише ті рядки, чиї дані справді змінилися. Файл БД працює
+в режимі WAL, тож падіння посеред запису не зіпсує вже збережене.
+
+Запис відкладений (write-behind): update_*_data лише ставить рядок у чергу,
+повторні зміни того самого гравця зливаються в один запис, а вся черга
+скидається однією транзакцією раз на `write_delay` секунд. Серіалізація,
+дифи й fsync виконуються в окремому потоці (єдиний воркер, тож скидання
+ніколи не перекриваються), а на event loop лишається тільки дешевий
+copy-on-write знімок змінених ключів (див. tracking.py).
+
+Лінивий режим (`lazy=True`): на старті user_data не читається зовсім —
+дані гравця підтягуються з бази, коли приходить його перший апдейт
+(PTB викликає refresh_user_data перед кожним хендлером). Кількість
+гравців у пам'яті обмежена LRU (`cache_size`): найдовше неактивні
+скидаються на диск, а їхній user_data спорожнюється до наступного апдейту.
+Гравців, чий апдейт саме обробляється (`busy`, з PerUserUpdateProcessor),
+не витісняємо — інакше зміни хендлера після clear() загубилися б.
+
+Журнальний режим (`journal=True`): для гравців, чий попередній стан уже
+записаний у цій сесії, пишемо не весь user_data, а компактний запис
+журналу (див. journal.py) — вартість запису пропорційна зміні. Кожні
+`compact_every` записів або `compact_interval` секунд журнал згортається
+у знімки. Під час читання знімок доповнюється хвостом журналу.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from ..utils import metrics
+from . import journal as jr
+from .codec import pack_state, unpack_state
+from .tracking import TrackedUserData
+
+LOGGER = logging.getLogger("RPG")
+
+# Маркер видалення рядка в черзі запису
+_DELETE = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data    BLOB NOT NULL,
+    seq     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS chat_data (
+    chat_id INTEGER PRIMARY KEY,
+    data    BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    name TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name  TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    ops     BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_user ON journal (user_id, seq);
+"""
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(blob: bytes) -> Any:
+    return pickle.loads(blob)
+
+
+def _dumps_user(state: Dict[Any, Any]) -> bytes:
+    """user_data гравця: player/enemy/лут — компактним кодеком, решта — pickle."""
+    return _dumps(pack_state(state))
+
+
+def _loads_user(blob: bytes) -> Dict[Any, Any]:
+    return unpack_state(_loads(blob))
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+_ID_COLS = {"user_data": "user_id", "chat_data": "chat_id", "kv": "name"}
+
+
+def _conv_key(key: tuple) -> str:
+    return json.dumps(list(key), ensure_ascii=False)
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    BasePersistence поверх локальної SQLite-бази.
+
+    Для кожного рядка пам'ятаємо хеш останнього записаного блобу, тому
+    повторний update_*_data без реальних змін не торкається диска. Якщо
+    user_data — TrackedUserData, «чисті» гравці відсікаються ще до серіалізації
+    за номером версії.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = 60,
+        write_delay: float = 1.0,
+        lazy: bool = False,
+        cache_size: int = 0,
+        journal: bool = False,
+        compact_every: int = 500,
+        compact_interval: float = 600,
+        busy: Optional[Callable[[int], bool]] = None,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = filepath
+        self._conn = sqlite3.connect(filepath, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        cols = {row[1] for row in self._conn.execute("PRAGMA table_info(user_data)")}
+        if "seq" not in cols:
+            # база зі старішої версії без журналу
+            self._conn.execute("ALTER TABLE user_data ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        # (таблиця, id) -> хеш останнього записаного блобу
+        self._written: Dict[tuple, bytes] = {}
+        # user_id -> версія TrackedUserData, яку вже поставлено в чергу/записано
+        self._queued_version: Dict[int, int] = {}
+        # Черга write-behind: (таблиця, id) -> об'єкт або _DELETE
+        self._pending: Dict[tuple, Any] = {}
+        self.write_delay = write_delay
+        self._drain_handle: Optional[asyncio.TimerHandle] = None
+        # Уся робота з базою — в одному потоці: записи не перекриваються, а
+        # читання ліниво завантажених гравців стають у чергу після записів
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpg-persist")
+        self._flush_lock = asyncio.Lock()
+        self.lazy = lazy
+        self.cache_size = cache_size
+        # Лінивий режим: user_id -> живий user_data, у порядку останнього доступу
+        self._resident: "OrderedDict[int, Dict[Any, Any]]" = OrderedDict()
+        # user_id -> чи обробляється зараз його апдейт (такого не витісняємо)
+        self.busy = busy
+        self.journal = journal
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        # user_id -> останній записаний стан (база для дифу журналу)
+        self._baseline: Dict[int, Dict[Any, Any]] = {}
+        self._journal_len: int = self._conn.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+        self._last_compact = time.monotonic()
+        if self._journal_len and not journal:
+            self._compact()  # журнал лишився від журнального режиму — згортаємо одразу
+
+    # ---- Внутрішнє ----
+
+    def _load_table(self, table: str, id_col: str) -> Dict[int, Any]:
+        out = {}
+        for row_id, blob in self._conn.execute(f"SELECT {id_col}, data FROM {table}"):
+            out[row_id] = _loads(blob)
+            self._written[(table, row_id)] = _digest(blob)
+        return out
+
+    async def _in_worker(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _enqueue(self, table: str, row_id: Any, obj: Any) -> None:
+        self._pending[(table, row_id)] = obj
+        if self._drain_handle is None:
+            loop = asyncio.get_running_loop()
+            self._drain_handle = loop.call_later(
+                self.write_delay, lambda: loop.create_task(self._drain())
+            )
+
+    async def _drain(self) -> None:
+        """Забрати чергу на loop (O(1)) і записати її у воркер-потоці."""
+        self._drain_handle = None
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            resident = set(self._resident) if self.lazy else None
+            t0 = time.perf_counter()
+            await self._in_worker(self._write_batch, pending, resident)
+            metrics.observe("persist.flush", time.perf_counter() - t0)
+
+    def _write_batch(self, pending: Dict[tuple, Any], resident: Optional[set]) -> None:
+        """Воркер-потік: записати всю чергу однією транзакцією."""
+        written = 0
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for (table, row_id), obj in pending.items():
+                if table == "conversations":
+                    written += self._write_conversation(row_id, obj)
+                elif obj is _DELETE:
+                    self._conn.execute(f"DELETE FROM {table} WHERE {_ID_COLS[table]} = ?", (row_id,))
+                    if table == "user_data":
+                        self._conn.execute("DELETE FROM journal WHERE user_id = ?", (row_id,))
+                        self._baseline.pop(row_id, None)
+                    self._written.pop((table, row_id), None)
+                    written += 1
+                elif table == "user_data" and self.journal:
+                    written += self._write_user(row_id, obj)
+                else:
+                    written += self._write_row(table, row_id, obj)
+        metrics.inc("persist.rows", written)
+        LOGGER.debug("SQLite: записано %d з %d рядків у черзі", written, len(pending))
+        if resident is not None:
+            # бази дифів тримаємо лише для гравців у пам'яті
+            for user_id in [u for u in self._baseline if u not in resident]:
+                del self._baseline[user_id]
+        if self._journal_len and (
+            self._journal_len >= self.compact_every
+            or time.monotonic() - self._last_compact >= self.compact_interval
+        ):
+            self._compact()
+
+    def _write_user(self, user_id: int, state: Dict[Any, Any]) -> int:
+        """Журнальний запис гравця: дельта до попереднього стану або повний знімок."""
+        base = self._baseline.get(user_id)
+        self._baseline[user_id] = state
+        if base is None:
+            # першого запису в сесії — повний знімок, чинний на поточний кінець журналу
+            self._conn.execute(
+                "INSERT INTO user_data (user_id, data, seq) "
+                "VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) FROM journal)) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, seq = excluded.seq",
+                (user_id, _dumps_user(state)),
+            )
+            return 1
+        ops = jr.diff(base, state)
+        if not ops:
+            return 0
+        self._conn.execute("INSERT INTO journal (user_id, ops) VALUES (?, ?)", (user_id, _dumps(ops)))
+        self._journal_len += 1
+        return 1
+
+    def _compact(self) -> None:
+        """Згорнути журнал у знімки user_data."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            max_seq = self._conn.execute("SELECT MAX(seq) FROM journal").fetchone()[0]
+            if max_seq is not None:
+                users = [r[0] for r in self._conn.execute("SELECT DISTINCT user_id FROM journal")]
+                for user_id in users:
+                    state = self._load_users(user_id).get(user_id)
+                    if state is None:
+                        continue
+                    self._conn.execute(
+                        "UPDATE user_data SET data = ?, seq = ? WHERE user_id = ?",
+                        (_dumps_user(state), max_seq, user_id),
+                    )
+                self._conn.execute("DELETE FROM journal WHERE seq <= ?", (max_seq,))
+                LOGGER.info("SQLite: журнал згорнуто (%d записів, %d гравців)", self._journal_len, len(users))
+        self._journal_len = 0
+        self._last_compact = time.monotonic()
+
+    def _load_users(self, user_id: Optional[int] = None) -> Dict[int, Dict[Any, Any]]:
+        """Знімки user_data + хвіст журналу (для одного гравця або всіх)."""
+        where, args = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+        states, seqs = {}, {}
+        for uid, blob, seq in self._conn.execute(f"SELECT user_id, data, seq FROM user_data {where}", args):
+            states[uid] = _loads_user(blob)
+            seqs[uid] = seq
+            if not self.journal:
+                self._written[("user_data", uid)] = _digest(blob)
+        rows = self._conn.execute(f"SELECT user_id, seq, ops FROM journal {where} ORDER BY seq", args)
+        for uid, seq, ops in rows:
+            if uid in states and seq > seqs[uid]:
+                jr.apply(states[uid], _loads(ops))
+        return states
+
+    def _write_row(self, table: str, row_id: Any, obj: Any) -> int:
+        blob = _dumps_user(obj) if table == "user_data" else _dumps(obj)
+        h = _digest(blob)
+        if self._written.get((table, row_id)) == h:
+            return 0
+        id_col = _ID_COLS[table]
+        self._conn.execute(
+            f"INSERT INTO {table} ({id_col}, data) VALUES (?, ?) "
+            f"ON CONFLICT({id_col}) DO UPDATE SET data = excluded.data",
+            (row_id, blob),
+        )
+        self._written[(table, row_id)] = h
+        return 1
+
+    def _write_conversation(self, row_id: tuple, new_state: Any) -> int:
+        name, key = row_id
+        if new_state is None:
+            self._conn.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, key))
+        else:
+            self._conn.execute(
+                "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+                "ON CONFLICT(name, key) DO UPDATE SET state = excluded.state",
+                (name, key, _dumps(new_state)),
+            )
+        return 1
+
+    # ---- Завантаження ----
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        if self.lazy:
+            return {}  # усе підтягнеться в refresh_user_data
+        data = await self._in_worker(self._load_users)
+        return {user_id: TrackedUserData(ud) for user_id, ud in data.items()}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return await self._in_worker(self._load_table, "chat_data", "chat_id")
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        data = (await self._in_worker(self._load_table, "kv", "name")).get("bot_data")
+        return data if data is not None else {}
+
+    async def get_callback_data(self):
+        return (await self._in_worker(self._load_table, "kv", "name")).get("callback_data")
+
+    def _load_conversations(self, name: str) -> Dict[tuple, object]:
+        rows = self._conn.execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): _loads(state) for key, state in rows}
+
+    async def get_conversations(self, name: str) -> Dict[tuple, object]:
+        return await self._in_worker(self._load_conversations, name)
+
+    # ---- Запис ----
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        if self.lazy and user_id not in self._resident:
+            return  # витіснений гравець: його стан уже в черзі/на диску
+        version = getattr(data, "version", None)
+        if version is not None:
+            if self._queued_version.get(user_id, 0) == version:
+                return  # реальних змін не було
+            self._queued_version[user_id] = version
+        self._enqueue("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._enqueue("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._enqueue("kv", "bot_data", data)
+
+    async def update_callback_data(self, data) -> None:
+        self._enqueue("kv", "callback_data", data)
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        self._enqueue("conversations", (name, _conv_key(key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._queued_version.pop(user_id, None)
+        self._resident.pop(user_id, None)
+        self._enqueue("user_data", user_id, _DELETE)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._enqueue("chat_data", chat_id, _DELETE)
+
+    # ---- Оновлення з бази ----
+
+    async def _read_user(self, user_id: int) -> Optional[Dict[Any, Any]]:
+        queued = self._pending.get(("user_data", user_id))
+        if queued is not None:
+            # ще не дійшло до диска — беремо з черги (копію: черговий об'єкт стане базою дифу)
+            return None if queued is _DELETE else copy.deepcopy(dict(queued))
+        # воркер виконує задачі по черзі, тож запис, що вже летить, завершиться раніше
+        return (await self._in_worker(self._load_users, user_id)).get(user_id)
+
+    def _evict(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        version = getattr(user_data, "version", None)
+        # update_user_data ставить у чергу сам живий dict — clear() нижче спорожнив би й запис у черзі
+        queued_live = self._pending.get(("user_data", user_id)) is user_data
+        if version is None or self._queued_version.get(user_id, 0) != version or queued_live:
+            if version is not None:
+                self._queued_version[user_id] = version
+            # після clear() живий dict більше не тримає ці значення — копія не потрібна
+            self._enqueue("user_data", user_id, dict(user_data))
+        dict.clear(user_data)
+        if isinstance(user_data, TrackedUserData):
+            user_data.drop_snapshot()
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        """Лінивий режим: підвантажити гравця при першому апдейті й підтримати LRU."""
+        if not self.lazy:
+            return  # процес — єдиний власник файлу, усе вже в пам'яті
+        if user_id in self._resident:
+            self._resident.move_to_end(user_id)
+            return
+        stored = await self._read_user(user_id)
+        if stored and not user_data:
+            # dict.update в обхід трекінгу: завантаження — не зміна
+            dict.update(user_data, stored)
+            version = getattr(user_data, "version", None)
+            if version is not None:
+                self._queued_version[user_id] = version
+        self._resident[user_id] = user_data
+        # кожного гравця перевіряємо щонайбільше раз: якщо зайняті всі, кеш тимчасово більший
+        for _ in range(len(self._resident)):
+            if not self.cache_size or len(self._resident) <= self.cache_size:
+                break
+            old_id = next(iter(self._resident))
+            if old_id == user_id or (self.busy is not None and self.busy(old_id)):
+                # хендлер гравця ще працює (або от-от почне) з цим dict — відсуваємо в кінець LRU
+                self._resident.move_to_end(old_id)
+                metrics.inc("persist.evict_busy")
+                continue
+            self._evict(old_id, self._resident.pop(old_id))
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._drain_handle is not None:
+            self._drain_handle.cancel()
+        await self._drain()
+        await self._in_worker(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _close(self) -> None:
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+
+
+__all__ = ["SQLitePersistence"]
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Відстеження змін у context.user_data.
+
+TrackedUserData — звичайний dict, який на кожну *реальну* зміну ключа
+видає новий номер версії. Перезапис тим самим значенням (типове
+`user_data["player"] = p.asdict()` без змін у герої) версію не змінює,
+тож персистентність бачить такого гравця «чистим» і не пише його.
+
+deepcopy (PTB робить його перед кожним update_user_data) — copy-on-write:
+ключі, що не змінилися з попереднього знімка, беруться з нього ж, тож
+копіюються лише змінені ключі. Знімки вважаються незмінними.
+"""
+from __future__ import annotations
+
+import copy
+import itertools
+from typing import Any, Dict, Iterable, Optional
+
+# Спільний лічильник: версії унікальні між усіма екземплярами, тож
+# заново створений user_data ніколи не збіжеться зі старою версією.
+_VERSIONS = itertools.count(1)
+
+_IMMUTABLE = (str, int, float, bool, bytes, tuple, type(None))
+
+
+def _same(old: Any, new: Any) -> bool:
+    """Чи є присвоєння no-op. Той самий об'єкт міг змінитися на місці — тоді ні."""
+    if old is new:
+        return isinstance(new, _IMMUTABLE)
+    try:
+        return bool(old == new)
+    except Exception:
+        return False
+
+
+class TrackedUserData(dict):
+    """user_data з версіями ключів. `version` зростає лише на реальних змінах."""
+
+    __slots__ = ("version", "key_versions", "_snap", "_snap_version")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version: int = 0
+        self.key_versions: Dict[Any, int] = {}
+        self._snap: Optional[Dict[Any, Any]] = None
+        self._snap_version: int = 0
+
+    def _bump(self, key: Any) -> None:
+        v = next(_VERSIONS)
+        self.version = v
+        self.key_versions[key] = v
+
+    def touch(self, key: Any) -> None:
+        """Позначити ключ зміненим (для мутацій вкладених об'єктів без присвоєння)."""
+        if key in self:
+            self._bump(key)
+
+    # ---- Мутації ----
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key in self and _same(dict.__getitem__(self, key), value):
+            return
+        super().__setitem__(key, value)
+        self._bump(key)
+
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        self._bump(key)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+            return default
+        value = dict.__getitem__(self, key)
+        # setdefault у хендлерах — це «дай мені об'єкт, я його зміню»
+        if not isinstance(value, _IMMUTABLE):
+            self._bump(key)
+        return value
+
+    _MISSING = object()
+
+    def pop(self, key: Any, default: Any = _MISSING) -> Any:
+        if key in self:
+            value = super().pop(key)
+            self._bump(key)
+            return value
+        if default is TrackedUserData._MISSING:
+            raise KeyError(key)
+        return default
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._bump(key)
+        return key, value
+
+    def clear(self) -> None:
+        for key in list(self):
+            self._bump(key)
+        super().clear()
+
+    def update(self, *args, **kwargs) -> None:
+        other: Iterable = dict(*args, **kwargs).items()
+        for key, value in other:
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    # ---- Знімки ----
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "TrackedUserData":
+        prev, prev_version = self._snap, self._snap_version
+        items = {}
+        for key, value in dict.items(self):
+            if prev is not None and key in prev and self.key_versions.get(key, 0) <= prev_version:
+                items[key] = prev[key]
+            else:
+                items[key] = copy.deepcopy(value, memo)
+        self._snap, self._snap_version = items, self.version
+        return _restore(dict(items), self.version, dict(self.key_versions))
+
+    def drop_snapshot(self) -> None:
+        """Забути попередній знімок (наступна копія буде повною)."""
+        self._snap = None
+
+    # pickle не має проходити через __setitem__ (інакше версія зміниться)
+    def __reduce__(self):
+        return _restore, (dict(self), self.version, dict(self.key_versions))
+
+
+def _restore(items: Dict[Any, Any], version: int, key_versions: Dict[Any, int]) -> TrackedUserData:
+    ud = TrackedUserData(items)
+    ud.version = version
+    ud.key_versions = key_versions
+    return ud
+
+
+__all__ = ["TrackedUserData"]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Alias-таблиця Walker/Vose: зважений вибір за O(1).
+
+Будується один раз за O(n) з довільних невід'ємних ваг; кожен вибір —
+одне random() і одне порівняння, незалежно від кількості варіантів.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Generic, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    __slots__ = ("items", "prob", "alias", "n")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if not items or len(items) != len(weights):
+            raise ValueError("Потрібен непорожній список варіантів з вагою для кожного.")
+        total = float(sum(weights))
+        if total <= 0 or any(w < 0 for w in weights):
+            raise ValueError("Ваги мають бути невід'ємні й не всі нульові.")
+        n = len(items)
+        scaled = [w * n / total for w in weights]
+        prob: List[float] = [1.0] * n
+        alias: List[int] = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        # залишки (через похибку float) — ймовірність 1
+        self.items = tuple(items)
+        self.prob = prob
+        self.alias = alias
+        self.n = n
+
+    def sample(self, rng: Any = random) -> T:
+        u = rng.random() * self.n
+        i = int(u)
+        return self.items[i if u - i < self.prob[i] else self.alias[i]]
+
+    def __len__(self) -> int:
+        return self.n
+
+
+__all__ = ["AliasTable"]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Автобій: весь бій розігрується на сервері за простою політикою,
+гравець отримує одне підсумкове повідомлення.
+
+Правила ті самі, що й у ручному бою — кожен раунд це BattleEngine.round()
+(дія гравця + хід ворога з кулдаунами/статусами з utils/skills.py).
+Політика:
+1) HP нижче flee_hp — спроба втечі;
+2) HP нижче potion_hp і є зілля — зілля;
+3) перше готове вміння з активного набору (ефект, що вже діє, повторно не накладається,
+   якщо його тип не позначений refresh — див. effects.py);
+4) інакше — атака.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from ..config import AUTO_BATTLE_FLEE_HP, AUTO_BATTLE_MAX_ROUNDS, AUTO_BATTLE_POTION_HP
+from . import effects
+from .battle_engine import BattleEngine, BattleEvent, CONTINUE, INVALID
+from .skills import skills_for_class
+
+
+@dataclass(slots=True)
+class AutoPolicy:
+    potion_hp: float = AUTO_BATTLE_POTION_HP   # частка max HP
+    flee_hp: float = AUTO_BATTLE_FLEE_HP       # частка max HP (0 — не тікати)
+    max_rounds: int = AUTO_BATTLE_MAX_ROUNDS
+
+
+@dataclass(slots=True)
+class AutoResult:
+    outcome: str
+    rounds: int = 0
+    # події кожного раунду, по списку на раунд
+    log: List[List[BattleEvent]] = field(default_factory=list)
+
+
+def choose_action(engine: BattleEngine, policy: AutoPolicy) -> Tuple[str, str]:
+    p, b = engine.player, engine.state
+    if policy.flee_hp and p.hp < policy.flee_hp * p.max_hp:
+        return "run", ""
+    if p.hp < policy.potion_hp * p.max_hp and p.potions > 0 and p.hp < p.max_hp:
+        return "potion", ""
+    cds = b.get("cooldowns", {})
+    defs = skills_for_class(p.class_name)
+    for name in list(getattr(p, "skills_loadout", None) or []):
+        sdef = defs.get(name)
+        if not sdef or cds.get(name, 0) > 0:
+            continue
+        stype = sdef["type"]
+        et = effects.effect_type(stype)
+        if et is not None and not et.refresh and effects.has(b, stype):
+            continue
+        if stype == "heal" and p.hp >= p.max_hp:
+            continue
+        return "skill", name
+    return "attack", ""
+
+
+def run_auto(engine: BattleEngine, policy: AutoPolicy | None = None) -> AutoResult:
+    """Розіграти бій до кінця (або max_rounds). outcome — як у TurnResult; CONTINUE = ліміт раундів."""
+    policy = policy or AutoPolicy()
+    res = AutoResult(CONTINUE)
+    while res.rounds < policy.max_rounds:
+        action, arg = choose_action(engine, policy)
+        turn = engine.round(action, arg)
+        if turn.outcome == INVALID:
+            turn = engine.round("attack")
+        res.rounds += 1
+        res.log.append(turn.events)
+        if turn.outcome != CONTINUE:
+            res.outcome = turn.outcome
+            break
+    return res
+
+
+__all__ = ["AutoPolicy", "AutoResult", "choose_action", "run_auto"]
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Бойовий рушій без Telegram.
+
+BattleEngine бере Player, Enemy і компактний стан бою (dict з кулдаунами,
+масивом статус-ефектів fx — див. effects.py, seed і номером ходу), застосовує дію і повертає TurnResult —
+підсумок ходу та список структурованих подій. Текст/клавіатури малюють
+хендлери (handlers/battle.py), тут лише правила.
+
+Випадковість — власний Random на кожен хід, засіяний (seed бою, номер ходу):
+той самий бій з тими самими діями відтворюється повністю, і бої можна
+ганяти пачками поза ботом.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import effects
+from .skills import apply_skill, turn_tick_cooldowns
+
+# Підсумок ходу
+CONTINUE = "continue"        # хід знову за гравцем
+ENEMY_TURN = "enemy_turn"    # дія гравця виконана, далі ходить ворог
+WON = "won"
+LOST = "lost"
+FLED = "fled"
+INVALID = "invalid"          # дію не виконано (невідома/недоступна), хід не витрачено
+
+ACTIONS = ("attack", "defend", "potion", "run", "skill")
+
+# ----- Кубики -----
+
+def roll_damage(atk: int, defense: int, rng: Any = random) -> int:
+    """Базовий підрахунок шкоди: (atk - def) з невеликою варіацією, мінімум 1."""
+    base = max(0, atk - defense)
+    variance = rng.randint(-2, 2)
+    return max(1, base + variance)
+
+def roll_player_attack(atk: int, defense: int, rng: Any = random) -> Tuple[int, bool]:
+    """Атака гравця з 15% критом (×2)."""
+    crit = rng.random() < 0.15
+    dmg = roll_damage(atk, defense, rng)
+    if crit:
+        dmg *= 2
+    return dmg, crit
+
+
+@dataclass(slots=True)
+class BattleEvent:
+    """
+    Одна подія ходу. kind:
+    attack(value, crit) | defend(value) | potion(value) | run(ok) | skill(name, text) |
+    effect(value, text) | stunned | enemy_attack(value) | enemy_defeated | player_defeated | invalid(text)
+    """
+    kind: str
+    value: int = 0
+    crit: bool = False
+    ok: bool = False
+    name: str = ""
+    text: str = ""
+
+
+@dataclass(slots=True)
+class TurnResult:
+    outcome: str
+    events: List[BattleEvent] = field(default_factory=list)
+
+
+def new_battle_state(seed: Optional[int] = None) -> Dict[str, Any]:
+    """Свіжий стан бою: окремий seed, лічильник ходів, порожні КД/ефекти."""
+    return {
+        "seed": random.getrandbits(32) if seed is None else seed,
+        "turn": 0,
+        "cooldowns": {},
+        "fx": [],
+    }
+
+
+class BattleEngine:
+    __slots__ = ("player", "enemy", "state")
+
+    def __init__(self, player, enemy, state: Dict[str, Any]):
+        self.player = player
+        self.enemy = enemy
+        self.state = state
+        # стан із попередніх версій — без seed
+        if "seed" not in state:
+            state["seed"] = random.getrandbits(32)
+            state.setdefault("turn", 0)
+
+    def _rng(self, phase: str) -> random.Random:
+        return random.Random(f"{self.state['seed']}:{self.state['turn']}:{phase}")
+
+    # ---- Хід гравця ----
+
+    def player_action(self, action: str, arg: str = "") -> TurnResult:
+        p, e, b = self.player, self.enemy, self.state
+        rng = self._rng("p")
+
+        if action == "attack":
+            atk_b = effects.stat_bonus(b, effects.PLAYER, "atk", consume=True)
+            dmg, crit = roll_player_attack(p.atk + atk_b, e.defense, rng)
+            e.hp -= dmg
+            return self._after_player([BattleEvent("attack", value=dmg, crit=crit)])
+
+        if action == "defend":
+            _turns, val = effects.apply(b, "buff_def", value=max(2, int(p.level / 2) + 1))
+            return self._after_player([BattleEvent("defend", value=val)])
+
+        if action == "potion":
+            if p.potions <= 0:
+                return TurnResult(INVALID, [BattleEvent("invalid", text="🧪 Зілля закінчились.")])
+            p.potions -= 1
+            healed = min(p.max_hp - p.hp, 8)
+            p.hp += healed
+            return self._after_player([BattleEvent("potion", value=healed)])
+
+        if action == "run":
+            if rng.random() < 0.5:
+                return TurnResult(FLED, [BattleEvent("run", ok=True)])
+            return self._after_player([BattleEvent("run", ok=False)])
+
+        if action == "skill":
+            if not arg:
+                return TurnResult(INVALID, [BattleEvent("invalid")])
+            if arg not in (getattr(p, "skills_loadout", None) or []):
+                return TurnResult(INVALID, [BattleEvent("invalid", text="Це уміння не входить до вашого активного набору.")])
+            # ставить КД всередині
+            text = apply_skill(p, e, arg, b, rng)
+            return self._after_player([BattleEvent("skill", name=arg, text=text)])
+
+        return TurnResult(INVALID, [BattleEvent("invalid", text="Невідома бойова дія.")])
+
+    def _after_player(self, events: List[BattleEvent]) -> TurnResult:
+        if self.enemy.hp <= 0:
+            events.append(BattleEvent("enemy_defeated"))
+            return TurnResult(WON, events)
+        return TurnResult(ENEMY_TURN, events)
+
+    # ---- Хід ворога ----
+
+    def enemy_turn(self) -> TurnResult:
+        """
+        1) один прохід ефектів: кровотеча/відновлення/оглушення, тривалості
+        2) атака ворога (якщо не оглушений): баф захисту з'їдається, щити поглинають
+        3) ЄДИНИЙ тік кулдаунів наприкінці
+        """
+        p, e, b = self.player, self.enemy, self.state
+        rng = self._rng("e")
+        events: List[BattleEvent] = []
+
+        hp_before = e.hp
+        fx = effects.tick(b, p, e)
+        if fx.texts:
+            events.append(BattleEvent("effect", value=hp_before - e.hp, text=fx.text))
+        if e.hp <= 0:
+            events.append(BattleEvent("enemy_defeated"))
+            return self._end_round(WON, events, tick=False)
+
+        if fx.stunned:
+            events.append(BattleEvent("stunned"))
+            return self._end_round(CONTINUE, events)
+
+        def_up = effects.stat_bonus(b, effects.PLAYER, "def", consume=True)
+        dmg = max(1, roll_damage(e.atk, p.defense + def_up, rng))
+        dmg = effects.absorb(b, effects.PLAYER, dmg)
+        p.hp -= dmg
+        events.append(BattleEvent("enemy_attack", value=dmg))
+
+        if p.hp <= 0:
+            events.append(BattleEvent("player_defeated"))
+            return self._end_round(LOST, events)
+        return self._end_round(CONTINUE, events)
+
+    def _end_round(self, outcome: str, events: List[BattleEvent], tick: bool = True) -> TurnResult:
+        if tick:
+            turn_tick_cooldowns(self.state)
+        self.state["turn"] = self.state.get("turn", 0) + 1
+        return TurnResult(outcome, events)
+
+    def round(self, action: str, arg: str = "") -> TurnResult:
+        """Повний раунд: дія гравця і, якщо бій триває, хід ворога (для симуляцій/автобою)."""
+        res = self.player_action(action, arg)
+        if res.outcome != ENEMY_TURN:
+            return res
+        enemy = self.enemy_turn()
+        return TurnResult(enemy.outcome, res.events + enemy.events)
+
+
+__all__ = [
+    "roll_damage",
+    "roll_player_attack",
+    "BattleEvent",
+    "TurnResult",
+    "BattleEngine",
+    "new_battle_state",
+    "ACTIONS",
+    "CONTINUE",
+    "ENEMY_TURN",
+    "WON",
+    "LOST",
+    "FLED",
+    "INVALID",
+]
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Компактне кодування callback_data.
+
+Telegram обмежує callback_data 64 байтами, а кирилиця в UTF-8 — це 2 байти
+на літеру: "battle:skill:Кровоточива стріла" займає 47 байтів, і довші назви
+просто не влазять. Тут назви вмінь, локацій, класів тощо замінюються
+короткими числовими id з реєстрів (IdKind), а маршрут — своїм номером:
+
+    "~" + base64url([тег: 2 байти][id маршруту: varint][аргументи...])
+
+Аргументи — за типами маршруту: int — zigzag varint, IdKind — varint id,
+str — varint довжина + UTF-8. "battle:skill:Кровоточива стріла" стає
+"~" і 6 символів.
+
+Тег — crc32 знімка реєстру (маршрути з типами аргументів і значення всіх
+IdKind). Будь-яка зміна складу дає інший тег, тож кнопка зі старого
+повідомлення не розкодується в чужу дію, а буде визнана застарілою
+(StaleCallback). Текстовий формат "простір:дія:аргументи" й далі
+розбирається як раніше — старі клавіатури в чатах працюють.
+
+Id у IdKind — порядковий номер значення в джерелі (CLASS_SKILLS,
+TRAVEL_GRAPH, ...): нові значення варто додавати в кінець.
+"""
+from __future__ import annotations
+
+import base64
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PREFIX = "~"
+MAX_LEN = 64  # ліміт Telegram на callback_data, байт
+
+
+class StaleCallback(ValueError):
+    """Компактна кнопка з іншої версії реєстру."""
+
+
+# ---- varint / zigzag ----
+
+def write_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("обірваний varint")
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+# ---- Реєстри id ----
+
+class IdKind:
+    """
+    Тип аргументу маршруту з переліком відомих значень.
+
+    Як тип у ROUTER.route(...) розбирає текстовий аргумент як є (перевіряє
+    значення хендлер), а в компактному форматі значення кодується своїм id.
+    Значення завантажуються ліниво — при першій потребі кодека.
+    """
+
+    __slots__ = ("name", "_load", "_values", "_ids")
+
+    def __init__(self, name: str, load: Callable[[], Iterable[str]]):
+        self.name = name
+        self._load = load
+        self._values: Optional[Tuple[str, ...]] = None
+        self._ids: Dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"IdKind({self.name})"
+
+    def __call__(self, raw: str) -> str:
+        return raw
+
+    def values(self) -> Tuple[str, ...]:
+        if self._values is None:
+            self._values = tuple(dict.fromkeys(self._load()))
+            self._ids = {v: i for i, v in enumerate(self._values)}
+        return self._values
+
+    def id_of(self, value: str) -> Optional[int]:
+        self.values()
+        return self._ids.get(value)
+
+    def value_of(self, id_: int) -> str:
+        values = self.values()
+        if id_ >= len(values):
+            raise ValueError(f"невідомий id {self.name}: {id_}")
+        return values[id_]
+
+    def reset(self) -> None:
+        self._values = None
+        self._ids = {}
+
+
+def _type_key(t: Any) -> str:
+    return f"kind:{t.name}" if isinstance(t, IdKind) else getattr(t, "__name__", repr(t))
+
+
+# ---- Кодек ----
+
+class CallbackCodec:
+    """
+    Знімок реєстру маршрутів: номери маршрутів + тег версії.
+    routes — об'єкти з полями name і types (router.Route).
+    """
+
+    def __init__(self, routes: Iterable[Any]):
+        self.routes: List[Any] = sorted(routes, key=lambda r: r.name)
+        self._ids = {id(r): i for i, r in enumerate(self.routes)}
+        snapshot: List[str] = []
+        kinds: Dict[str, IdKind] = {}
+        for r in self.routes:
+            snapshot.append(r.name + "(" + ",".join(_type_key(t) for t in r.types) + ")")
+            kinds.update((t.name, t) for t in r.types if isinstance(t, IdKind))
+        for name in sorted(kinds):
+            snapshot.append(name + "=" + "|".join(kinds[name].values()))
+        self.tag = zlib.crc32("\n".join(snapshot).encode("utf-8")) & 0xFFFF
+        self._tag_bytes = self.tag.to_bytes(2, "big")
+
+    def encode(self, route: Any, args: Sequence[Any]) -> Optional[str]:
+        """Компактний рядок або None, якщо аргумент не кодується (невідоме значення)."""
+        rid = self._ids.get(id(route))
+        if rid is None or len(args) != len(route.types):
+            return None
+        out = bytearray(self._tag_bytes)
+        write_varint(out, rid)
+        for t, v in zip(route.types, args):
+            if isinstance(t, IdKind):
+                i = t.id_of(v)
+                if i is None:
+                    return None
+                write_varint(out, i)
+            elif t is int:
+                write_varint(out, _zigzag(int(v)))
+            else:
+                raw = str(v).encode("utf-8")
+                write_varint(out, len(raw))
+                out += raw
+        data = PREFIX + base64.urlsafe_b64encode(bytes(out)).rstrip(b"=").decode("ascii")
+        return data if len(data) <= MAX_LEN else None
+
+    def decode(self, data: str) -> Tuple[Any, tuple]:
+        """"~..." -> (маршрут, типізовані аргументи). ValueError — биті дані, StaleCallback — чужий тег."""
+        body = data[len(PREFIX):]
+        try:
+            buf = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        except (ValueError, TypeError) as e:
+            raise ValueError("не base64") from e
+        if len(buf) < 3:
+            raise ValueError("закороткий payload")
+        if buf[:2] != self._tag_bytes:
+            raise StaleCallback(f"тег {int.from_bytes(buf[:2], 'big'):04x} ≠ {self.tag:04x}")
+        rid, pos = read_varint(buf, 2)
+        if rid >= len(self.routes):
+            raise ValueError(f"невідомий маршрут {rid}")
+        route = self.routes[rid]
+        args = []
+        for t in route.types:
+            n, pos = read_varint(buf, pos)
+            if isinstance(t, IdKind):
+                args.append(t.value_of(n))
+            elif t is int:
+                args.append(_unzigzag(n))
+            else:
+                if pos + n > len(buf):
+                    raise ValueError("обірваний рядок")
+                args.append(t(buf[pos:pos + n].decode("utf-8")))
+                pos += n
+        if pos != len(buf):
+            raise ValueError("зайві байти")
+        return route, tuple(args)
+
+
+# ---- Реєстри гри ----
+
+def _skills() -> Iterable[str]:
+    from .skills import CLASS_SKILLS
+    for skills in CLASS_SKILLS.values():
+        yield from skills
+
+
+def _locations() -> Iterable[str]:
+    from ..config import LOCATION_ORDER, TRAVEL_GRAPH
+    yield from LOCATION_ORDER
+    yield from TRAVEL_GRAPH
+
+
+def _classes() -> Iterable[str]:
+    from ..config import CLASSES
+    return CLASSES
+
+
+def _backstories() -> Iterable[str]:
+    from ..config import BACKSTORIES
+    return BACKSTORIES
+
+
+SKILL = IdKind("skill", _skills)
+LOCATION = IdKind("location", _locations)
+CLASS = IdKind("class", _classes)
+BACKSTORY = IdKind("backstory", _backstories)
+SLOT = IdKind("slot", lambda: ("weapon", "armor", "accessory"))
+SHOP_MENU = IdKind("shop_menu", lambda: ("main", "buy", "sell"))
+
+
+__all__ = [
+    "PREFIX",
+    "MAX_LEN",
+    "StaleCallback",
+    "IdKind",
+    "CallbackCodec",
+    "write_varint",
+    "read_varint",
+    "SKILL",
+    "LOCATION",
+    "CLASS",
+    "BACKSTORY",
+    "SLOT",
+    "SHOP_MENU",
+]
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Каталог предметів (flyweight).
+
+Незмінні характеристики предмета — назва, рідкісність, тип, бонуси,
+заголовок, емодзі, базова ціна — живуть в одному інтернованому
+ItemTemplate. Екземпляр у рюкзаку (Item) тримає лише посилання на шаблон
+і власний стан: ціну, прапорець «надягнено», міцність, знайдене золото.
+
+Item поводиться як dict (it["name"], it.get("atk"), it["dur"] = ...),
+тож код, що працює зі старими словниками, працює й з ним. Старі
+словники із збережень перетворюються через as_item().
+
+id шаблону — crc32 від його полів, тобто стабільний між перезапусками й
+незалежний від порядку реєстрації. Статичні шаблони (лут, крамниця)
+у збереженнях пишуться лише як id; решта — повністю.
+"""
+from __future__ import annotations
+
+import copy
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+RARITY_TITLE = {
+    "common": "⚪ Звичайний",
+    "uncommon": "🟢 Незвичайний",
+    "rare": "🔵 Рідкісний",
+    "epic": "🟣 Епічний",
+    "legendary": "🟡 Легендарний",
+}
+RARITY_EMOJI = {"common": "⚪", "uncommon": "🟢", "rare": "🔵", "epic": "🟣", "legendary": "🟡"}
+
+
+@dataclass(frozen=True, slots=True)
+class ItemTemplate:
+    cid: int
+    name: str
+    rarity: str
+    type: str
+    atk: int
+    defense: int
+    title: str
+    emoji: str
+    durability_max: Optional[int] = None
+    base_price: Optional[int] = None
+    static: bool = False
+
+
+_BY_ID: Dict[int, ItemTemplate] = {}
+_BY_KEY: Dict[tuple, ItemTemplate] = {}
+
+
+def _key(name, rarity, itype, atk, defense, title, emoji, durability_max, base_price) -> tuple:
+    return (name, rarity, itype, int(atk), int(defense), title, emoji, durability_max, base_price)
+
+
+def intern(name: str, rarity: str = "common", itype: str = "", atk: int = 0, defense: int = 0,
+           title: Optional[str] = None, emoji: Optional[str] = None,
+           durability_max: Optional[int] = None, base_price: Optional[int] = None,
+           static: bool = False) -> ItemTemplate:
+    """Повернути єдиний шаблон для цих полів (створити, якщо ще немає)."""
+    if title is None:
+        title = RARITY_TITLE.get(rarity, "")
+    if emoji is None:
+        emoji = RARITY_EMOJI.get(rarity, "")
+    key = _key(name, rarity, itype, atk, defense, title, emoji, durability_max, base_price)
+    tpl = _BY_KEY.get(key)
+    if tpl is not None:
+        if static and not tpl.static:
+            tpl = _replace_static(tpl)
+        return tpl
+    cid = zlib.crc32(repr(key).encode("utf-8")) & 0x7FFFFFFF
+    if cid in _BY_ID:
+        # колізія crc32 — такий шаблон не можна адресувати лише id
+        if static:
+            raise ValueError(f"Колізія id у каталозі предметів: {key!r}")
+        cid = -1
+    tpl = ItemTemplate(cid, name, rarity, itype, int(atk), int(defense), title, emoji,
+                       durability_max, base_price, static)
+    _BY_KEY[key] = tpl
+    if cid >= 0:
+        _BY_ID[cid] = tpl
+    return tpl
+
+
+def _replace_static(tpl: ItemTemplate) -> ItemTemplate:
+    new = ItemTemplate(tpl.cid, tpl.name, tpl.rarity, tpl.type, tpl.atk, tpl.defense, tpl.title,
+                       tpl.emoji, tpl.durability_max, tpl.base_price, True)
+    _BY_KEY[_key(tpl.name, tpl.rarity, tpl.type, tpl.atk, tpl.defense, tpl.title, tpl.emoji,
+                 tpl.durability_max, tpl.base_price)] = new
+    _BY_ID[tpl.cid] = new
+    return new
+
+
+def register(**fields) -> ItemTemplate:
+    """Статичний шаблон (з таблиць гри): у збереженнях пишеться лише його id."""
+    return intern(static=True, **fields)
+
+
+def _load_static() -> None:
+    # таблиці луту й крамниці реєструють свої шаблони під час імпорту
+    from . import loot  # noqa: F401
+    from ..handlers import shop  # noqa: F401
+
+
+def template(cid: int) -> ItemTemplate:
+    tpl = _BY_ID.get(cid)
+    if tpl is None:
+        _load_static()
+        tpl = _BY_ID.get(cid)
+        if tpl is None:
+            raise KeyError(f"Невідомий предмет у каталозі: {cid}")
+    return tpl
+
+
+# ---- Екземпляр предмета ----
+
+# Ключі шаблону (лише читання) і ключі стану екземпляра
+_TPL_KEYS = {
+    "name": "name", "rarity": "rarity", "title": "title", "emoji": "emoji",
+    "type": "type", "atk": "atk", "def": "defense", "defense": "defense",
+    "durability_max": "durability_max",
+}
+_STATE_KEYS = ("price", "equipped", "dur", "durability", "gold")
+
+
+class Item:
+    """Екземпляр предмета: шаблон з каталогу + власний стан. Інтерфейс — як у dict."""
+
+    __slots__ = ("tpl", "price", "equipped", "dur", "durability", "gold", "extra")
+
+    def __init__(self, tpl: ItemTemplate, price: Optional[int] = None, equipped: bool = False,
+                 dur: Optional[int] = None, durability: Optional[int] = None,
+                 gold: Optional[int] = None, extra: Optional[Dict[str, Any]] = None):
+        self.tpl = tpl
+        self.price = price
+        self.equipped = equipped
+        self.dur = dur
+        self.durability = durability
+        self.gold = gold
+        self.extra = extra
+
+    # ---- dict-подібний доступ ----
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "price":
+            value = self.price if self.price is not None else self.tpl.base_price
+        elif key in _TPL_KEYS:
+            value = getattr(self.tpl, _TPL_KEYS[key])
+        elif key in _STATE_KEYS:
+            value = getattr(self, key)
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        else:
+            raise KeyError(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _STATE_KEYS:
+            setattr(self, key, value)
+        elif key in _TPL_KEYS:
+            raise KeyError(f"'{key}' — властивість шаблону предмета, її не можна змінити")
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        value = self.get(key, default)
+        if key in _STATE_KEYS:
+            setattr(self, key, None)
+        elif self.extra:
+            self.extra.pop(key, None)
+        return value
+
+    def keys(self) -> Iterator[str]:
+        yield from ("name", "rarity", "title", "emoji", "type", "atk", "def")
+        for key in ("durability_max",) + _STATE_KEYS:
+            if key in self:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self.keys():
+            yield key, self[key]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def copy(self) -> "Item":
+        return Item(self.tpl, self.price, self.equipped, self.dur, self.durability, self.gold,
+                    dict(self.extra) if self.extra else None)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Item":
+        # шаблон спільний — копіюється лише стан
+        return Item(self.tpl, self.price, self.equipped, self.dur, self.durability, self.gold,
+                    copy.deepcopy(self.extra, memo) if self.extra else None)
+
+    def _state(self) -> tuple:
+        return (self.price, self.equipped, self.dur, self.durability, self.gold, self.extra or None)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Item):
+            return self.tpl is other.tpl and self._state() == other._state()
+        return NotImplemented
+
+    __hash__ = None  # змінюваний
+
+    def __reduce__(self):
+        ref = self.tpl.cid if self.tpl.static else _template_fields(self.tpl)
+        return _restore_item, (ref, self._state())
+
+    def __repr__(self) -> str:
+        return f"Item({self.tpl.name!r}, {self.tpl.rarity}, cid={self.tpl.cid})"
+
+
+def _template_fields(tpl: ItemTemplate) -> tuple:
+    return (tpl.name, tpl.rarity, tpl.type, tpl.atk, tpl.defense, tpl.title, tpl.emoji,
+            tpl.durability_max, tpl.base_price)
+
+
+def template_from_ref(ref: Any) -> ItemTemplate:
+    """id статичного шаблону або кортеж його полів -> шаблон."""
+    if isinstance(ref, int):
+        return template(ref)
+    name, rarity, itype, atk, defense, title, emoji, durability_max, base_price = ref
+    return intern(name, rarity, itype, atk, defense, title, emoji, durability_max, base_price)
+
+
+def _restore_item(ref: Any, state: tuple) -> Item:
+    return Item(template_from_ref(ref), *state)
+
+
+def as_item(it: Any) -> Any:
+    """Старий словник предмета -> Item (None та Item повертаються як є)."""
+    if it is None or isinstance(it, Item):
+        return it
+    d = dict(it)
+    defense = d.pop("def", None)
+    if "defense" in d:
+        defense = d.pop("defense") if defense is None else defense
+        d.pop("defense", None)
+    tpl = intern(
+        d.pop("name", "Предмет"), d.pop("rarity", "common"), d.pop("type", ""),
+        d.pop("atk", 0) or 0, defense or 0, d.pop("title", None), d.pop("emoji", None),
+        d.pop("durability_max", None),
+    )
+    state = {k: d.pop(k) for k in _STATE_KEYS if k in d}
+    return Item(tpl, extra=d or None, **state)
+
+
+__all__ = [
+    "ItemTemplate",
+    "Item",
+    "RARITY_TITLE",
+    "RARITY_EMOJI",
+    "intern",
+    "register",
+    "template",
+    "template_from_ref",
+    "as_item",
+]
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Статус-ефекти бою: реєстр типів + компактний масив активних ефектів.
+
+Тип ефекту (EffectType) — це дані: вид (dot / hot / stun / stat / shield),
+ціль, правило накладання і тексти. Поведінка виду — функція з таблиці
+_TICK, тож новий тип ефекту = register_effect(...), а нове вміння з ним —
+запис у CLASS_SKILLS з "type": <назва ефекту>.
+
+Активні ефекти бою лежать у battle_state["fx"] плоским списком int
+по STRIDE на ефект: [id типу, ходів, значення, ...]. Це дешево
+зберігати і копіювати, а tick() обходить масив один раз — вартість ходу
+лінійна від кількості активних ефектів, а не від кількості типів.
+
+Тривалість (`turns`) — скільки ходів ворога ефект діє:
+- dot/hot/stun спрацьовують у tick() і знімаються, щойно ходи скінчились;
+- stat/shield з тривалістю діють до кінця ходу ворога, знімаються наступним tick();
+- UNTIL_USED — діє, доки не буде використаний (баф атаки — атакою гравця,
+  баф захисту — атакою ворога).
+
+id типів зберігаються у персистентності — нові типи лише додаються з новим id.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+STRIDE = 3
+UNTIL_USED = -1
+
+PLAYER = "player"
+ENEMY = "enemy"
+
+# Правила накладання того самого типу
+STACK_MAX = "max"          # тривалість і значення — більше з двох
+STACK_REPLACE = "replace"  # нове накладання замінює старе
+STACK_ADD = "add"          # значення додається (до cap), тривалість — більша
+
+
+@dataclass(frozen=True, slots=True)
+class EffectType:
+    id: int
+    name: str
+    kind: str                  # dot | hot | stun | stat | shield
+    target: str                # PLAYER | ENEMY
+    stacking: str = STACK_MAX
+    power: str = "turns"       # що означає power уміння: "turns" або "value"
+    turns: int = UNTIL_USED    # тривалість за замовчуванням, коли power — це value
+    value: int = 0             # значення за замовчуванням, коли power — це turns
+    share: float = 0.0         # dot/hot без value: частка max HP цілі за хід
+    stat: str = ""             # stat: "atk" | "def"
+    cap: int = 0               # STACK_ADD: межа значення (0 — без межі)
+    refresh: bool = False      # автобою є сенс накладати повторно, поки ефект діє
+    apply_text: str = ""
+    tick_text: str = ""
+
+
+@dataclass(slots=True)
+class TickResult:
+    texts: List[str] = field(default_factory=list)
+    stunned: bool = False
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+
+EFFECTS: Dict[str, EffectType] = {}
+_BY_ID: Dict[int, EffectType] = {}
+
+
+def register_effect(id: int, name: str, kind: str, target: str, **fields: Any) -> EffectType:
+    if kind not in _TICK and kind not in _PASSIVE:
+        raise ValueError(f"Невідомий вид ефекту: {kind}")
+    if id in _BY_ID or name in EFFECTS:
+        raise ValueError(f"Ефект {name!r} / id {id} уже зареєстровано.")
+    et = EffectType(id=id, name=name, kind=kind, target=target, **fields)
+    EFFECTS[name] = et
+    _BY_ID[id] = et
+    return et
+
+
+def effect_type(name: str) -> Optional[EffectType]:
+    return EFFECTS.get(name)
+
+
+# ---- Поведінка видів у tick() ----
+
+def _tick_dot(et: EffectType, value: int, player, enemy, out: TickResult) -> None:
+    who = enemy if et.target == ENEMY else player
+    if who is None:
+        return
+    dmg = value or max(1, int(who.max_hp * et.share))
+    who.hp -= dmg
+    out.texts.append(et.tick_text.format(value=dmg))
+
+
+def _tick_hot(et: EffectType, value: int, player, enemy, out: TickResult) -> None:
+    who = enemy if et.target == ENEMY else player
+    if who is None:
+        return
+    healed = min(who.max_hp - who.hp, value or max(1, int(who.max_hp * et.share)))
+    who.hp += healed
+    if healed > 0:
+        out.texts.append(et.tick_text.format(value=healed))
+
+
+def _tick_stun(et: EffectType, value: int, player, enemy, out: TickResult) -> None:
+    out.stunned = True
+
+
+_TICK: Dict[str, Callable[[EffectType, int, Any, Any, TickResult], None]] = {
+    "dot": _tick_dot,
+    "hot": _tick_hot,
+    "stun": _tick_stun,
+}
+# Види без дії в tick(): працюють через stat_bonus() / absorb()
+_PASSIVE = ("stat", "shield")
+
+
+# ---- Масив ефектів бою ----
+
+def _from_legacy(state: dict) -> List[int]:
+    """Стан бою старого формату (p_status / e_status) -> масив fx."""
+    fx: List[int] = []
+    est = state.pop("e_status", None) or {}
+    pst = state.pop("p_status", None) or {}
+    if est.get("bleed", 0) > 0:
+        fx += (EFFECTS["bleed"].id, int(est["bleed"]), 0)
+    if est.get("stun", 0) > 0:
+        fx += (EFFECTS["stun"].id, int(est["stun"]), 0)
+    if pst.get("def_up"):
+        fx += (EFFECTS["buff_def"].id, UNTIL_USED, int(pst.get("def_up_val", 0)))
+    if pst.get("atk_up"):
+        fx += (EFFECTS["buff_atk"].id, UNTIL_USED, int(pst.get("atk_up_val", 0)))
+    return fx
+
+
+def effects_of(state: dict) -> List[int]:
+    fx = state.get("fx")
+    if fx is None:
+        fx = state["fx"] = _from_legacy(state)
+    return fx
+
+
+def active(state: dict) -> List[Tuple[EffectType, int, int]]:
+    """[(тип, ходів, значення)] — для відображення/налагодження."""
+    fx = effects_of(state)
+    return [(_BY_ID[fx[i]], fx[i + 1], fx[i + 2]) for i in range(0, len(fx), STRIDE)]
+
+
+def has(state: dict, name: str) -> bool:
+    et = EFFECTS.get(name)
+    if et is None:
+        return False
+    fx = effects_of(state)
+    return any(fx[i] == et.id for i in range(0, len(fx), STRIDE))
+
+
+def apply(state: dict, name: str, turns: Optional[int] = None, value: Optional[int] = None) -> Tuple[int, int]:
+    """Накласти ефект за правилом накладання його типу. Повертає підсумкові (ходів, значення)."""
+    et = EFFECTS[name]
+    turns = et.turns if turns is None else turns
+    value = et.value if value is None else value
+    fx = effects_of(state)
+    for i in range(0, len(fx), STRIDE):
+        if fx[i] != et.id:
+            continue
+        old_t, old_v = fx[i + 1], fx[i + 2]
+        if et.stacking == STACK_REPLACE:
+            pass
+        elif et.stacking == STACK_ADD:
+            turns = UNTIL_USED if UNTIL_USED in (old_t, turns) else max(old_t, turns)
+            value = old_v + value
+            if et.cap:
+                value = min(et.cap, value)
+        else:
+            turns = UNTIL_USED if UNTIL_USED in (old_t, turns) else max(old_t, turns)
+            value = max(old_v, value)
+        fx[i + 1], fx[i + 2] = turns, value
+        return turns, value
+    fx += (et.id, turns, value)
+    return turns, value
+
+
+def apply_power(state: dict, name: str, power: int, sdef: Optional[dict] = None) -> str:
+    """Накласти ефект уміння з силою `power` (див. EffectType.power). Повертає текст ефекту."""
+    et = EFFECTS[name]
+    sdef = sdef or {}
+    turns = sdef.get("turns", power if et.power == "turns" else None)
+    value = sdef.get("value", power if et.power == "value" else None)
+    turns, value = apply(state, name, turns, value)
+    return et.apply_text.format(turns=turns, value=value)
+
+
+def tick(state: dict, player=None, enemy=None, kinds: Optional[Tuple[str, ...]] = None) -> TickResult:
+    """
+    Межа ходів (кінець ходу гравця / початок ходу ворога) за один прохід:
+    dot/hot/stun спрацьовують, тривалості зменшуються, прострочені ефекти
+    прибираються на місці. kinds — обробити лише ці види (решта не чіпається).
+    """
+    fx = effects_of(state)
+    out = TickResult()
+    w = 0
+    for r in range(0, len(fx), STRIDE):
+        tid, turns, value = fx[r], fx[r + 1], fx[r + 2]
+        et = _BY_ID[tid]
+        if turns != UNTIL_USED and (kinds is None or et.kind in kinds):
+            if turns <= 0:
+                continue                      # діяв до кінця минулого ходу ворога
+            handler = _TICK.get(et.kind)
+            turns -= 1
+            if handler is not None:
+                handler(et, value, player, enemy, out)
+                if turns <= 0:
+                    continue
+        fx[w], fx[w + 1], fx[w + 2] = tid, turns, value
+        w += STRIDE
+    del fx[w:]
+    return out
+
+
+def stat_bonus(state: dict, target: str, stat: str, consume: bool = False) -> int:
+    """Сума stat-бафів цілі. consume — зняти ті, що діють до використання."""
+    fx = effects_of(state)
+    total = 0
+    w = 0
+    for r in range(0, len(fx), STRIDE):
+        tid, turns, value = fx[r], fx[r + 1], fx[r + 2]
+        et = _BY_ID[tid]
+        if et.kind == "stat" and et.target == target and et.stat == stat:
+            total += value
+            if consume and turns == UNTIL_USED:
+                continue
+        fx[w], fx[w + 1], fx[w + 2] = tid, turns, value
+        w += STRIDE
+    del fx[w:]
+    return total
+
+
+def absorb(state: dict, target: str, dmg: int) -> int:
+    """Щити цілі поглинають шкоду; повертає шкоду, що пройшла. Вичерпані щити знімаються."""
+    fx = effects_of(state)
+    w = 0
+    for r in range(0, len(fx), STRIDE):
+        tid, turns, value = fx[r], fx[r + 1], fx[r + 2]
+        et = _BY_ID[tid]
+        if dmg > 0 and et.kind == "shield" and et.target == target:
+            took = min(dmg, value)
+            dmg -= took
+            value -= took
+            if value <= 0:
+                continue
+        fx[w], fx[w + 1], fx[w + 2] = tid, turns, value
+        w += STRIDE
+    del fx[w:]
+    return dmg
+
+
+# ---- Вбудовані ефекти (id не змінювати) ----
+
+register_effect(0, "bleed", "dot", ENEMY, power="turns", share=0.05,
+                apply_text="накладено кровотечу на {turns} х.",
+                tick_text="🩸 Кровотеча: -{value} HP ворогу.")
+register_effect(1, "stun", "stun", ENEMY, power="turns",
+                apply_text="ворог оглушений!")
+register_effect(2, "buff_def", "stat", PLAYER, stat="def", stacking=STACK_REPLACE, power="value",
+                refresh=True, apply_text="+{value} до захисту на цей раунд.")
+register_effect(3, "buff_atk", "stat", PLAYER, stat="atk", stacking=STACK_REPLACE, power="value",
+                apply_text="+{value} до атаки на цей раунд.")
+register_effect(4, "shield", "shield", PLAYER, stacking=STACK_ADD, power="value", turns=2,
+                refresh=True, apply_text="щит на {value} шкоди ({turns} х.).")
+register_effect(5, "regen", "hot", PLAYER, power="value", turns=3,
+                apply_text="відновлення {value} HP за хід, {turns} х.",
+                tick_text="💚 Відновлення: +{value} HP.")
+
+
+__all__ = [
+    "EffectType",
+    "TickResult",
+    "EFFECTS",
+    "STRIDE",
+    "UNTIL_USED",
+    "PLAYER",
+    "ENEMY",
+    "STACK_MAX",
+    "STACK_REPLACE",
+    "STACK_ADD",
+    "register_effect",
+    "effect_type",
+    "effects_of",
+    "active",
+    "has",
+    "apply",
+    "apply_power",
+    "tick",
+    "stat_bonus",
+    "absorb",
+]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Експедиція: N подій /explore за один прохід.
+
+Кидки 60/25/15 (бій / знахідка / відпочинок) — як в explore(); бої
+розігруються автобоєм, а золото, досвід і знахідки застосовуються до
+гравця одним оновленням наприкінці. Лут кидається лише тоді, коли подія
+справді настала: інакше кидки незнайдених предметів зрушили б лічильники
+pity гравця (і могли б "з'їсти" гарантований рідкісний дроп).
+Експедиція зупиняється раніше, якщо HP опустилось нижче порогу або бій програно.
+"""
+from __future__ import annotations
+
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from ..config import EXPEDITION_STOP_HP
+from .autobattle import AutoPolicy, run_auto
+from .battle_engine import BattleEngine, new_battle_state, WON, LOST
+from .loot import generate_loot
+from .spawns import spawn_enemy
+
+EXPLORE_BATTLE, EXPLORE_LOOT = 0.60, 0.85
+
+STOP_LOW_HP = "low_hp"
+STOP_DEFEAT = "defeat"
+
+
+@dataclass(slots=True)
+class ExpeditionReport:
+    steps: int = 0
+    won: int = 0
+    lost: int = 0
+    fled: int = 0
+    rests: int = 0
+    healed: int = 0
+    items: List[Any] = field(default_factory=list)
+    gold: int = 0
+    exp: int = 0
+    level_up: Any = None               # models.LevelUp
+    kills: Counter = field(default_factory=Counter)
+    stopped: Optional[str] = None      # None | STOP_LOW_HP | STOP_DEFEAT
+
+
+def run_expedition(p, location: str, steps: int, rng: Any = random,
+                   policy: Optional[AutoPolicy] = None) -> ExpeditionReport:
+    rep = ExpeditionReport()
+    for _ in range(steps):
+        roll = rng.random()
+        if p.hp < EXPEDITION_STOP_HP * p.max_hp:
+            rep.stopped = STOP_LOW_HP
+            break
+        rep.steps += 1
+        if roll < EXPLORE_BATTLE:
+            enemy = spawn_enemy(p.level, location, rng)
+            res = run_auto(BattleEngine(p, enemy, new_battle_state(rng.getrandbits(32))), policy)
+            if res.outcome == WON:
+                rep.won += 1
+                rep.kills[enemy.name] += 1
+                rep.exp += enemy.exp_reward
+                rep.gold += enemy.gold_reward
+            elif res.outcome == LOST:
+                rep.lost += 1
+                rep.stopped = STOP_DEFEAT
+                break
+            else:
+                # втеча або бій, що затягнувся понад ліміт раундів
+                rep.fled += 1
+        elif roll < EXPLORE_LOOT:
+            item = generate_loot(location, rng=rng, pity=p.loot_pity)
+            rep.items.append(item)
+            rep.gold += item.get("gold", 0)
+        else:
+            healed = min(p.max_hp - p.hp, rng.randint(5, 12))
+            p.hp += healed
+            rep.rests += 1
+            rep.healed += healed
+
+    # одне оновлення стану гравця
+    p.hp = max(0, p.hp)
+    p.inventory.extend(rep.items)
+    p.gold += rep.gold
+    rep.level_up = p.apply_exp(rep.exp)
+    return rep
+
+
+__all__ = ["ExpeditionReport", "run_expedition", "STOP_LOW_HP", "STOP_DEFEAT"]
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Рюкзак гравця з агрегатами, що підтримуються на льоту.
+
+Inventory — звичайний list предметів, але кожна вставка/видалення
+оновлює лічильники за рідкістю й типом, суму продажу та кількість речей,
+які можна надягти. /stats і крамниця читають готові числа, а не
+перебирають увесь рюкзак.
+
+Ціна фіксується при додаванні: предмет без 'price' отримує її один раз,
+тож показана ціна продажу більше не «стрибає» між відкриттями меню.
+"""
+from __future__ import annotations
+
+import copy
+from collections import Counter
+from typing import Any, Iterable
+
+from .loot import compute_price, sell_value
+
+EQUIP_TYPES = ("weapon", "armor", "accessory")
+
+
+def fix_price(it: Any) -> Any:
+    """Зафіксувати ціну предмета, якщо її ще немає."""
+    if not isinstance(it.get("price"), int):
+        it["price"] = compute_price(it.get("rarity", "common"))
+    return it
+
+
+class Inventory(list):
+    """list предметів + by_rarity / by_type / sell_total / equippable."""
+
+    __slots__ = ("by_rarity", "by_type", "sell_total")
+
+    def __init__(self, items: Iterable[Any] = ()):
+        super().__init__()
+        self.by_rarity: Counter = Counter()
+        self.by_type: Counter = Counter()
+        self.sell_total = 0
+        self.extend(items)
+
+    # ---- облік ----
+
+    def _add(self, it: Any) -> Any:
+        fix_price(it)
+        self.by_rarity[it.get("rarity", "common")] += 1
+        self.by_type[it.get("type", "")] += 1
+        self.sell_total += sell_value(it)
+        return it
+
+    def _remove(self, it: Any) -> None:
+        for counter, key in ((self.by_rarity, it.get("rarity", "common")), (self.by_type, it.get("type", ""))):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        self.sell_total -= sell_value(it)
+
+    def _reset(self) -> None:
+        self.by_rarity.clear()
+        self.by_type.clear()
+        self.sell_total = 0
+
+    @property
+    def equippable(self) -> int:
+        """Скільки речей у рюкзаку можна надягти."""
+        return sum(self.by_type[t] for t in EQUIP_TYPES)
+
+    # ---- мутації list ----
+
+    def append(self, it: Any) -> None:
+        super().append(self._add(it))
+
+    def insert(self, index: int, it: Any) -> None:
+        super().insert(index, self._add(it))
+
+    def extend(self, items: Iterable[Any]) -> None:
+        super().extend(self._add(it) for it in items)
+
+    def __iadd__(self, items: Iterable[Any]) -> "Inventory":
+        self.extend(items)
+        return self
+
+    def pop(self, index: int = -1) -> Any:
+        it = super().pop(index)
+        self._remove(it)
+        return it
+
+    def remove(self, it: Any) -> None:
+        super().remove(it)
+        self._remove(it)
+
+    def clear(self) -> None:
+        super().clear()
+        self._reset()
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            for it in self[index]:
+                self._remove(it)
+            value = [self._add(it) for it in value]
+        else:
+            self._remove(self[index])
+            self._add(value)
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index) -> None:
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        for it in removed:
+            self._remove(it)
+
+    def __imul__(self, n: int) -> "Inventory":
+        items = list(self)
+        self.clear()
+        self.extend(items * max(0, n))
+        return self
+
+    # ---- копіювання/серіалізація ----
+
+    def copy(self) -> "Inventory":
+        return Inventory(self)
+
+    def __deepcopy__(self, memo) -> "Inventory":
+        return Inventory(copy.deepcopy(list(self), memo))
+
+    def __reduce__(self):
+        return Inventory, (list(self),)
+
+
+__all__ = ["Inventory", "EQUIP_TYPES", "fix_price"]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Фабрика inline-клавіатур з кешем.
+
+Більшість меню залежить від кількох простих значень (локація, лоадаут з КД,
+набір відомих умінь), тож замість нових InlineKeyboardButton/Markup на кожен
+callback будуємо розмітку один раз і віддаємо той самий об'єкт. Об'єкти PTB
+після створення незмінні (кортежі + заборона setattr), тому їх безпечно
+ділити між гравцями.
+
+Ключ кешу — лише хешовані значення (кортежі, рядки, числа); кількість
+варіантів обмежена KEYBOARD_CACHE_SIZE на кожну фабрику.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Tuple, TypeVar
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from ..config import KEYBOARD_CACHE_SIZE
+
+F = TypeVar("F", bound=Callable[..., InlineKeyboardMarkup])
+
+# Рядок клавіатури: ((текст, callback_data), ...)
+Row = Tuple[Tuple[str, str], ...]
+
+
+def cached_keyboard(fn: F) -> F:
+    """lru_cache з обмеженням KEYBOARD_CACHE_SIZE для функцій, що повертають розмітку."""
+    return lru_cache(maxsize=KEYBOARD_CACHE_SIZE)(fn)  # type: ignore[return-value]
+
+
+def markup(rows: Iterable[Row]) -> InlineKeyboardMarkup:
+    """Розмітка з рядків пар (текст, callback_data)."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=data) for text, data in row]
+        for row in rows
+    ])
+
+
+@cached_keyboard
+def column(options: Tuple[Tuple[str, str], ...], prefix: Optional[str] = None) -> InlineKeyboardMarkup:
+    """Одноколонкова клавіатура; prefix (якщо є) додається як "prefix:data"."""
+    return markup(((text, f"{prefix}:{data}" if prefix else data),) for text, data in options)
+
+
+__all__ = ["cached_keyboard", "markup", "column", "Row"]
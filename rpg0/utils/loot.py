@@ -1,5 +1,18 @@
 # -*- coding: utf-8 -*-
+"""
+Лут: ціни, шаблони предметів і таблиці випадіння.
+
+Таблиці компілюються один раз на (локація, ранг ворога): рідкість, тип і
+назва вибираються alias-таблицями за O(1). generate_loot_batch видає
+багато предметів за виклик (експедиції, боси, симуляції) і підтримує
+гарантований мінімум рідкості та лічильники «pity» гравця.
+"""
 import random
+from typing import Dict, List, Optional, Tuple
+
+from ..config import LOOT_PITY, LOOT_RARITY_WEIGHTS
+from .alias import AliasTable
+from .catalog import Item, ItemTemplate, register
 
 # Базові ціни за рідкістю
 RARITY_PRICE = {
@@ -17,13 +30,13 @@ def compute_price(rarity: str) -> int:
     base = RARITY_PRICE[rarity]
     return base + random.randint(0, max(1, base // 3))
 
-def price_of_item(it: dict) -> int:
+def price_of_item(it) -> int:
     """Ціна предмета: якщо вказана в it['price'] — беремо її, інакше рахуємо від рідкісності."""
     if isinstance(it.get("price"), int):
         return it["price"]
     return compute_price(it.get("rarity", "common"))
 
-def sell_value(it: dict) -> int:
+def sell_value(it) -> int:
     """Скільки отримаємо за продаж предмета."""
     return int(price_of_item(it) * SELL_RATE)
 
@@ -33,10 +46,9 @@ NAMES_BY_LOC = {
     "Тракт": ["Моховитий талісман", "Клинок мандрівника", "Шкіряний тубус"],
     "Руїни": ["Осколок руни", "Іржавий герб", "Кістяний оберіг"],
     "Гільдія авантюристів": ["Значок учня", "Пам’ятна бляшка", "Пробний жетон"],
+    "Старий ліс": ["Жолудевий оберіг", "Лук із ясеня", "Плащ із моху"],
 }
-
-def _roll_item_type() -> str:
-    return random.choices(["weapon", "armor", "accessory"], weights=[4, 4, 2], k=1)[0]
+FALLBACK_LOCATION = "Тракт"
 
 def _item_bonus_for(rarity: str, itype: str) -> dict:
     scale = {"common": 1, "uncommon": 2, "rare": 3, "epic": 4, "legendary": 6}.get(rarity, 1)
@@ -47,35 +59,142 @@ def _item_bonus_for(rarity: str, itype: str) -> dict:
     # accessory — змішаний бонус
     return {"atk": max(1, scale - 1), "def": max(0, scale - 2)}
 
-def generate_loot(location: str) -> dict:
+def _register_loot_templates() -> dict:
+    """Усі можливі предмети луту — статичні шаблони каталогу (назва, рідкість, тип)."""
+    out = {}
+    for names in NAMES_BY_LOC.values():
+        for name in names:
+            for rarity in RARITY_PRICE:
+                for itype in ("weapon", "armor", "accessory"):
+                    bonus = _item_bonus_for(rarity, itype)
+                    out[name, rarity, itype] = register(
+                        name=name, rarity=rarity, itype=itype, atk=bonus["atk"], defense=bonus["def"],
+                    )
+    return out
+
+LOOT_TEMPLATES = _register_loot_templates()
+
+def loot_template(name: str, rarity: str, itype: str) -> ItemTemplate:
+    return LOOT_TEMPLATES[name, rarity, itype]
+
+# ---- Таблиці випадіння ----
+
+RARITY_ORDER = tuple(RARITY_PRICE)          # від найнижчої до найвищої
+_RANK = {r: i for i, r in enumerate(RARITY_ORDER)}
+
+# Золото, що падає разом з предметом, за рідкістю: (мін, макс)
+LOOT_GOLD = {
+    "common": (0, 4),
+    "uncommon": (2, 8),
+    "rare": (5, 12),
+    "epic": (10, 20),
+    "legendary": (20, 40),
+}
+ITEM_TYPE_WEIGHTS = {"weapon": 4, "armor": 4, "accessory": 2}
+
+# рідкість -> (база ціни, розкид ціни, мін. золото, розкид золота) для LootTable.roll
+_ECON = {r: (RARITY_PRICE[r], max(1, RARITY_PRICE[r] // 3) + 1, LOOT_GOLD[r][0], LOOT_GOLD[r][1] - LOOT_GOLD[r][0] + 1)
+         for r in RARITY_ORDER}
+
+
+class LootTable:
+    """Скомпільована таблиця однієї (локації, рангу): alias-таблиці рідкості, типу й назви."""
+
+    __slots__ = ("rarity_weights", "rarity", "types", "names", "_floors")
+
+    def __init__(self, names: List[str], rarity_weights: Dict[str, float]):
+        self.rarity_weights = {r: w for r, w in rarity_weights.items() if w > 0}
+        self.rarity = AliasTable(list(self.rarity_weights), list(self.rarity_weights.values()))
+        self.types = AliasTable(list(ITEM_TYPE_WEIGHTS), list(ITEM_TYPE_WEIGHTS.values()))
+        self.names = AliasTable(names, [1] * len(names))
+        self._floors: Dict[str, AliasTable] = {}
+
+    def rarity_at_least(self, floor: str) -> AliasTable:
+        """Рідкість не нижче `floor` у тих самих пропорціях (гарантії та pity)."""
+        table = self._floors.get(floor)
+        if table is None:
+            allowed = {r: w for r, w in self.rarity_weights.items() if _RANK[r] >= _RANK[floor]}
+            table = AliasTable(list(allowed), list(allowed.values())) if allowed else AliasTable([floor], [1])
+            self._floors[floor] = table
+        return table
+
+    def roll(self, rng=random, floor: Optional[str] = None) -> Item:
+        rarity = (self.rarity if floor is None else self.rarity_at_least(floor)).sample(rng)
+        tpl = LOOT_TEMPLATES[self.names.sample(rng), rarity, self.types.sample(rng)]
+        # ціна: як compute_price; золото: LOOT_GOLD (рівномірно, межі включно)
+        base, spread, gmin, gspan = _ECON[rarity]
+        rnd = rng.random
+        return Item(tpl, price=base + int(rnd() * spread), gold=gmin + int(rnd() * gspan))
+
+
+def compile_loot_tables() -> Dict[Tuple[str, str], LootTable]:
+    return {(loc, tier): LootTable(names, weights)
+            for loc, names in NAMES_BY_LOC.items()
+            for tier, weights in LOOT_RARITY_WEIGHTS.items()}
+
+
+LOOT_TABLES = compile_loot_tables()
+
+
+def loot_table(location: str, tier: str = "normal") -> LootTable:
+    if tier not in LOOT_RARITY_WEIGHTS:
+        tier = "normal"
+    return LOOT_TABLES.get((location, tier)) or LOOT_TABLES[FALLBACK_LOCATION, tier]
+
+
+# ---- Pity ----
+
+def _pity_floor(pity: Dict[str, int]) -> Optional[str]:
+    """Найвища рідкість, на яку гравець «заслужив» гарантію цим дропом."""
+    floor = None
+    for rarity, limit in LOOT_PITY.items():
+        if limit and pity.get(rarity, 0) + 1 >= limit and (floor is None or _RANK[rarity] > _RANK[floor]):
+            floor = rarity
+    return floor
+
+
+def _pity_update(pity: Dict[str, int], rarity: str) -> None:
+    for r in LOOT_PITY:
+        pity[r] = 0 if _RANK[rarity] >= _RANK[r] else pity.get(r, 0) + 1
+
+
+# ---- Генерація ----
+
+def generate_loot_batch(location: str, n: int, rng=random, tier: str = "normal",
+                        guaranteed: Optional[str] = None, pity: Optional[Dict[str, int]] = None) -> list:
+    """
+    n предметів за один виклик зі скомпільованої таблиці (локація, ранг).
+    guaranteed — хоча б один предмет не нижче цієї рідкості (добивається останнім).
+    pity — лічильники гравця (Player.loot_pity): дропів поспіль без рідкості з
+    LOOT_PITY; на межі дроп гарантовано не нижчий. Лічильники оновлюються на місці.
+    """
+    if n <= 0:
+        return []
+    table = loot_table(location, tier)
+    if pity is None and guaranteed is None:
+        roll = table.roll
+        return [roll(rng) for _ in range(n)]
+
+    out = []
+    best = -1
+    for i in range(n):
+        floor = _pity_floor(pity) if pity is not None else None
+        if guaranteed is not None and i == n - 1 and best < _RANK[guaranteed]:
+            if floor is None or _RANK[floor] < _RANK[guaranteed]:
+                floor = guaranteed
+        item = table.roll(rng, floor)
+        rarity = item.tpl.rarity
+        best = max(best, _RANK[rarity])
+        if pity is not None:
+            _pity_update(pity, rarity)
+        out.append(item)
+    return out
+
+def generate_loot(location: str, tier: str = "normal", rng=random,
+                  pity: Optional[Dict[str, int]] = None) -> Item:
     """Згенерувати предмет з рідкісністю, типом, бонусами та (опційно) золотом."""
-    r = random.random()
-    if r < 0.60:
-        rarity, title, emoji, gold = "common", "⚪ Звичайний", "⚪", random.randint(0, 4)
-    elif r < 0.85:
-        rarity, title, emoji, gold = "uncommon", "🟢 Незвичайний", "🟢", random.randint(2, 8)
-    elif r < 0.97:
-        rarity, title, emoji, gold = "rare", "🔵 Рідкісний", "🔵", random.randint(5, 12)
-    else:
-        rarity, title, emoji, gold = "epic", "🟣 Епічний", "🟣", random.randint(10, 20)
-
-    names = NAMES_BY_LOC.get(location, NAMES_BY_LOC["Тракт"])
-    name = random.choice(names)
-
-    itype = _roll_item_type()
-    bonus = _item_bonus_for(rarity, itype)
-    price = compute_price(rarity)
-
-    return {
-        "name": name,
-        "rarity": rarity,
-        "title": title,
-        "emoji": emoji,
-        "gold": gold,
-        "type": itype,
-        "atk": bonus["atk"],
-        "def": bonus["def"],
-        "price": price,
-        "equipped": False,
-        # durability можуть додавати інші модулі під час екіпування/битви
-    }
+    # Назва/рідкість/тип/бонуси — у шаблоні; в екземплярі лише золото і ціна.
+    # durability можуть додавати інші модулі під час екіпування/битви
+    if pity is None:
+        return loot_table(location, tier).roll(rng)
+    return generate_loot_batch(location, 1, rng, tier, pity=pity)[0]
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Прості внутрішні метрики: лічильники, вибірки часу і монітор затримок event loop.
+
+Без зовнішніх залежностей — знімок метрик просто логуються раз на
+кілька хвилин (або віддається в навантажувальний тест через snapshot()).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+LOGGER = logging.getLogger("RPG")
+
+# Скільки останніх вимірів тримаємо на кожну вибірку
+SAMPLE_WINDOW = 2048
+
+_counters: Dict[str, int] = defaultdict(int)
+_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+_maxima: Dict[str, float] = defaultdict(float)
+
+
+def inc(name: str, n: int = 1) -> None:
+    _counters[name] += n
+
+
+def observe(name: str, value: float) -> None:
+    """Записати вимір (секунди, байти — будь-що числове)."""
+    _samples[name].append(value)
+    if value > _maxima[name]:
+        _maxima[name] = value
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def snapshot() -> Dict[str, object]:
+    """Поточні лічильники + p50/p99/max для кожної вибірки."""
+    out: Dict[str, object] = dict(_counters)
+    for name, values in list(_samples.items()):
+        vals = list(values)
+        out[name] = {
+            "count": len(vals),
+            "p50": percentile(vals, 50),
+            "p99": percentile(vals, 99),
+            "max": _maxima[name],
+        }
+    return out
+
+
+def reset() -> None:
+    _counters.clear()
+    _samples.clear()
+    _maxima.clear()
+
+
+class LoopStallMonitor:
+    """
+    Міряє, наскільки пізно event loop прокидається після sleep(interval).
+    Запізнення = час, коли loop був зайнятий чимось синхронним
+    (серіалізація, fsync, важкий хендлер), тобто затримка всіх callback'ів.
+    """
+
+    def __init__(self, interval: float = 0.05, report_every: float = 300.0):
+        self.interval = interval
+        self.report_every = report_every
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = time.monotonic()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            observe("loop.stall", max(0.0, loop.time() - t0 - self.interval))
+            if self.report_every and time.monotonic() - last_report >= self.report_every:
+                last_report = time.monotonic()
+                stall = snapshot().get("loop.stall", {})
+                LOGGER.info(
+                    "Event loop: затримка p99=%.1f мс, max=%.1f мс",
+                    stall.get("p99", 0) * 1000, stall.get("max", 0) * 1000,
+                )
+                if _counters.get("render.edits") or _counters.get("render.edit_saved"):
+                    LOGGER.info(
+                        "Редагування: виконано=%d, пропущено однакових=%d, «not modified»=%d",
+                        _counters.get("render.edits", 0), _counters.get("render.edit_saved", 0),
+                        _counters.get("render.not_modified", 0),
+                    )
+                wait = snapshot().get("updates.wait")
+                if wait:
+                    LOGGER.info(
+                        "Апдейти: очікування p99=%.1f мс, у черзі за своїм гравцем=%d",
+                        wait["p99"] * 1000, _counters.get("updates.serialized", 0),
+                    )
+
+
+__all__ = [
+    "inc",
+    "observe",
+    "percentile",
+    "snapshot",
+    "reset",
+    "LoopStallMonitor",
+]
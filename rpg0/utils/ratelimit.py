@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Планувальник вихідних запитів до Bot API.
+
+Telegram обмежує відправку: ~30 повідомлень/с на бота і ~1/с на чат
+(20/хв у групах); перевищення дає 429 RetryAfter, яке без планувальника
+вилітає в on_error. OutboundScheduler — BaseRateLimiter для PTB, тож через
+нього проходить кожен виклик бота (крім getUpdates):
+
+1. Чат: запит резервує час у відрі свого чату (GCRA — "token bucket" без
+   таймера: burst запитів одразу, далі рівно `rate` на секунду) і чекає на
+   нього. Поки редагування того самого повідомлення чекає, новіше
+   редагування не стає в чергу, а підміняє його аргументи — піде лише
+   останній рендер, а обидва виклики отримають один результат.
+2. Бот: готові запити стають у купу за пріоритетом, і єдиний диспетчер
+   випускає їх з глобальною швидкістю. Пріоритети: відповіді на callback
+   (PRIORITY_ANSWER, до того ж без лімітів), інтерактив (PRIORITY_INTERACTIVE,
+   усе за замовчуванням), розсилки (PRIORITY_BULK — через
+   rate_limit_args={"priority": PRIORITY_BULK}).
+
+RetryAfter ставить на паузу чат (або весь бот, якщо чату немає) і повертає
+запит у чергу — до `max_retries` разів, далі помилка йде викликачу.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Hashable, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from . import metrics
+
+LOGGER = logging.getLogger("RPG")
+
+PRIORITY_ANSWER = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+# Не є повідомленнями — ліміти Telegram на них не поширюються
+UNLIMITED_ENDPOINTS = frozenset({
+    "answerCallbackQuery", "answerInlineQuery", "getMe", "getChat", "getFile",
+    "setWebhook", "deleteWebhook", "getWebhookInfo", "setMyCommands", "close", "logOut",
+})
+# Редагування, які можна зливати: у черзі лишається тільки найновіше
+COALESCE_ENDPOINTS = frozenset({
+    "editMessageText", "editMessageReplyMarkup", "editMessageCaption", "editMessageMedia",
+})
+
+
+class TokenBucket:
+    """GCRA: `burst` запитів одразу, далі `rate` на секунду. reserve() повертає момент, коли можна."""
+
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.interval = 1.0 / rate
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self.tat = 0.0  # теоретичний час прибуття наступного запиту
+
+    def next_at(self, now: float) -> float:
+        return max(now, self.tat - self.tolerance)
+
+    def reserve(self, now: float) -> float:
+        at = self.next_at(now)
+        self.tat = max(self.tat, now) + self.interval
+        return at
+
+    def pause(self, until: float) -> None:
+        self.tat = max(self.tat, until + self.tolerance)
+
+    def idle(self, now: float) -> bool:
+        return self.tat <= now
+
+
+class _Job:
+    __slots__ = ("priority", "chat", "key", "callback", "args", "kwargs", "waiters", "retries")
+
+    def __init__(self, priority: int, chat: Optional[Hashable], key: Optional[Hashable],
+                 callback: Callable[..., Coroutine[Any, Any, Any]], args: Any, kwargs: Dict[str, Any]):
+        self.priority = priority
+        self.chat = chat
+        self.key = key
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.waiters: List[asyncio.Future] = []
+        self.retries = 0
+
+
+def _coalesce_key(endpoint: str, data: Dict[str, Any]) -> Optional[Hashable]:
+    if endpoint not in COALESCE_ENDPOINTS:
+        return None
+    if data.get("inline_message_id"):
+        return endpoint, data["inline_message_id"]
+    if data.get("chat_id") is not None and data.get("message_id") is not None:
+        return endpoint, data["chat_id"], data["message_id"]
+    return None
+
+
+class OutboundScheduler(BaseRateLimiter[Dict[str, Any]]):
+    """BaseRateLimiter: відра чату + пріоритетна черга бота + злиття редагувань + RetryAfter."""
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: int = 3,
+                 group_rate: float = 20 / 60, max_retries: int = 3, max_chats: int = 10_000):
+        # глобально — майже рівномірно: сплеск у 2×rate за першу секунду вже дає 429,
+        # а запас в один слот компенсує запізнення пробудження диспетчера
+        self.global_bucket = TokenBucket(global_rate, 2)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._pending: Dict[Hashable, _Job] = {}
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    # ---- Життєвий цикл (викликає ExtBot.initialize/shutdown) ----
+
+    async def initialize(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _, _, job in self._heap:
+            self._fail(job, RuntimeError("Планувальник зупинено"))
+        self._heap.clear()
+
+    # ---- Відра ----
+
+    def _chat_bucket(self, chat: Hashable) -> TokenBucket:
+        bucket = self._chats.get(chat)
+        if bucket is None:
+            if len(self._chats) >= self.max_chats:
+                # найдавніші відра, що вже повністю відновились, рівноцінні новим
+                now = time.monotonic()
+                for old in list(itertools.islice(self._chats, 0, len(self._chats) // 4 or 1)):
+                    if self._chats[old].idle(now):
+                        del self._chats[old]
+            group = isinstance(chat, str) or (isinstance(chat, int) and chat < 0)
+            bucket = self._chats[chat] = TokenBucket(self.group_rate if group else self.chat_rate,
+                                                     1 if group else self.chat_burst)
+        else:
+            self._chats.move_to_end(chat)
+        return bucket
+
+    # ---- Запити ----
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Any:
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await self._call_unlimited(callback, args, kwargs)
+
+        key = _coalesce_key(endpoint, data)
+        queued = self._pending.get(key) if key is not None else None
+        fut = asyncio.get_running_loop().create_future()
+        if queued is not None:
+            # новіший рендер того самого повідомлення замінює той, що ще чекає
+            queued.callback, queued.args, queued.kwargs = callback, args, kwargs
+            queued.waiters.append(fut)
+            metrics.inc("ratelimit.coalesced")
+            return await fut
+
+        priority = (rate_limit_args or {}).get("priority", PRIORITY_INTERACTIVE)
+        job = _Job(priority, data.get("chat_id"), key, callback, args, kwargs)
+        job.waiters.append(fut)
+        self._submit(job)
+        return await fut
+
+    async def _call_unlimited(self, callback, args, kwargs) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                metrics.inc("ratelimit.retry_after")
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(_seconds(e.retry_after))
+
+    def _submit(self, job: _Job) -> None:
+        """Етап чату: зарезервувати час у відрі чату й дочекатися його."""
+        if job.key is not None:
+            self._pending[job.key] = job
+        t0 = time.monotonic()
+        at = self._chat_bucket(job.chat).reserve(t0) if job.chat is not None else t0
+        if at <= t0:
+            self._ready(job)
+        else:
+            asyncio.get_running_loop().call_at(asyncio.get_running_loop().time() + (at - t0), self._ready, job)
+
+    def _ready(self, job: _Job) -> None:
+        """Етап бота: у купу за пріоритетом."""
+        if self._task is None:
+            self._fail(job, RuntimeError("Планувальник зупинено"))
+            return
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._heap:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            now = time.monotonic()
+            at = self.global_bucket.next_at(now)
+            if at > now:
+                await asyncio.sleep(at - now)
+                continue  # за цей час міг з'явитися запит з вищим пріоритетом
+            _, _, job = heapq.heappop(self._heap)
+            self.global_bucket.reserve(now)
+            if job.key is not None and self._pending.get(job.key) is job:
+                del self._pending[job.key]
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.callback(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            metrics.inc("ratelimit.retry_after")
+            if job.retries >= self.max_retries:
+                self._fail(job, e)
+                return
+            job.retries += 1
+            until = time.monotonic() + _seconds(e.retry_after)
+            if job.chat is not None:
+                self._chat_bucket(job.chat).pause(until)
+            else:
+                self.global_bucket.pause(until)
+            LOGGER.warning("429 від Telegram (чат %s): пауза %.1f с", job.chat, _seconds(e.retry_after))
+            newer = self._pending.get(job.key) if job.key is not None else None
+            if newer is not None:
+                newer.waiters.extend(job.waiters)  # новіший рендер уже в черзі — він і відповість
+            else:
+                self._submit(job)
+        except Exception as e:  # помилки Bot API — викликачу, як без планувальника
+            self._fail(job, e)
+        else:
+            for fut in job.waiters:
+                if not fut.done():
+                    fut.set_result(result)
+
+    @staticmethod
+    def _fail(job: _Job, exc: BaseException) -> None:
+        for fut in job.waiters:
+            if not fut.done():
+                fut.set_exception(exc)
+
+    def __len__(self) -> int:
+        """Запитів у черзі бота (готових до відправки)."""
+        return len(self._heap)
+
+
+def _seconds(retry_after: Any) -> float:
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+__all__ = [
+    "OutboundScheduler",
+    "TokenBucket",
+    "PRIORITY_ANSWER",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BULK",
+]
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Прибирання покинутих боїв.
+
+Розмова battle_conv персистентна й сама не завершується: кинутий бій лишає
+enemy / battle_state / loot_pending / last_log у user_data назавжди, і кожне
+скидання персистентності тягне їх знову. Тут — один спільний таймер на весь
+бот (колесо часу, TimerWheel), а не по таймеру на гравця: кожна дія в бою
+лише переставляє ключ гравця в інший слот колеса (O(1)), а фонове завдання
+раз на `tick` секунд забирає прострочених з поточного слота і чистить їх
+пачками.
+
+Після рестарту колесо порожнє: активні розмови й резидентні гравці з
+бойовими ключами отримують повний TTL від моменту старту.
+У лінивому режимі персистентності витіснений з пам'яті гравець отримує лише
+завершення розмови — його ключі перезапишуться наступним боєм.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+from telegram.ext import ConversationHandler
+
+from ..config import BATTLE_IDLE_TTL, BATTLE_REAPER_TICK, BATTLE_REAPER_BATCH
+from . import metrics
+
+LOGGER = logging.getLogger("RPG")
+
+# Ключі user_data, що живуть лише протягом бою
+BATTLE_KEYS = ("enemy", "battle_state", "loot_pending", "last_log", "defending")
+
+
+class TimerWheel:
+    """
+    Хешоване колесо часу: `slots` кошиків по `tick` секунд.
+    Дедлайн далі за оберт колеса кладеться в найдальший кошик і
+    переставляється, коли той спрацює.
+    """
+
+    __slots__ = ("tick", "slots", "_buckets", "_cursor", "_now", "_deadline", "_where")
+
+    def __init__(self, tick: float, slots: int, now: Optional[float] = None):
+        self.tick = tick
+        self.slots = max(2, slots)
+        self._buckets: List[Set[Hashable]] = [set() for _ in range(self.slots)]
+        self._cursor = 0
+        self._now = time.monotonic() if now is None else now
+        self._deadline: Dict[Hashable, float] = {}
+        self._where: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._deadline)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadline
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Поставити/перенести дедлайн ключа."""
+        ahead = max(1, math.ceil((deadline - self._now) / self.tick))
+        idx = (self._cursor + min(ahead, self.slots - 1)) % self.slots
+        old = self._where.get(key)
+        if old != idx:
+            if old is not None:
+                self._buckets[old].discard(key)
+            self._buckets[idx].add(key)
+            self._where[key] = idx
+        self._deadline[key] = deadline
+
+    def cancel(self, key: Hashable) -> None:
+        idx = self._where.pop(key, None)
+        if idx is not None:
+            self._buckets[idx].discard(key)
+        self._deadline.pop(key, None)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Прокрутити колесо до `now`; повертає ключі з дедлайном, що минув."""
+        expired: List[Hashable] = []
+        while self._now + self.tick <= now:
+            self._now += self.tick
+            self._cursor = (self._cursor + 1) % self.slots
+            bucket = self._buckets[self._cursor]
+            if not bucket:
+                continue
+            self._buckets[self._cursor] = set()
+            for key in bucket:
+                del self._where[key]
+                if self._deadline[key] <= self._now:
+                    del self._deadline[key]
+                    expired.append(key)
+                else:
+                    self.schedule(key, self._deadline[key])
+        return expired
+
+
+class BattleReaper:
+    """Завершує бої, в яких гравець не діяв `ttl` секунд."""
+
+    def __init__(self, ttl: float = BATTLE_IDLE_TTL, tick: float = BATTLE_REAPER_TICK,
+                 batch: int = BATTLE_REAPER_BATCH):
+        self.ttl = ttl
+        self.batch = max(1, batch)
+        self.wheel = TimerWheel(tick, math.ceil(ttl / tick) + 1 if ttl > 0 else 2)
+        self._app: Any = None
+        self._conv: Optional[ConversationHandler] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def bind(self, app: Any, conv: ConversationHandler) -> None:
+        self._app, self._conv = app, conv
+
+    def touch(self, chat_id: Optional[int], user_id: int) -> None:
+        """Гравець діяв у бою — відсунути його дедлайн."""
+        if self.enabled:
+            self.wheel.schedule((chat_id, user_id), time.monotonic() + self.ttl)
+
+    def touch_update(self, update: Any) -> None:
+        user = getattr(update, "effective_user", None)
+        if user is not None:
+            chat = getattr(update, "effective_chat", None)
+            self.touch(chat.id if chat is not None else None, user.id)
+
+    def restore(self) -> None:
+        """Після старту: поставити в колесо активні розмови й гравців із залишками бою."""
+        seen: Set[int] = set()
+        if self._conv is not None:
+            for key in list(self._conv._conversations):
+                chat_id, user_id = key[0], key[-1]
+                self.touch(chat_id, user_id)
+                seen.add(user_id)
+        if self._app is not None:
+            for user_id, ud in self._app.user_data.items():
+                if user_id not in seen and any(k in ud for k in BATTLE_KEYS):
+                    self.touch(None, user_id)
+        if len(self.wheel):
+            LOGGER.info("Таймер боїв: відстежується %d гравців", len(self.wheel))
+
+    # ---- Фонове завдання ----
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self.restore()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            expired = self.wheel.advance(time.monotonic())
+            if expired:
+                await self.expire(expired)
+
+    async def expire(self, keys: List[tuple]) -> None:
+        """Почистити бойові ключі й завершити розмови — пачками по `batch`, віддаючи loop між ними."""
+        total = 0
+        # гравець, чий апдейт саме обробляється, не простоює — лише відсуваємо дедлайн
+        busy = getattr(getattr(self._app, "update_processor", None), "busy", None)
+        for i in range(0, len(keys), self.batch):
+            changed: Set[int] = set()
+            for chat_id, user_id in keys[i:i + self.batch]:
+                if busy is not None and busy(user_id):
+                    self.touch(chat_id, user_id)
+                    continue
+                ud = self._app.user_data.get(user_id) if self._app is not None else None
+                if ud:
+                    removed = [k for k in BATTLE_KEYS if ud.pop(k, None) is not None]
+                    if removed:
+                        changed.add(user_id)
+                if chat_id is not None and self._conv is not None:
+                    # Приватний API PTB (перевірено на python-telegram-bot 21.5, див. requirements.txt):
+                    # публічного способу завершити чужу розмову немає. tests/test_reaper.py
+                    # перевіряє його на справжньому Application — при оновленні PTB дивитися туди.
+                    self._conv._update_state(ConversationHandler.END, (chat_id, user_id))
+                total += 1
+            if changed and self._app is not None:
+                self._app.mark_data_for_update_persistence(user_ids=changed)
+            await asyncio.sleep(0)
+        metrics.inc("reaper.expired", total)
+        LOGGER.info("Таймер боїв: завершено %d неактивних боїв", total)
+
+
+# Єдиний екземпляр на процес; прив'язується до Application у build_app()
+REAPER = BattleReaper()
+
+
+__all__ = ["TimerWheel", "BattleReaper", "REAPER", "BATTLE_KEYS"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Редагування повідомлень без зайвих викликів Telegram API.
+
+safe_edit(q, text, ...) — заміна q.edit_message_text(...). Для кожного
+повідомлення (chat_id, message_id) пам'ятаємо відбиток останнього
+показаного тексту й клавіатури (обмежений LRU). Якщо новий рендер той самий —
+редагування пропускається: хендлери вже відповіли на callback (q.answer()),
+тож кнопка «відпускається» і без нього. Якщо відбитка немає (рестарт) і
+Telegram все одно відповів «message is not modified» — помилку гасимо тут,
+а не в on_error.
+
+Лічильники: render.edits, render.edit_saved, render.not_modified.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from telegram.error import BadRequest
+
+from ..config import RENDER_CACHE_SIZE
+from . import metrics
+
+_last: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+
+def _key(q: Any) -> Optional[Hashable]:
+    msg = getattr(q, "message", None)
+    if msg is not None:
+        return (msg.chat_id, msg.message_id)
+    inline_id = getattr(q, "inline_message_id", None)
+    return inline_id or None
+
+
+def fingerprint(text: str, reply_markup: Any = None, parse_mode: Any = None) -> bytes:
+    h = hashlib.blake2b(digest_size=12)
+    h.update(text.encode("utf-8"))
+    h.update(b"\0" + str(parse_mode).encode())
+    if reply_markup is not None:
+        h.update(b"\0" + json.dumps(reply_markup.to_dict(), sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return h.digest()
+
+
+def _remember(key: Hashable, fp: bytes) -> None:
+    _last[key] = fp
+    _last.move_to_end(key)
+    while len(_last) > RENDER_CACHE_SIZE:
+        _last.popitem(last=False)
+
+
+async def safe_edit(q: Any, text: str, parse_mode: Any = None, reply_markup: Any = None, **kwargs: Any) -> bool:
+    """Відредагувати повідомлення callback'а, якщо вміст змінився. True — редагування відбулося."""
+    key = _key(q)
+    fp = fingerprint(text, reply_markup, parse_mode)
+    if key is not None and _last.get(key) == fp:
+        _last.move_to_end(key)
+        metrics.inc("render.edit_saved")
+        return False
+    try:
+        await q.edit_message_text(text, parse_mode=parse_mode, reply_markup=reply_markup, **kwargs)
+    except BadRequest as exc:
+        if "not modified" not in str(exc).lower():
+            raise
+        metrics.inc("render.not_modified")
+        if key is not None:
+            _remember(key, fp)
+        return False
+    metrics.inc("render.edits")
+    if key is not None:
+        _remember(key, fp)
+    return True
+
+
+def forget(q: Any) -> None:
+    """Скинути відбиток (наприклад, якщо повідомлення змінено в обхід safe_edit)."""
+    key = _key(q)
+    if key is not None:
+        _last.pop(key, None)
+
+
+__all__ = ["safe_edit", "fingerprint", "forget"]
@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 """
 Класові вміння + утиліти для вибору/менеджменту/застосування в бою.
-Ефекти: шкода, кровотеча, оглушення, тимчасові бафи, лікування.
+Миттєві дії (шкода, лікування) — тут; статус-ефекти (кровотеча, оглушення,
+бафи, щити, відновлення) — у реєстрі utils/effects.py.
 """
 from __future__ import annotations
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 import random
 
+from . import effects
+
 # Опис класових умінь
-# type: dmg | bleed | stun | buff_def | buff_atk | heal
+# type: dmg | heal | назва ефекту з effects.EFFECTS (bleed | stun | buff_def | buff_atk | shield | regen)
+# power — сила; для ефектів це тривалість або значення (див. EffectType.power),
+# необов'язкові "turns"/"value" задають обидва явно.
 CLASS_SKILLS: Dict[str, Dict[str, Dict]] = {
     "Рицар": {
         "Щитова стійка": {"cd": 3, "type": "buff_def", "power": 2, "desc": "На 1 хід +2 до захисту."},
@@ -87,89 +92,71 @@ def remove_from_loadout(p, skill_name: str) -> Tuple[bool, str]:
 
 # ---- Бойова частина ----
 
-def apply_skill(player, enemy, skill_name: str, battle_state: dict) -> str:
-    """Застосувати вміння. Повертає текст ефекту."""
+def _skill_dmg(player, enemy, sdef: dict, battle_state: dict, rng) -> str:
+    # відкладений імпорт, щоб уникнути циклічного імпорту
+    from .battle_engine import roll_damage
+    dmg = max(1, roll_damage(player.atk + sdef["power"], enemy.defense, rng))
+    enemy.hp -= dmg
+    return f"завдаєте {dmg} шкоди."
+
+def _skill_heal(player, enemy, sdef: dict, battle_state: dict, rng) -> str:
+    healed = min(player.max_hp - player.hp, sdef["power"])
+    player.hp += healed
+    return f"лікування {healed} HP."
+
+# Миттєві типи умінь; решта типів — назви статус-ефектів
+SKILL_ACTIONS: Dict[str, Callable[..., str]] = {
+    "dmg": _skill_dmg,
+    "heal": _skill_heal,
+}
+
+def apply_skill(player, enemy, skill_name: str, battle_state: dict, rng=random) -> str:
+    """Застосувати вміння. Повертає текст ефекту. rng — генератор бою (див. battle_engine)."""
     sdef = skills_for_class(player.class_name).get(skill_name)
     if not sdef:
         return "Це вміння недоступне."
-    cd = sdef["cd"]; stype = sdef["type"]; power = sdef["power"]
+    stype = sdef["type"]
     cds = battle_state.setdefault("cooldowns", {})
     if cds.get(skill_name, 0) > 0:
         return "Вміння на перезарядці."
     text = f"✨ {skill_name}: "
 
-    if stype == "dmg":
-        # відкладений імпорт, щоб уникнути циклічного імпорту
-        from ..handlers.battle import roll_damage
-        dmg = max(1, roll_damage(player.atk + power, enemy.defense))
-        enemy.hp -= dmg
-        text += f"завдаєте {dmg} шкоди."
-    elif stype == "bleed":
-        est = battle_state.setdefault("e_status", {})
-        est["bleed"] = max(est.get("bleed", 0), power)  # тривалість у ходах
-        text += f"накладено кровотечу на {power} х."
-    elif stype == "stun":
-        est = battle_state.setdefault("e_status", {})
-        est["stun"] = max(est.get("stun", 0), power)
-        text += "ворог оглушений!"
-    elif stype == "buff_def":
-        pst = battle_state.setdefault("p_status", {})
-        pst["def_up"] = 1
-        pst["def_up_val"] = power
-        text += f"+{power} до захисту на цей раунд."
-    elif stype == "buff_atk":
-        pst = battle_state.setdefault("p_status", {})
-        pst["atk_up"] = 1
-        pst["atk_up_val"] = power
-        text += f"+{power} до атаки на цей раунд."
-    elif stype == "heal":
-        healed = min(player.max_hp - player.hp, power)
-        player.hp += healed
-        text += f"лікування {healed} HP."
+    action = SKILL_ACTIONS.get(stype)
+    if action is not None:
+        text += action(player, enemy, sdef, battle_state, rng)
+    elif stype in effects.EFFECTS:
+        text += effects.apply_power(battle_state, stype, sdef["power"], sdef)
     else:
         text += "нічого не сталося…"
 
-    cds[skill_name] = cd
+    cds[skill_name] = sdef["cd"]
     return text
 
-def consume_player_temp_buffs(player, battle_state: dict) -> Tuple[int, int]:
-    """(atk_bonus, def_bonus) на атаку гравця. З’їдає ефект “на 1 хід” для атаки."""
-    pst = battle_state.setdefault("p_status", {})
-    atk_b = pst.get("atk_up_val", 0) if pst.get("atk_up") else 0
-    def_b = pst.get("def_up_val", 0) if pst.get("def_up") else 0
-    pst["atk_up"] = 0; pst["atk_up_val"] = 0
-    # def_up НЕ скидаємо тут — він впливає на атаку ворога; скиньте після ходу ворога через clear_player_def_buff_after_enemy_turn()
-    return atk_b, def_b
-
-def clear_player_def_buff_after_enemy_turn(battle_state: dict) -> None:
-    """Скинути одноходовий деф-баф наприкінці ходу ворога."""
-    pst = battle_state.setdefault("p_status", {})
-    pst["def_up"] = 0
-    pst["def_up_val"] = 0
-
 def turn_tick_cooldowns(battle_state: dict) -> None:
     cds = battle_state.setdefault("cooldowns", {})
     for k in list(cds.keys()):
         if cds[k] > 0:
             cds[k] -= 1
 
+# ---- Сумісність: старі точки входу поверх utils/effects.py ----
+
+def consume_player_temp_buffs(player, battle_state: dict) -> Tuple[int, int]:
+    """(atk_bonus, def_bonus) на атаку гравця. З’їдає баф атаки “до використання”."""
+    atk_b = effects.stat_bonus(battle_state, effects.PLAYER, "atk", consume=True)
+    # баф захисту НЕ знімаємо — він впливає на атаку ворога
+    def_b = effects.stat_bonus(battle_state, effects.PLAYER, "def")
+    return atk_b, def_b
+
+def clear_player_def_buff_after_enemy_turn(battle_state: dict) -> None:
+    """Скинути одноходовий деф-баф наприкінці ходу ворога."""
+    effects.stat_bonus(battle_state, effects.PLAYER, "def", consume=True)
+
 def apply_start_of_enemy_turn_effects(enemy, battle_state: dict) -> str:
     """Початок ходу ворога: кровотечі тощо."""
-    est = battle_state.setdefault("e_status", {})
-    out = []
-    if est.get("bleed", 0) > 0:
-        bleed_dmg = max(1, int(enemy.max_hp * 0.05))
-        enemy.hp -= bleed_dmg
-        est["bleed"] -= 1
-        out.append(f"🩸 Кровотеча: -{bleed_dmg} HP ворогу.")
-    return "\n".join(out)
+    return effects.tick(battle_state, None, enemy, kinds=("dot",)).text
 
 def enemy_is_stunned(battle_state: dict) -> bool:
-    est = battle_state.setdefault("e_status", {})
-    if est.get("stun", 0) > 0:
-        est["stun"] -= 1
-        return True
-    return False
+    return effects.tick(battle_state, kinds=("stun",)).stunned
 
 __all__ = [
     "CLASS_SKILLS",
@@ -181,6 +168,7 @@ __all__ = [
     "can_add_to_loadout",
     "add_to_loadout",
     "remove_from_loadout",
+    "SKILL_ACTIONS",
     "apply_skill",
     "consume_player_temp_buffs",
     "clear_player_def_buff_after_enemy_turn",
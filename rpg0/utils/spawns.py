@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Реєстр появи ворогів.
+
+Таблиці з config.ENEMY_TABLES компілюються один раз під час імпорту:
+для кожної локації і кожного діапазону рівнів — своя alias-таблиця
+(зважений вибір за O(1)). Масштабовані під рівень характеристики
+шаблону кешуються (обмежений lru_cache), тож /explore лише вибирає
+шаблон і додає випадкову частину золота.
+
+Рядок таблиці: (ім'я, HP, ATK, DEF, EXP, золото[, опції]), де опції —
+dict з необов'язковими "weight" (вага, за замовчуванням 1), "tier"
+("normal" | "elite" | "rare") і "levels" ((мін, макс) рівень гравця).
+"""
+from __future__ import annotations
+
+import random
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import ENEMY_TABLES, ENEMY_TIERS
+from ..models import Enemy
+from .alias import AliasTable
+
+FALLBACK_LOCATION = "Тракт"
+MAX_LEVEL = 10 ** 9
+
+
+@dataclass(frozen=True, slots=True)
+class EnemyTemplate:
+    name: str
+    hp: int
+    atk: int
+    defense: int
+    exp: int
+    gold: int
+    weight: float = 1.0
+    tier: str = "normal"
+    min_level: int = 1
+    max_level: int = MAX_LEVEL
+
+
+@lru_cache(maxsize=4096)
+def scaled_stats(tpl: EnemyTemplate, level: int) -> Tuple[str, int, int, int, int, int]:
+    """(ім'я, HP, ATK, DEF, EXP, базове золото) шаблону для рівня гравця."""
+    hp = tpl.hp + (level - 1) * 4
+    atk = tpl.atk + (level - 1)
+    defense = tpl.defense + (level // 3)
+    exp = tpl.exp + (level - 1) * 3
+    gold = tpl.gold
+    tier = ENEMY_TIERS.get(tpl.tier)
+    name = tpl.name
+    if tier:
+        hp = int(hp * tier.get("hp", 1))
+        atk = int(atk * tier.get("atk", 1))
+        defense = int(defense * tier.get("defense", 1))
+        exp = int(exp * tier.get("reward", 1))
+        gold = int(gold * tier.get("reward", 1))
+        name = tier.get("prefix", "") + name
+    return name, hp, atk, defense, exp, gold
+
+
+def _parse(row: tuple) -> EnemyTemplate:
+    name, hp, atk, defense, exp, gold = row[:6]
+    opts: Dict[str, Any] = row[6] if len(row) > 6 else {}
+    lo, hi = opts.get("levels", (1, MAX_LEVEL))
+    return EnemyTemplate(name, hp, atk, defense, exp, gold, float(opts.get("weight", 1.0)),
+                         opts.get("tier", "normal"), int(lo), int(hi))
+
+
+class SpawnTable:
+    """Шаблони однієї локації, розбиті на діапазони рівнів з alias-таблицею на кожен."""
+
+    __slots__ = ("templates", "bounds", "bands")
+
+    def __init__(self, templates: List[EnemyTemplate]):
+        self.templates = templates
+        cuts = sorted({1} | {t.min_level for t in templates} | {t.max_level + 1 for t in templates})
+        self.bounds: List[int] = []
+        self.bands: List[Optional[AliasTable]] = []
+        for lo in cuts:
+            active = [t for t in templates if t.min_level <= lo <= t.max_level and t.weight > 0]
+            self.bounds.append(lo)
+            self.bands.append(AliasTable(active, [t.weight for t in active]) if active else None)
+
+    def table_for(self, level: int) -> Optional[AliasTable]:
+        i = bisect_right(self.bounds, max(1, level)) - 1
+        return self.bands[i] if i >= 0 else None
+
+    def weights_for(self, level: int) -> List[Tuple[EnemyTemplate, float]]:
+        """Шаблони, доступні на рівні, з їхніми вагами (для симулятора/звітів)."""
+        return [(t, t.weight) for t in self.templates if t.min_level <= level <= t.max_level and t.weight > 0]
+
+
+def compile_tables(tables: Dict[str, list]) -> Dict[str, SpawnTable]:
+    return {loc: SpawnTable([_parse(r) for r in rows]) for loc, rows in tables.items()}
+
+
+SPAWNS: Dict[str, SpawnTable] = compile_tables(ENEMY_TABLES)
+
+
+def spawn_table(location: str) -> SpawnTable:
+    return SPAWNS.get(location) or SPAWNS[FALLBACK_LOCATION]
+
+
+def pick_template(location: str, level: int, rng: Any = random) -> EnemyTemplate:
+    table = spawn_table(location).table_for(level)
+    if table is None:
+        table = spawn_table(FALLBACK_LOCATION).table_for(level)
+    return table.sample(rng)
+
+
+def spawn_enemy(level: int, location: str = FALLBACK_LOCATION, rng: Any = random) -> Enemy:
+    """Ворог для гравця рівня `level` у локації (зважений вибір + кешоване масштабування)."""
+    tpl = pick_template(location, level, rng)
+    name, hp, atk, defense, exp, gold = scaled_stats(tpl, level)
+    return Enemy(name=name, hp=hp, max_hp=hp, atk=atk, defense=defense,
+                 exp_reward=exp, gold_reward=gold + rng.randint(0, level * 2), tier=tpl.tier)
+
+
+__all__ = [
+    "EnemyTemplate",
+    "SpawnTable",
+    "SPAWNS",
+    "compile_tables",
+    "scaled_stats",
+    "spawn_table",
+    "pick_template",
+    "spawn_enemy",
+]
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Конкурентна обробка апдейтів з послідовністю в межах гравця.
+
+За замовчуванням PTB обробляє апдейти по одному: повільний хендлер одного
+гравця (запис у базу, мережа) затримує всіх. Просте concurrent_updates
+ламає інше — два швидкі натискання "Купити" чи бойові кнопки одного
+гравця виконуються одночасно над тим самим user_data і гублять зміни.
+
+PerUserUpdateProcessor запускає апдейти різних гравців паралельно, а
+апдейти одного гравця — строго по черзі (asyncio.Lock на гравця, черга
+FIFO, тож порядок натискань зберігається). Спершу береться замок гравця,
+і лише потім — глобальний слот (`max_running`): гравець, що чекає сам на
+себе, не займає слот і не блокує інших. Семафор PTB (`max_pending`)
+обмежує загальну кількість апдейтів у роботі й очікуванні.
+
+Замки живуть, поки в гравця є апдейти в роботі чи в черзі, і
+прибираються одразу після останнього — пам'ять не росте з кількістю
+гравців, що колись писали боту.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from . import metrics
+
+
+def update_key(update: object) -> Optional[Hashable]:
+    """Ключ серіалізації: гравець (або чат, якщо гравця немає). None — без черги."""
+    if not isinstance(update, Update):
+        return None
+    user = update.effective_user
+    if user is not None:
+        return user.id
+    chat = update.effective_chat
+    return ("chat", chat.id) if chat is not None else None
+
+
+class _UserSlot:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Паралельно між гравцями, послідовно в межах гравця."""
+
+    __slots__ = ("_running", "_max_running", "_slots")
+
+    def __init__(self, max_running: int, max_pending: int):
+        super().__init__(max(max_pending, max_running))
+        self._max_running = max_running
+        self._running = asyncio.BoundedSemaphore(max_running)
+        self._slots: Dict[Hashable, _UserSlot] = {}
+
+    @property
+    def max_running(self) -> int:
+        return self._max_running
+
+    def __len__(self) -> int:
+        """Скільки гравців зараз мають апдейти в роботі чи в черзі."""
+        return len(self._slots)
+
+    def busy(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_key(update)
+        t0 = time.perf_counter()
+        if key is None:
+            async with self._running:
+                metrics.observe("updates.wait", time.perf_counter() - t0)
+                await coroutine
+            return
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _UserSlot()
+        elif slot.refs:
+            metrics.inc("updates.serialized")
+        slot.refs += 1
+        try:
+            async with slot.lock:
+                async with self._running:
+                    metrics.observe("updates.wait", time.perf_counter() - t0)
+                    await coroutine
+        finally:
+            slot.refs -= 1
+            if not slot.refs:
+                del self._slots[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+__all__ = ["PerUserUpdateProcessor", "update_key"]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Бойові хендлери: на callback query відповідаємо рівно один раз."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rpg0.handlers.battle import battle_action
+from rpg0.models import Enemy, Player
+from rpg0.utils.battle_engine import new_battle_state
+
+
+class _Query:
+    def __init__(self):
+        self.answers = 0
+        self.message = SimpleNamespace(chat_id=1, message_id=1)
+
+    async def answer(self, *args, **kwargs):
+        self.answers += 1
+
+    async def edit_message_text(self, text, **kwargs):
+        return None
+
+
+@pytest.mark.parametrize("action", ["auto", "attack", "defend", ""])
+def test_query_answered_once(action):
+    ud = {"player": Player(registered=True), "enemy": Enemy("Вовк", 12, 12, 3, 1, 5, 5),
+          "battle_state": new_battle_state()}
+    q = _Query()
+    update = SimpleNamespace(callback_query=q, effective_user=None, effective_chat=None)
+    asyncio.run(battle_action(update, SimpleNamespace(user_data=ud), action))
+    assert q.answers == 1
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""callback_data: компактний формат (utils/callback_codec.py), текстовий "простір:дія:аргументи" і CallbackRouter."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import rpg0.bot  # noqa: F401  — реєструє маршрути всіх хендлерів у ROUTER
+from rpg0.config import BACKSTORIES, CLASSES, LOC_SHOP
+from rpg0.router import ROUTER, WILDCARD, CallbackRouter
+from rpg0.utils.callback_codec import MAX_LEN, PREFIX, SKILL, IdKind
+
+
+async def _noop(update, context, *args):
+    return None
+
+
+@pytest.fixture
+def compact(monkeypatch):
+    monkeypatch.setattr(ROUTER, "compact", True)
+    return ROUTER
+
+
+SKILL_NAME = max(SKILL.values(), key=len)
+
+# (простір, дія, аргументи) -> маршрут і типізовані аргументи після resolve
+CASES = [
+    (("shop", "sell", 3), "shop:sell", (3,)),
+    (("inv", "equip", -1), "inv:equip", (-1,)),
+    (("battle", "skill", SKILL_NAME), "battle:skill", (SKILL_NAME,)),
+    (("travel", LOC_SHOP), "travel:*", (LOC_SHOP,)),
+    (("reg", "class", list(CLASSES)[-1]), "reg:class", (list(CLASSES)[-1],)),
+    (("reg", "back", list(BACKSTORIES)[-1]), "reg:back", (list(BACKSTORIES)[-1],)),
+    (("inv", "unequip", "accessory"), "inv:unequip", ("accessory",)),
+    (("shop", "menu", "sell"), "shop:menu", ("sell",)),
+]
+
+
+@pytest.mark.parametrize("call, name, args", CASES)
+def test_compact_roundtrip(compact, call, name, args):
+    data = compact.data(*call)
+    assert data.startswith(PREFIX)
+    route, out = compact.resolve(data)
+    assert route.name == name and out == args
+    assert [type(v) for v in out] == [type(v) for v in args]
+
+
+@pytest.mark.parametrize("call, name, args", CASES)
+def test_legacy_text_still_resolves(call, name, args):
+    route, out = ROUTER.resolve(":".join(map(str, call)))
+    assert route.name == name and out == args
+
+
+def test_unknown_value_falls_back_to_text(compact):
+    data = compact.data("battle", "skill", "Невідоме вміння")
+    assert data == "battle:skill:Невідоме вміння"
+    route, args = compact.resolve(data)
+    assert route.name == "battle:skill" and args == ("Невідоме вміння",)
+
+
+def test_changed_registry_is_stale():
+    places = ["Тракт", "Руїни"]
+    kind = IdKind("place", lambda: places)
+    router = CallbackRouter(compact=True)
+    router.add("go", WILDCARD, _noop, kind)
+    data = router.data("go", "Руїни")
+    assert router.resolve(data)[1] == ("Руїни",)
+
+    # новий деплой: локацію вставили на початок — id "Руїни" тепер інший
+    places.insert(0, "Болото")
+    kind.reset()
+    router._codec = None
+    assert router.resolve(data) == (router.stale, ())
+    assert router.resolve(router.data("go", "Руїни"))[1] == ("Руїни",)
+
+
+def _samples(t):
+    if isinstance(t, IdKind):
+        return t.values()
+    if t is int:
+        return (0, -1, 99, 10 ** 6)
+    return ("take_loot", "after_loot")
+
+
+def test_every_payload_fits_limit(compact):
+    checked = 0
+    for route in compact.routes():
+        for args in itertools.product(*map(_samples, route.types)):
+            if route.action == WILDCARD:
+                data = compact.data(route.namespace, *map(str, args))
+            else:
+                data = compact.data(route.namespace, route.action, *args)
+            assert len(data.encode("utf-8")) <= MAX_LEN, data
+            assert compact.resolve(data)[0].namespace == route.namespace
+            checked += 1
+    assert checked > 50
+
+
+# ---- CallbackRouter ----
+
+class _Query:
+    def __init__(self):
+        self.answered = 0
+
+    async def answer(self, *args, **kwargs):
+        self.answered += 1
+
+
+def _router():
+    calls = []
+
+    def record(name):
+        async def cb(update, context, *args):
+            calls.append((name, args))
+        return cb
+
+    router = CallbackRouter(compact=False)
+    router.add("shop", "sell", record("sell"), int)
+    router.add("shop", "menu", record("menu"), str)
+    router.add("shop", WILDCARD, record("shop*"), str)
+    router.add("battle", "attack", record("attack"), answer=False)
+    return router, calls
+
+
+def _call(router, data):
+    route, args = router.resolve(data)
+    update = SimpleNamespace(callback_query=_Query())
+    asyncio.run(router.handler().handle_update(update, None, (route, args), None))
+    return update.callback_query
+
+
+def test_lookup_by_namespace_and_action():
+    router, _ = _router()
+    route, args = router.resolve("shop:sell:4")
+    assert route.name == "shop:sell" and args == (4,)
+    route, args = router.resolve("shop:menu:buy:extra")
+    assert route.name == "shop:menu" and args == ("buy:extra",)
+    assert router.resolve("nope:sell:1") is None
+    assert router.resolve("battle:attack:1") is None  # маршрут без аргументів і без запасного
+
+
+def test_wildcard_fallback():
+    router, _ = _router()
+    route, args = router.resolve("shop:leave")
+    assert route.name == "shop:*" and args == ("leave",)
+    # int не розібрався — запасний маршрут отримує дію разом з аргументами
+    route, args = router.resolve("shop:sell:abc")
+    assert route.name == "shop:*" and args == ("sell:abc",)
+
+
+def test_arg_typing():
+    router, _ = _router()
+    assert router.resolve("shop:sell:-2")[1] == (-2,)
+    assert type(router.resolve("shop:menu:7")[1][0]) is str
+    route = next(r for r in router.routes() if r.name == "shop:sell")
+    assert route.parse_args("x") is None
+    assert route.parse_args("") is None
+
+
+def test_answer_flag_and_hits():
+    router, calls = _router()
+    assert _call(router, "shop:sell:1").answered == 1
+    assert _call(router, "battle:attack").answered == 0  # відповідає сам хендлер
+    _call(router, "shop:sell:2")
+    assert calls == [("sell", (1,)), ("attack", ()), ("sell", (2,))]
+    stats = router.stats()
+    assert stats["shop:sell"] == 2 and stats["battle:attack"] == 1
+    assert stats["shop:*"] == 0 and stats["stale"] == 0
+
+
+def test_freeze_rejects_late_routes():
+    router, _ = _router()
+    with pytest.raises(ValueError):
+        router.add("shop", "sell", _noop, int)
+    router.freeze()
+    tag = router.codec().tag
+    with pytest.raises(RuntimeError):
+        router.add("shop", "late", _noop)
+    with pytest.raises(RuntimeError):
+        router.route("quest", "late")(_noop)
+    assert router.codec().tag == tag
+    assert router.resolve("shop:late")[0].name == "shop:*"
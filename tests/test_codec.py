@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""storage/codec.py: round-trip Player / Enemy / предметів і user_data, сумісність зі старими рядками."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import pickle
+import random
+import sqlite3
+
+import pytest
+
+from rpg0.handlers.shop import shop_stock
+from rpg0.models import Enemy, Player
+from rpg0.storage.codec import (
+    CodecError, Packed, decode_enemy, decode_item, decode_player, encode_enemy, encode_item,
+    encode_player, pack_state, unpack_state,
+)
+from rpg0.storage.sqlite import SQLitePersistence
+from rpg0.utils.catalog import Item, as_item
+from rpg0.utils.loot import generate_loot
+
+LEGACY_ITEM = {
+    "name": "Стара реліквія", "rarity": "epic", "title": "Власна", "emoji": "🔮",
+    "type": "accessory", "atk": 3, "def": 2, "price": 99, "enchant": {"fire": 2},
+}
+
+
+def _player(seed: int = 1, n_loot: int = 20) -> Player:
+    rng = random.Random(seed)
+    p = Player(name="Олеся", level=7, exp=33, hp=41, max_hp=60, gold=125, class_name="Маг",
+               backstory="Шляхтич", registered=True, skills_known=["Вогняний снаряд", "Імпульс сили"],
+               skills_loadout=["Вогняний снаряд"], pending_skill_choice=True,
+               loot_pity={"rare": 3, "epic": 12}, upgrades={"weapon": 2, "notes": ["x", 1.5]})
+    for _ in range(n_loot):
+        p.inventory.append(generate_loot(rng.choice(("Тракт", "Руїни", "Старий ліс")), rng=rng))
+    stock = shop_stock()
+    stock[0]["durability"] = 7
+    p.inventory.extend(stock)
+    weapon = shop_stock()[3]
+    weapon["equipped"] = True
+    p.equipment["weapon"] = weapon
+    p.equipment["accessory"] = as_item(LEGACY_ITEM)
+    return p
+
+
+def test_player_roundtrip():
+    p = _player()
+    assert Player(**decode_player(encode_player(p))) == p
+
+
+def test_player_roundtrip_from_dict_format():
+    p = _player(seed=2)
+    d = p.asdict()
+    out = decode_player(encode_player(d))
+    assert out.keys() == d.keys()
+    assert Player(**out) == Player(**d)
+
+
+def test_player_extras_survive():
+    d = _player().asdict()
+    d["achievements"] = {"first_blood": True, "kills": 12}
+    d["level"] = "7"            # не підходить під типізоване поле — їде в extras як є
+    d[42] = (1, 2)              # не рядковий ключ і кортеж — через pickle
+    out = decode_player(encode_player(d))
+    assert out["achievements"] == {"first_blood": True, "kills": 12}
+    assert out["level"] == "7"
+    assert out[42] == (1, 2)
+
+
+def test_legacy_dict_items_decode_like_as_item():
+    p = _player()
+    p.inventory.append(dict(LEGACY_ITEM))  # у живому інвентарі може лишитися старий dict
+    out = Player(**decode_player(encode_player(p)))
+    assert out.inventory[-1] == as_item(LEGACY_ITEM)
+    assert out.inventory[-1]["enchant"] == {"fire": 2}
+    assert list(out.inventory[:-1]) == list(p.inventory[:-1])
+
+
+def test_enemy_roundtrip():
+    e = Enemy("Орк-берсерк", 30, 17, 9, 3, 22, 20, "elite")
+    assert Enemy(**decode_enemy(encode_enemy(e))) == e
+    odd = dict(Enemy("Хтось новий", -1, 10, 0, 0, 0, 0).asdict(), aura=[1, "x"])
+    assert decode_enemy(encode_enemy(odd)) == odd
+
+
+def test_catalog_item_is_template_id_plus_state():
+    it = shop_stock()[4]
+    it["durability"] = 12
+    it["equipped"] = True
+    blob = encode_item(it)
+    out = decode_item(blob)
+    assert out == it and out.tpl is it.tpl
+    assert len(blob) < 16
+
+
+def test_item_extras_and_nonstandard_fields():
+    it = as_item({"name": "Дивний", "rarity": "rare", "type": "weapon", "atk": "5", "def": 1,
+                  "socket": None, "runes": ["a", "b"]})
+    out = decode_item(encode_item(it))
+    assert out == it
+    assert out.to_dict() == it.to_dict()
+
+
+def test_pack_state_roundtrip():
+    ud = {
+        "player": _player(),
+        "enemy": Enemy("Вовк лісовий", 12, 20, 6, 2, 14, 12),
+        "loot_pending": generate_loot("Руїни", rng=random.Random(3)),
+        "location": "Руїни",
+        "battle_state": {"cooldowns": {"Вогняний снаряд": 1}, "seed": 7},
+    }
+    packed = pack_state(ud)
+    assert all(isinstance(packed[k], Packed) for k in ("player", "enemy", "loot_pending"))
+    assert packed["battle_state"] is ud["battle_state"]
+    assert pack_state(packed)["player"] is packed["player"]  # вже закодоване не кодується вдруге
+    out = unpack_state(pickle.loads(pickle.dumps(packed)))
+    assert Player(**out["player"]) == ud["player"]
+    assert Enemy(**out["enemy"]) == ud["enemy"]
+    assert out["loot_pending"] == ud["loot_pending"]
+    assert out["location"] == "Руїни" and out["battle_state"] == ud["battle_state"]
+
+
+def test_unpack_state_leaves_old_values():
+    p = _player()
+    ud = {"player": p, "location": "Тракт"}
+    assert unpack_state(ud) == {"player": p, "location": "Тракт"}
+
+
+def test_old_format_rows_still_load(tmp_path):
+    db = tmp_path / "rpg.sqlite3"
+    SQLitePersistence(str(db))._conn.close()
+    p = _player()
+    # рядок до кодека: увесь user_data — звичайний pickle з живими об'єктами
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO user_data (user_id, data) VALUES (?, ?)",
+                     (7, pickle.dumps({"player": p, "location": "Руїни"})))
+
+    async def load():
+        persistence = SQLitePersistence(str(db))
+        try:
+            return await persistence.get_user_data()
+        finally:
+            await persistence.flush()
+
+    data = asyncio.run(load())
+    assert data[7]["player"] == p
+    assert data[7]["location"] == "Руїни"
+
+
+def test_bad_records():
+    blob = encode_player(_player())
+    with pytest.raises(CodecError):
+        decode_enemy(blob)
+    with pytest.raises(CodecError):
+        decode_player(bytes((99,)) + blob[1:])
+    with pytest.raises(CodecError):
+        decode_player(b"")
+    assert isinstance(decode_item(encode_item(LEGACY_ITEM)), Item)
+
+
+def test_item_body_cache_keeps_exact_types():
+    p = _player(n_loot=0)
+    first = encode_player(p)
+    assert encode_player(p) == first  # тіла з кешу — ті самі байти
+    odd = shop_stock()[0]
+    p.inventory.append(odd)
+    encode_player(p)  # тіло з durability=20 тепер у кеші
+    odd["durability"] = 20.0  # 20.0 == 20, але тип інший — не з кешу цілих
+    out = Player(**decode_player(encode_player(p)))
+    assert type(out.inventory[-1]["durability"]) is float
+    assert list(out.inventory) == list(p.inventory)
+
+
+def test_encode_reads_slots_without_asdict(monkeypatch):
+    p = _player()
+    blob = encode_player(p.asdict())
+
+    def boom(self):
+        raise AssertionError("asdict() на шляху запису")
+
+    monkeypatch.setattr(Player, "asdict", boom)
+    assert encode_player(p) == blob
+
+
+def test_journal_diffs_live_player_by_field(tmp_path):
+    db = tmp_path / "rpg.sqlite3"
+    p = _player(n_loot=3)
+
+    async def write():
+        persistence = SQLitePersistence(str(db), journal=True, write_delay=60)
+        state = {"player": copy.deepcopy(p), "location": "Руїни"}
+        await persistence.update_user_data(7, state)
+        await persistence._drain()
+        p.gold += 5
+        p.inventory.append(shop_stock()[2])
+        state = {"player": copy.deepcopy(p), "location": "Руїни",
+                 "enemy": Enemy("Вовк лісовий", 12, 20, 6, 2, 14, 12)}
+        await persistence.update_user_data(7, state)
+        await persistence.flush()
+
+    asyncio.run(write())
+    with sqlite3.connect(db) as conn:
+        (ops,), = conn.execute("SELECT ops FROM journal").fetchall()
+    ops = pickle.loads(ops)
+    assert ("inc", ("player", "gold"), 5) in ops
+    assert ("set", ("enemy",), Enemy("Вовк лісовий", 12, 20, 6, 2, 14, 12).asdict()) in ops
+
+    async def load():
+        persistence = SQLitePersistence(str(db), journal=True)
+        try:
+            return await persistence.get_user_data()
+        finally:
+            await persistence.flush()
+
+    data = asyncio.run(load())[7]
+    assert Player(**data["player"]) == p
+    assert data["enemy"]["name"] == "Вовк лісовий"
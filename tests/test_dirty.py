@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Живий Player у TrackedUserData: читання не змінює версію, мутація — змінює."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from rpg0.bot import stats
+from rpg0.config import LOC_SHOP
+from rpg0.handlers.shop import shop_buy_potion, shop_menu
+from rpg0.models import Player, ensure_player_ud, get_enemy_ud, Enemy
+from rpg0.storage.tracking import TrackedUserData
+
+
+class _Message:
+    chat_id = 1
+    message_id = 1
+
+    async def reply_html(self, text, **kwargs):
+        return None
+
+
+class _Query:
+    def __init__(self):
+        self.message = _Message()
+
+    async def edit_message_text(self, text, **kwargs):
+        return None
+
+
+def _context():
+    ud = TrackedUserData({"player": Player(registered=True, gold=50), "location": LOC_SHOP})
+    return SimpleNamespace(user_data=ud, args=[])
+
+
+def test_accessors_do_not_bump_version():
+    ud = TrackedUserData({"player": Player(), "enemy": Enemy("Вовк", 10, 10, 3, 1, 5, 5)})
+    v = ud.version
+    assert ensure_player_ud(ud) is ensure_player_ud(ud)
+    assert get_enemy_ud(ud) is get_enemy_ud(ud)
+    assert ud.version == v
+
+
+def test_read_only_handlers_keep_version():
+    ctx = _context()
+    v = ctx.user_data.version
+    asyncio.run(stats(SimpleNamespace(message=_Message()), ctx))
+    q = _Query()
+    for menu in ("main", "buy", "sell"):
+        asyncio.run(shop_menu(SimpleNamespace(callback_query=q), ctx, menu))
+    assert ctx.user_data.version == v
+
+
+def test_mutating_handler_marks_player():
+    ctx = _context()
+    v = ctx.user_data.version
+    asyncio.run(shop_buy_potion(SimpleNamespace(callback_query=_Query()), ctx))
+    assert ctx.user_data["player"].potions == 3
+    assert ctx.user_data.version > v
+    assert ctx.user_data.key_versions["player"] == ctx.user_data.version
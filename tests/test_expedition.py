@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""run_expedition: лічильники pity рухаються лише від предметів, що дісталися гравцю."""
+from __future__ import annotations
+
+import random
+
+from rpg0.config import LOC_RUINS, LOC_TRACT
+from rpg0.models import Player
+from rpg0.utils.expedition import STOP_LOW_HP, run_expedition
+from rpg0.utils.loot import _pity_update
+
+
+def _replay(pity, items):
+    """Лічильники після дропів `items` — так, ніби їх кидали по одному через generate_loot."""
+    pity = dict(pity)
+    for item in items:
+        _pity_update(pity, item.tpl.rarity)
+    return pity
+
+
+def test_early_stop_keeps_pity():
+    for seed in range(300):
+        p = Player(registered=True, hp=1)
+        p.loot_pity = {"rare": 19, "epic": 59}
+        rep = run_expedition(p, LOC_TRACT, 20, random.Random(seed))
+        assert rep.stopped == STOP_LOW_HP
+        assert rep.items == []
+        assert p.loot_pity == {"rare": 19, "epic": 59}
+
+
+def test_pity_follows_delivered_items():
+    for seed in range(300):
+        rng = random.Random(seed)
+        p = Player(registered=True, level=rng.randint(1, 8))
+        p.loot_pity = {"rare": rng.randint(0, 19), "epic": rng.randint(0, 59)}
+        before = dict(p.loot_pity)
+        rep = run_expedition(p, rng.choice((LOC_TRACT, LOC_RUINS)), rng.randint(1, 20), rng)
+        assert p.loot_pity == _replay(before, rep.items)
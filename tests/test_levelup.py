@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Player.apply_exp (закрита формула) проти колишнього циклу по рівнях."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from rpg0 import config
+from rpg0.models import Player
+
+
+def _loop_gain_exp(p: Player, amount: int, interval: int):
+    """Дослівно старий Player.gain_exp (до закритої формули) + рівні з вибором уміння."""
+    p.exp += amount
+    leveled = False
+    skill_levels = []
+    while p.exp >= p._exp_to_next():
+        p.exp -= p._exp_to_next()
+        p.level += 1
+        leveled = True
+        # Прирости характеристик
+        p.max_hp += 5
+        p.atk += 2
+        p.defense += 1
+        p.hp = p.max_hp
+        # Кожні N рівнів — пропозиція вміння
+        if p.level % interval == 0:
+            p.pending_skill_choice = True
+            skill_levels.append(p.level)
+    return p.level, leveled, skill_levels
+
+
+def _player(level: int, exp: int, hp_missing: int) -> Player:
+    p = Player(level=level, exp=exp, max_hp=30 + 5 * (level - 1), atk=6 + 2 * (level - 1),
+               defense=2 + (level - 1))
+    p.hp = max(1, p.max_hp - hp_missing)
+    return p
+
+
+def _state(p: Player) -> tuple:
+    return p.level, p.exp, p.hp, p.max_hp, p.atk, p.defense, p.pending_skill_choice
+
+
+def _check(level: int, exp: int, grant: int, interval: int, hp_missing: int = 0) -> None:
+    ref, new = _player(level, exp, hp_missing), _player(level, exp, hp_missing)
+    ref_level, leveled, skill_levels = _loop_gain_exp(ref, grant, interval)
+    res = new.apply_exp(grant)
+    assert _state(new) == _state(ref), (level, exp, grant, interval)
+    assert (res.level, res.levels > 0, res.exp) == (ref_level, leveled, ref.exp)
+    assert (res.max_hp, res.atk, res.defense) == (5 * res.levels, 2 * res.levels, res.levels)
+    assert list(res.skill_levels) == skill_levels
+
+
+@pytest.mark.parametrize("interval", [1, 3, config.SKILL_SELECT_INTERVAL, 7])
+def test_matches_loop_random(monkeypatch, interval):
+    monkeypatch.setattr(config, "SKILL_SELECT_INTERVAL", interval)
+    rng = random.Random(interval)
+    for _ in range(3000):
+        level = rng.randint(1, 200)
+        exp = rng.randint(0, 20 + (level - 1) * 10 - 1)  # нормальний стан: менше за поріг
+        grant = rng.choice((rng.randint(0, 50), rng.randint(0, 2_000), rng.randint(0, 200_000)))
+        _check(level, exp, grant, interval, hp_missing=rng.randint(0, 20))
+
+
+def test_matches_loop_at_level_boundaries():
+    interval = config.SKILL_SELECT_INTERVAL
+    for level in range(1, 60):
+        need = 20 + (level - 1) * 10
+        # рівно до порогу, на одиницю менше/більше, рівно на k рівнів вперед
+        for k in range(0, 12):
+            cost = 5 * k * k + (10 * level + 5) * k
+            for grant in (cost - 1, cost, cost + 1, need - 1, need, need + 1):
+                if grant >= 0:
+                    _check(level, 0, grant, interval)
+
+
+def test_matches_loop_huge_grants():
+    interval = config.SKILL_SELECT_INTERVAL
+    for grant in (10 ** 7, 10 ** 9 + 12345, 5 * 10 ** 9):
+        _check(1, 0, grant, interval)
+        _check(137, 400, grant, interval)
+
+
+def test_astronomical_grant_within_series_bounds():
+    # цикл тут зайняв би години — перевіряємо проти меж арифметичної прогресії
+    for grant in (10 ** 12, 10 ** 18 + 7, 3 ** 80):
+        p = _player(12, 15, 0)
+        res = p.apply_exp(grant)
+        k, b, total = res.levels, 10 * 12 + 5, grant + 15
+        assert 5 * k * k + b * k <= total < 5 * (k + 1) ** 2 + b * (k + 1)
+        assert p.exp == total - (5 * k * k + b * k)
+        assert 0 <= p.exp < p._exp_to_next()
+        assert p.hp == p.max_hp == 30 + 5 * 11 + 5 * k
+        n = config.SKILL_SELECT_INTERVAL
+        assert len(res.skill_levels) == (12 + k) // n - 12 // n
+        assert p.pending_skill_choice == bool(res.skill_levels)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""OutboundScheduler на віртуальному годиннику: ліміти чату, пріоритети, злиття редагувань, RetryAfter."""
+from __future__ import annotations
+
+import asyncio
+import selectors
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import RetryAfter
+
+from rpg0.config import RATE_MAX_RETRIES
+from rpg0.utils import ratelimit
+from rpg0.utils.ratelimit import PRIORITY_BULK, OutboundScheduler
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Замість сну — перемотати годинник циклу на таймаут."""
+
+    loop: "_VirtualLoop"
+
+    def select(self, timeout=None):
+        if timeout:
+            self.loop.now += timeout
+        return super().select(0)
+
+
+class _VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        selector = _VirtualSelector()
+        selector.loop = self
+        self.now = 0.0
+        super().__init__(selector)
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def run(monkeypatch):
+    loop = _VirtualLoop()
+    # планувальник міряє час через time.monotonic — той самий віртуальний годинник
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=loop.time))
+
+    def runner(scenario):
+        try:
+            return loop.run_until_complete(scenario(loop))
+        finally:
+            loop.close()
+
+    return runner
+
+
+async def _send(sched, loop, log, chat_id, tag, endpoint="sendMessage", priority=None, **data):
+    async def callback(text):
+        log.append((tag, round(loop.time(), 3)))
+        return f"ok:{text}"
+
+    data = dict(chat_id=chat_id, **data)
+    args = {"priority": priority} if priority is not None else None
+    return await sched.process_request(callback, (tag,), {}, endpoint, data, args)
+
+
+def test_chat_burst_then_rate(run):
+    async def scenario(loop):
+        sched = OutboundScheduler(global_rate=1000, chat_rate=1, chat_burst=3, group_rate=20 / 60)
+        await sched.initialize()
+        log = []
+        await asyncio.gather(*(_send(sched, loop, log, 5, f"p{i}") for i in range(6)),
+                             _send(sched, loop, log, 6, "other"),
+                             *(_send(sched, loop, log, -100, f"g{i}") for i in range(2)))
+        await sched.shutdown()
+        return dict(log)
+
+    at = run(scenario)
+    # приватний чат: три одразу, далі раз на секунду
+    assert [at[f"p{i}"] for i in range(6)] == pytest.approx([0, 0, 0, 1, 2, 3], abs=0.01)
+    assert at["other"] == pytest.approx(0, abs=0.01)  # чужий чат не чекає
+    # група: 20/хв без сплеску
+    assert [at["g0"], at["g1"]] == pytest.approx([0, 3], abs=0.01)
+
+
+def test_interactive_ahead_of_bulk(run):
+    async def scenario(loop):
+        sched = OutboundScheduler(global_rate=1, chat_rate=100, chat_burst=10)
+        await sched.initialize()
+        log = []
+        bulk = [asyncio.ensure_future(_send(sched, loop, log, 100 + i, f"b{i}", priority=PRIORITY_BULK))
+                for i in range(5)]
+        await asyncio.sleep(0.5)
+        await _send(sched, loop, log, 1, "i")
+        await asyncio.gather(*bulk)
+        await sched.shutdown()
+        return log
+
+    log = run(scenario)
+    assert [tag for tag, _ in log] == ["b0", "b1", "i", "b2", "b3", "b4"]
+    assert dict(log)["i"] == pytest.approx(1, abs=0.01)
+
+
+def test_edits_coalesce_and_share_result(run):
+    async def scenario(loop):
+        sched = OutboundScheduler(global_rate=1000, chat_rate=1, chat_burst=1)
+        await sched.initialize()
+        log = []
+        await _send(sched, loop, log, 5, "msg")
+        edits = [_send(sched, loop, log, 5, f"e{i}", "editMessageText", message_id=9) for i in range(3)]
+        results = await asyncio.gather(*edits)
+        await sched.shutdown()
+        return log, results
+
+    log, results = run(scenario)
+    assert [tag for tag, _ in log] == ["msg", "e2"]  # пішов лише останній рендер
+    assert results == ["ok:e2"] * 3
+
+
+def test_retry_after_requeues(run):
+    async def scenario(loop):
+        sched = OutboundScheduler(global_rate=1000, chat_rate=10, chat_burst=1)
+        await sched.initialize()
+        calls = []
+
+        async def callback():
+            calls.append(round(loop.time(), 3))
+            if len(calls) == 1:
+                raise RetryAfter(2)
+            return "ok"
+
+        result = await sched.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None)
+        await sched.shutdown()
+        return result, calls
+
+    result, calls = run(scenario)
+    assert result == "ok"
+    assert calls == pytest.approx([0, 2], abs=0.01)  # чат на паузі, доки не мине retry_after
+
+
+def test_retry_after_gives_up_after_max_retries(run):
+    async def scenario(loop):
+        sched = OutboundScheduler(global_rate=1000, max_retries=RATE_MAX_RETRIES)
+        await sched.initialize()
+        calls = []
+
+        async def callback():
+            calls.append(loop.time())
+            raise RetryAfter(1)
+
+        try:
+            with pytest.raises(RetryAfter):
+                await sched.process_request(callback, (), {}, "sendMessage", {"chat_id": 5}, None)
+        finally:
+            await sched.shutdown()
+        return calls
+
+    assert len(run(scenario)) == RATE_MAX_RETRIES + 1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""BattleReaper на справжньому Application PTB (з локальним FakeBotAPI): покинутий бій завершується."""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import inspect
+
+import telegram
+from telegram import Chat, Message, Update, User
+from telegram.ext import ApplicationBuilder, ConversationHandler, MessageHandler, filters
+
+from rpg0.loadtest.fakeapi import FakeBotAPI
+from rpg0.utils.reaper import BattleReaper
+
+FIGHTING = 1
+_DATE = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _update(app, uid: int, n: int) -> Update:
+    msg = Message(n, _DATE, Chat(uid, Chat.PRIVATE), from_user=User(uid, "Гравець", False), text="бій")
+    return Update.de_json({"update_id": n, "message": msg.to_dict()}, app.bot)
+
+
+def test_private_update_state_api():
+    # reaper.py завершує розмову через ConversationHandler._update_state(END, key)
+    assert telegram.__version__ == "21.5"
+    params = list(inspect.signature(ConversationHandler._update_state).parameters)
+    assert params[:3] == ["self", "new_state", "key"]
+
+
+def test_stale_conversation_is_reaped():
+    async def start(update, context):
+        context.user_data["enemy"] = {"name": "Вовк"}
+        context.user_data["battle_state"] = {"seed": 1}
+        context.user_data["gold"] = 7
+        return FIGHTING
+
+    async def scenario():
+        api = FakeBotAPI()
+        app = ApplicationBuilder().token("123:TEST").base_url(await api.start()).updater(None).build()
+        conv = ConversationHandler(
+            entry_points=[MessageHandler(filters.TEXT, start)],
+            states={FIGHTING: [MessageHandler(filters.TEXT, start)]},
+            fallbacks=[],
+        )
+        app.add_handler(conv)
+        reaper = BattleReaper(ttl=0.3, tick=0.05)
+        reaper.bind(app, conv)
+        try:
+            await app.initialize()
+            await app.process_update(_update(app, 5, 1))
+            await app.process_update(_update(app, 6, 2))
+            assert set(conv._conversations) == {(5, 5), (6, 6)}
+
+            reaper.start()  # restore(): обидві розмови — в колесі
+            for _ in range(12):
+                await asyncio.sleep(0.06)
+                reaper.touch(6, 6)  # гравець 6 і далі б'ється
+            await reaper.stop()
+        finally:
+            await app.shutdown()
+            await api.stop()
+        return app, conv
+
+    app, conv = asyncio.run(scenario())
+    assert set(conv._conversations) == {(6, 6)}
+    assert app.user_data[5] == {"gold": 7}
+    assert "enemy" in app.user_data[6]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""SQLitePersistence (lazy + LRU): гравця, чий апдейт ще обробляється, не витісняємо."""
+from __future__ import annotations
+
+import asyncio
+
+from rpg0.storage.sqlite import SQLitePersistence
+from rpg0.storage.tracking import TrackedUserData
+
+
+def _stored(path):
+    p = SQLitePersistence(str(path))
+    try:
+        return p._load_users()
+    finally:
+        p._conn.close()
+
+
+def test_busy_user_is_not_evicted(tmp_path):
+    db = tmp_path / "rpg.sqlite3"
+    running = {1}
+
+    async def scenario():
+        p = SQLitePersistence(str(db), lazy=True, cache_size=1, write_delay=60, busy=running.__contains__)
+        first = TrackedUserData()
+        await p.refresh_user_data(1, first)
+        first["gold"] = 10
+        # апдейт іншого гравця приходить, поки хендлер першого ще працює
+        running.add(2)
+        await p.refresh_user_data(2, TrackedUserData({"gold": 1}))
+        assert first == {"gold": 10}
+        assert list(p._resident) == [1, 2]
+        first["gold"] = 20  # зміни після чужого refresh не губляться
+
+        # хендлер завершився — наступний чужий апдейт витісняє гравця 1 на диск
+        running.clear()
+        running.add(3)
+        await p.refresh_user_data(3, TrackedUserData())
+        assert list(p._resident) == [3] and first == {}
+        await p.flush()
+
+    asyncio.run(scenario())
+    assert _stored(db)[1] == {"gold": 20}
+
+
+def test_idle_users_evicted_in_lru_order(tmp_path):
+    db = tmp_path / "rpg.sqlite3"
+
+    async def scenario():
+        p = SQLitePersistence(str(db), lazy=True, cache_size=2, write_delay=60, busy=lambda uid: False)
+        for uid in (1, 2, 3):
+            ud = TrackedUserData()
+            await p.refresh_user_data(uid, ud)
+            ud["n"] = uid
+        assert list(p._resident) == [2, 3]
+        await p.flush()
+
+    asyncio.run(scenario())
+    assert _stored(db)[1] == {"n": 1}
+
+
+def test_evict_keeps_queued_changes(tmp_path):
+    db = tmp_path / "rpg.sqlite3"
+
+    async def scenario():
+        p = SQLitePersistence(str(db), lazy=True, cache_size=1, write_delay=60)
+        first = TrackedUserData()
+        await p.refresh_user_data(1, first)
+        first["gold"] = 20
+        await p.update_user_data(1, first)  # у черзі — той самий dict, що зараз спорожниться
+        await p.refresh_user_data(2, TrackedUserData())
+        assert first == {}
+        await p.flush()
+
+    asyncio.run(scenario())
+    assert _stored(db)[1] == {"gold": 20}
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""PerUserUpdateProcessor: послідовно в межах гравця, паралельно між гравцями, без витоку замків."""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+
+from telegram import Chat, Message, Update, User
+
+from rpg0.utils.updates import PerUserUpdateProcessor, update_key
+
+_DATE = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _update(uid: int, n: int = 1) -> Update:
+    msg = Message(n, _DATE, Chat(uid, Chat.PRIVATE), from_user=User(uid, "Гравець", False), text="/x")
+    return Update(n, message=msg)
+
+
+def test_update_key():
+    assert update_key(_update(5)) == 5
+    assert update_key("не апдейт") is None
+
+
+def test_same_user_fifo():
+    order = []
+
+    async def handler(i):
+        # перші апдейти довші: без черги гравця порядок перевернувся б
+        await asyncio.sleep(0.01 * (5 - i))
+        order.append(i)
+
+    async def scenario():
+        proc = PerUserUpdateProcessor(max_running=8, max_pending=64)
+        await asyncio.gather(*(proc.process_update(_update(1, i), handler(i)) for i in range(5)))
+
+    asyncio.run(scenario())
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_no_lost_read_modify_write():
+    gold = {uid: 0 for uid in range(4)}
+
+    async def handler(uid):
+        value = gold[uid]
+        await asyncio.sleep(0)  # перемикання посеред read-modify-write
+        gold[uid] = value + 1
+
+    async def scenario():
+        proc = PerUserUpdateProcessor(max_running=3, max_pending=256)
+        await asyncio.gather(*(proc.process_update(_update(uid, n), handler(uid))
+                               for n in range(25) for uid in gold))
+
+    asyncio.run(scenario())
+    assert gold == {uid: 25 for uid in range(4)}
+
+
+def test_global_concurrency_bound():
+    running = peak = 0
+
+    async def handler():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.005)
+        running -= 1
+
+    async def scenario():
+        proc = PerUserUpdateProcessor(max_running=3, max_pending=64)
+        await asyncio.gather(*(proc.process_update(_update(uid), handler()) for uid in range(10)),
+                             *(proc.process_update(None, handler()) for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert peak == 3
+
+
+def test_slots_released_when_idle():
+    async def scenario():
+        proc = PerUserUpdateProcessor(max_running=2, max_pending=64)
+        gate = asyncio.Event()
+
+        async def handler():
+            await gate.wait()
+
+        tasks = [asyncio.create_task(proc.process_update(_update(uid % 3, n), handler()))
+                 for n, uid in enumerate(range(9))]
+        await asyncio.sleep(0)
+        assert len(proc) == 3 and proc.busy(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert len(proc) == 0 and not proc._slots
+        assert not proc.busy(0)
+
+        async def failing():
+            raise RuntimeError("хендлер упав")
+
+        try:
+            await proc.process_update(_update(7), failing())
+        except RuntimeError:
+            pass
+        assert not proc._slots  # і після винятку
+
+    asyncio.run(scenario())